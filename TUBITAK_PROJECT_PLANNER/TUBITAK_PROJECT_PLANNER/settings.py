@@ -11,7 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
-import environ, os
+import environ, os, sys
 from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -60,6 +60,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'TubitakPlannerApp.middleware.RequestMetricsMiddleware',  # keep last, see middleware.py
 ]
 
 ROOT_URLCONF = 'TUBITAK_PROJECT_PLANNER.urls'
@@ -104,6 +105,53 @@ DATABASES = {
 # User Login Settup
 AUTH_USER_MODEL = 'TubitakPlannerApp.ProjectLeadUser'
 
+# Cache of validated access tokens used by jwt_required (TubitakPlannerApp/authentication.py). It lives in
+# each server process: saving or deleting a lead evicts its tokens only in the process that did it, the other
+# workers keep accepting them (e.g. after a deactivation or password change) for up to JWT_AUTH_CACHE_TTL.
+JWT_AUTH_CACHE_TTL = env.int('JWT_AUTH_CACHE_TTL', default=60)  # seconds, 0 turns the cache off
+JWT_AUTH_CACHE_SIZE = env.int('JWT_AUTH_CACHE_SIZE', default=1024)
+# Trust the user id in the token instead of loading the user (no DB query per request)
+JWT_AUTH_STATELESS = env.bool('JWT_AUTH_STATELESS', default=False)
+
+# Files written by background jobs (project exports, see TubitakPlannerApp/jobs.py) go to the default storage
+MEDIA_ROOT = env('MEDIA_ROOT', default=str(BASE_DIR / 'media'))
+
+# Change events of projects/<id>/events/ (TubitakPlannerApp/events.py). The in-process broker only reaches
+# clients of the same server process, run several workers with a broker that fans out across them.
+PROJECT_EVENTS_BROKER = env('PROJECT_EVENTS_BROKER', default='TubitakPlannerApp.events.InProcessBroker')
+PROJECT_EVENTS_HEARTBEAT = env.int('PROJECT_EVENTS_HEARTBEAT', default=15)  # seconds between keep-alive comments
+
+# Rendered JSON of the project list reads (TubitakPlannerApp/response_cache.py), keyed by project version.
+# locmem by default; filecache:///path or redis://host:6379/1 share it between workers. locmem and file
+# evict by MAX_ENTRIES (locmem least recently used first), give Redis a maxmemory with allkeys-lru.
+RESPONSE_CACHE = env.cache_url('RESPONSE_CACHE_URL', default='locmemcache://responses')
+RESPONSE_CACHE['TIMEOUT'] = env.int('RESPONSE_CACHE_TIMEOUT', default=3600)
+if RESPONSE_CACHE['BACKEND'].endswith(('LocMemCache', 'FileBasedCache')):
+    RESPONSE_CACHE.setdefault('OPTIONS', {})['MAX_ENTRIES'] = env.int('RESPONSE_CACHE_MAX_ENTRIES', default=2000)
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'responses': RESPONSE_CACHE,
+}
+
+
+# One JSON line per request with query count and timings (RequestMetricsMiddleware). Off under
+# `manage.py test`, where every test client request would print one; REQUEST_METRICS_LOG_LEVEL=INFO shows them.
+TESTING = sys.argv[1:2] == ['test']
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'TubitakPlannerApp.metrics': {
+            'handlers': ['console'],
+            'level': env('REQUEST_METRICS_LOG_LEVEL', default='WARNING' if TESTING else 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import ProjectLeadUser
+
+
+class TokenUserCache:
+    """
+    Small in-process LRU of raw access token -> user with a per-entry deadline.
+    Entries never outlive the token's own `exp` claim.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # token -> (deadline, user)
+        self._by_user = {}  # user pk -> set of tokens, used for invalidation
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            deadline, user = entry
+            if deadline <= time.monotonic():
+                self._remove(token)
+                return None
+            self._entries.move_to_end(token)
+            return user
+
+    def set(self, token, user, expires_at):
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+        # expires_at is the token's unix `exp`, converted to the monotonic clock
+        deadline = time.monotonic() + min(self.ttl, expires_at - time.time())
+        with self._lock:
+            if token in self._entries:
+                self._remove(token)
+            self._entries[token] = (deadline, user)
+            self._by_user.setdefault(user.pk, set()).add(token)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def evict_user(self, user_pk):
+        with self._lock:
+            for token in list(self._by_user.get(user_pk, ())):
+                self._remove(token)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def _remove(self, token):
+        _, user = self._entries.pop(token)
+        tokens = self._by_user.get(user.pk)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._by_user[user.pk]
+
+
+token_cache = TokenUserCache(
+    max_size=getattr(settings, 'JWT_AUTH_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'JWT_AUTH_CACHE_TTL', 60),
+)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that remembers validated tokens for a short time, so repeated requests
+    with the same token skip both signature checking and the user query.
+
+    With JWT_AUTH_STATELESS the user is built from the token claims only and never loaded.
+    Such a user carries just its pk and must not be saved; deactivation or a password change
+    only takes effect once the token expires.
+    """
+
+    def authenticate_token(self, raw_token):
+        user = token_cache.get(raw_token)
+        if user is not None:
+            return user
+
+        validated_token = self.get_validated_token(raw_token)
+        user = self.get_user(validated_token)
+        token_cache.set(raw_token, user, validated_token['exp'])
+        return user
+
+    async def aauthenticate_token(self, raw_token):
+        # a cache hit stays on the event loop, only a miss (signature check and user query) goes to a thread
+        user = token_cache.get(raw_token)
+        if user is not None:
+            return user
+        return await sync_to_async(self.authenticate_token)(raw_token)
+
+    def get_user(self, validated_token):
+        if getattr(settings, 'JWT_AUTH_STATELESS', False):
+            return self.get_stateless_user(validated_token)
+        return super().get_user(validated_token)
+
+    def get_stateless_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+        # the claim is stored as text, the field converts it back (an int pk for ProjectLeadUser)
+        field = ProjectLeadUser._meta.get_field(api_settings.USER_ID_FIELD)
+        user = ProjectLeadUser(**{api_settings.USER_ID_FIELD: field.to_python(user_id)})
+        user._state.adding = False
+        return user
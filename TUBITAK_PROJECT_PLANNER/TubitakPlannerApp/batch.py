@@ -0,0 +1,259 @@
+from django.db import connection, transaction
+from django.db.models import Max, Min
+
+from .budget import BULK_BATCH_SIZE
+from .models import User, WorkPackage, Task, Deliverable
+from .purge import delete_work_package_rows
+from .serializers import WorkPackageBatchSerializer, TaskBatchSerializer, DeliverableBatchSerializer
+from .signals import batch_writes
+
+
+class BatchValidationError(Exception):
+    """Raised when any item of a batch is invalid, nothing is written. `errors` is a list of per-item errors."""
+
+    def __init__(self, errors):
+        super().__init__("Invalid batch.")
+        self.errors = errors
+
+
+def _item_error(op, index, error):
+    return {"op": op, "index": index, "error": error}
+
+
+def _is_id(value):
+    # ids come straight from the JSON body, anything but an integer (bools included) is a bad item
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def bulk_create_with_ids(model, objs):
+    """bulk_create that leaves every object with its primary key, which M2M rows and children need."""
+    if connection.features.can_return_rows_from_bulk_insert:
+        model.objects.bulk_create(objs, batch_size=BULK_BATCH_SIZE)
+    else:
+        # backends that can't return the new ids (e.g. Oracle) get one insert per row
+        for obj in objs:
+            obj.save()
+
+
+def _model_fields(data):
+    # serializers give related ids as ints, models want them on the *_id attribute
+    if 'work_package' in data:
+        data['work_package_id'] = data.pop('work_package')
+    return data
+
+
+class BatchWriter:
+    """
+    Applies {"create": [...], "update": [{"id": ..., ...}], "delete": [ids]} to one model of a project.
+    The whole batch is validated first with set-based queries, then written with bulk queries
+    in one transaction. Updates are partial: only the given fields change.
+    """
+    model = None
+    serializer_class = None
+    has_users = False
+
+    def __init__(self, project, project_lead):
+        self.project = project
+        self.project_lead = project_lead
+
+    def get_queryset(self):
+        return self.model.objects.filter(work_package__project=self.project)
+
+    def build(self, data):
+        return self.model(**data)
+
+    def validate_rows(self, rows, errors):
+        """`rows` is a list of (op, index, instance, user ids or None). Append an error per bad row."""
+        raise NotImplementedError
+
+    def run(self, payload):
+        if not isinstance(payload, dict):
+            raise BatchValidationError([{"error": "Batch must be an object with create, update and delete lists."}])
+        creates = payload.get('create') or []
+        updates = payload.get('update') or []
+        deletes = payload.get('delete') or []
+        if not all(isinstance(part, list) for part in (creates, updates, deletes)):
+            raise BatchValidationError([{"error": "create, update and delete must be lists."}])
+
+        update_ids = [item.get('id') for item in updates if isinstance(item, dict)]
+        existing = self.get_queryset().in_bulk([pk for pk in update_ids + deletes if _is_id(pk)])
+        loaded = {pk: getattr(obj, 'work_package_id', None) for pk, obj in existing.items()}  # before the updates move them
+
+        errors = []
+        rows = []
+        updated_fields = set()
+
+        for index, item in enumerate(creates):
+            serializer = self.serializer_class(data=item)
+            if not serializer.is_valid():
+                errors.append(_item_error('create', index, serializer.errors))
+                continue
+            data = _model_fields(dict(serializer.validated_data))
+            user_ids = data.pop('users', [])
+            rows.append(('create', index, self.build(data), user_ids))
+
+        for index, item in enumerate(updates):
+            pk = item.get('id') if isinstance(item, dict) else None
+            if not _is_id(pk):
+                errors.append(_item_error('update', index, "id must be an integer."))
+                continue
+            if pk not in existing:
+                errors.append(_item_error('update', index, f"{self.model.__name__} with ID {pk} not found."))
+                continue
+            if pk in deletes:
+                errors.append(_item_error('update', index, f"{self.model.__name__} with ID {pk} is also deleted."))
+                continue
+            serializer = self.serializer_class(data={k: v for k, v in item.items() if k != 'id'}, partial=True)
+            if not serializer.is_valid():
+                errors.append(_item_error('update', index, serializer.errors))
+                continue
+            data = _model_fields(dict(serializer.validated_data))
+            user_ids = data.pop('users', None)
+            instance = existing[pk]
+            for field, value in data.items():
+                setattr(instance, field, value)
+            updated_fields.update(data)
+            rows.append(('update', index, instance, user_ids))
+
+        for index, pk in enumerate(deletes):
+            if not _is_id(pk):
+                errors.append(_item_error('delete', index, "id must be an integer."))
+            elif pk not in existing:
+                errors.append(_item_error('delete', index, f"{self.model.__name__} with ID {pk} not found."))
+
+        self.validate_rows(rows, errors)
+        if errors:
+            raise BatchValidationError(errors)
+
+        summary_ids = set()  # filled in below, batch_writes() refreshes their summaries on the way out
+        with transaction.atomic(), batch_writes(self.project, work_package_ids=summary_ids):
+            self.delete_rows(deletes)
+            bulk_create_with_ids(self.model, [obj for op, _, obj, _ in rows if op == 'create'])
+            updated = [obj for op, _, obj, _ in rows if op == 'update']
+            if updated and updated_fields:
+                self.model.objects.bulk_update(updated, sorted(updated_fields), batch_size=BULK_BATCH_SIZE)
+            if self.has_users:
+                self._set_users({obj.id: user_ids for _, _, obj, user_ids in rows if user_ids is not None})
+            summary_ids.update(self.summary_work_packages(rows, loaded, deletes))
+
+        results = [{"op": op, "index": index, "id": obj.id} for op, index, obj, _ in rows]
+        results += [{"op": 'delete', "index": index, "id": pk} for index, pk in enumerate(deletes)]
+        return results
+
+    def delete_rows(self, ids):
+        for i in range(0, len(ids), BULK_BATCH_SIZE):
+            self.model.objects.filter(id__in=ids[i:i + BULK_BATCH_SIZE]).delete()
+
+    def summary_work_packages(self, rows, loaded, deletes):
+        """WPs whose counts the batch changed: of created and deleted rows, and both ends of moved ones."""
+        ids = {loaded[pk] for pk in deletes if pk in loaded}
+        for op, _, obj, _ in rows:
+            if op == 'create' or loaded.get(obj.id) != obj.work_package_id:
+                ids.update((obj.work_package_id, loaded.get(obj.id)))
+        ids.discard(None)
+        return ids
+
+    def _set_users(self, users_by_id):
+        if not users_by_id:
+            return
+        through = self.model.users.through
+        source = self.model.users.field.m2m_field_name()
+        through.objects.filter(**{f'{source}_id__in': list(users_by_id)}).delete()
+        through.objects.bulk_create(
+            [through(**{f'{source}_id': pk, 'user_id': user_id})
+             for pk, user_ids in users_by_id.items() for user_id in set(user_ids)],
+            batch_size=BULK_BATCH_SIZE,
+        )
+
+    def _work_packages(self, rows):
+        # referenced WPs of this project with their user ids, two queries
+        wp_ids = {obj.work_package_id for _, _, obj, _ in rows}
+        work_packages = WorkPackage.objects.filter(project=self.project, id__in=wp_ids).in_bulk()
+        wp_users = {wp_id: set() for wp_id in work_packages}
+        for wp_id, user_id in WorkPackage.users.through.objects.filter(workpackage_id__in=list(work_packages)).values_list('workpackage_id', 'user_id'):
+            wp_users[wp_id].add(user_id)
+        return work_packages, wp_users
+
+
+class WorkPackageBatchWriter(BatchWriter):
+    model = WorkPackage
+    serializer_class = WorkPackageBatchSerializer
+    has_users = True
+
+    def get_queryset(self):
+        return WorkPackage.objects.filter(project=self.project)
+
+    def build(self, data):
+        return WorkPackage(project=self.project, **data)
+
+    def summary_work_packages(self, rows, loaded, deletes):
+        # new WPs need their row, the counts of the others don't change (deleted ones are rolled up with the project)
+        return {obj.id for op, _, obj, _ in rows if op == 'create'}
+
+    def delete_rows(self, ids):
+        # set-based, a WP's tasks, deliverables and budget go with it without being loaded
+        delete_work_package_rows(ids)
+
+    def validate_rows(self, rows, errors):
+        user_ids = {user_id for _, _, _, ids in rows for user_id in ids or ()}
+        own_user_ids = set(User.objects.filter(id__in=user_ids, project_lead=self.project_lead).values_list('id', flat=True))
+
+        # months used by the children of updated WPs, they have to stay inside the new range
+        updated_ids = [obj.id for op, _, obj, _ in rows if op == 'update']
+        task_span = {
+            row['work_package']: (row['first'], row['last'])
+            for row in Task.objects.filter(work_package_id__in=updated_ids).values('work_package').annotate(first=Min('start_date'), last=Max('end_date'))
+        }
+        deliverable_span = {
+            row['work_package']: (row['first'], row['last'])
+            for row in Deliverable.objects.filter(work_package_id__in=updated_ids, deadline__isnull=False).values('work_package').annotate(first=Min('deadline'), last=Max('deadline'))
+        }
+
+        for op, index, wp, ids in rows:
+            missing = [user_id for user_id in ids or () if user_id not in own_user_ids]
+            if missing:
+                errors.append(_item_error(op, index, f"User with ID {missing[0]} not found."))
+            elif wp.start_date > wp.end_date:
+                errors.append(_item_error(op, index, "WorkPackage cannot end before it starts."))
+            else:
+                for kind, span in (('Task', task_span.get(wp.id)), ('Deliverable', deliverable_span.get(wp.id))):
+                    if span and (span[0] < wp.start_date or span[1] > wp.end_date):
+                        errors.append(_item_error(op, index, f"{kind} months cannot exceed WorkPackage months."))
+                        break
+
+
+class TaskBatchWriter(BatchWriter):
+    model = Task
+    serializer_class = TaskBatchSerializer
+    has_users = True
+
+    def validate_rows(self, rows, errors):
+        work_packages, wp_users = self._work_packages(rows)
+
+        for op, index, task, ids in rows:
+            wp = work_packages.get(task.work_package_id)
+            if wp is None:
+                errors.append(_item_error(op, index, "WorkPackage not found."))
+            elif task.start_date > task.end_date:
+                errors.append(_item_error(op, index, "Task cannot end before it starts."))
+            elif task.start_date < wp.start_date or task.end_date > wp.end_date:
+                errors.append(_item_error(op, index, "Task weeks cannot exceed WorkPackage weeks."))
+            else:
+                outside = [user_id for user_id in ids or () if user_id not in wp_users[wp.id]]
+                if outside:
+                    errors.append(_item_error(op, index, f"User with ID {outside[0]} is not part of the WorkPackage."))
+
+
+class DeliverableBatchWriter(BatchWriter):
+    model = Deliverable
+    serializer_class = DeliverableBatchSerializer
+
+    def validate_rows(self, rows, errors):
+        work_packages, _ = self._work_packages(rows)
+
+        for op, index, deliverable, _ in rows:
+            wp = work_packages.get(deliverable.work_package_id)
+            if wp is None:
+                errors.append(_item_error(op, index, "WorkPackage not found."))
+            elif deliverable.deadline is None or not wp.start_date <= deliverable.deadline <= wp.end_date:
+                errors.append(_item_error(op, index, "Deliverable deadline cannot exceed WorkPackage months."))
@@ -0,0 +1,315 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+from rest_framework import serializers
+
+from .capacity import capacity_errors
+from .models import User, WorkPackage, BudgetEntry
+from .pagination import PaginationError, month_range, overlapping
+from .serializers import BudgetEntrySerializer
+from .signals import batch_writes
+
+# keeps every bulk statement under the parameter limits of sqlite/oracle
+BULK_BATCH_SIZE = 500
+# bounds the cells a single segment expands to (100 years of months)
+MAX_SEGMENT_MONTHS = 1200
+# ?format= of GET budget/: the wp_user_month object, parallel columns, or a wp x user x month block
+BUDGET_FORMATS = ('keys', 'columns', 'dense')
+# bounds the cells (empty ones included) of one dense block
+MAX_DENSE_CELLS = 200000
+
+
+class BudgetValidationError(Exception):
+    """Raised when a budget payload has invalid keys or values. `errors` maps key -> message."""
+
+    def __init__(self, errors):
+        super().__init__("Invalid budget data.")
+        self.errors = errors
+
+
+class BudgetFilterError(ValueError):
+    pass
+
+
+def budget_key(wp_id, user_id, month):
+    return f"{wp_id}_{user_id}_{month}"
+
+
+def parse_budget_key(key):
+    # keys look like "<wp id>_<user id>_<month>", same as the frontend builds them
+    parts = key.split('_')
+    if len(parts) != 3:
+        raise ValueError("Key must look like <wp>_<user>_<month>.")
+    wp_id, user_id, month = (int(p) for p in parts)
+    return wp_id, user_id, month
+
+
+def segments_from_cells(cells):
+    """
+    Run-length encode (wp id, user id, month, contribution) cells, sorted by work package, user and month,
+    into segments {"work_package", "user", "start_month", "end_month", "contribution"} of consecutive
+    months with the same contribution. A constant allocation over a whole WP is one segment.
+    """
+    segments = []
+    last = None
+    for wp_id, user_id, month, contribution in cells:
+        if (last is not None and last["work_package"] == wp_id and last["user"] == user_id
+                and last["end_month"] == month - 1 and last["contribution"] == contribution):
+            last["end_month"] = month
+        else:
+            last = {"work_package": wp_id, "user": user_id, "start_month": month, "end_month": month, "contribution": contribution}
+            segments.append(last)
+    return segments
+
+
+def cells_from_segments(segments):
+    """
+    Expand segments into the {"wp_user_month": contribution} map parse_budget_changes() takes.
+    A null contribution removes the segment's months. Raises BudgetValidationError keyed segment_<index>.
+    """
+    if not isinstance(segments, list):
+        raise BudgetValidationError({"__all__": "segments must be a list."})
+    cells = {}
+    errors = {}
+    for index, segment in enumerate(segments):
+        key = f"segment_{index}"
+        try:
+            wp_id, user_id, start, end = (int(segment[name]) for name in ('work_package', 'user', 'start_month', 'end_month'))
+        except (KeyError, TypeError, ValueError):
+            errors[key] = "work_package, user, start_month and end_month must be numbers."
+            continue
+        if not 1 <= start <= end:
+            errors[key] = "Months must start at 1 and start_month cannot be after end_month."
+            continue
+        if end - start >= MAX_SEGMENT_MONTHS:
+            errors[key] = f"A segment cannot be longer than {MAX_SEGMENT_MONTHS} months."
+            continue
+        for month in range(start, end + 1):
+            cell = budget_key(wp_id, user_id, month)
+            if cell in cells:
+                errors[key] = f"Overlaps another segment in month {month}."
+                break
+            cells[cell] = segment.get('contribution')
+    if errors:
+        raise BudgetValidationError(errors)
+    return cells
+
+
+def budget_segments(project, months=None):
+    """The project's budget as segments, read with one query ordered like the (wp, user, month) unique index."""
+    entries = overlapping(BudgetEntry.objects.filter(work_package__project=project), months, 'month')
+    return segments_from_cells(
+        entries.order_by('work_package', 'user', 'month').values_list('work_package', 'user', 'month', 'contribution'))
+
+
+def _ids(value, name):
+    try:
+        return [int(v) for v in value.split(',') if v.strip()]
+    except ValueError:
+        raise BudgetFilterError(f"{name} must be a comma separated list of ids.")
+
+
+def parse_budget_filters(params):
+    """
+    ?format=keys|columns|dense &wp=1,2 &user=3,4 &from_month= &to_month= of GET budget/.
+    Missing means no filter; the default format is the {"wp_user_month": contribution} object.
+    """
+    try:
+        months = month_range(params)
+    except PaginationError as e:
+        raise BudgetFilterError(str(e))
+    filters = {
+        'format': params.get('format') or 'keys',
+        'work_packages': _ids(params['wp'], 'wp') if params.get('wp') else None,
+        'users': _ids(params['user'], 'user') if params.get('user') else None,
+        'months': months,
+    }
+    if filters['format'] not in BUDGET_FORMATS:
+        raise BudgetFilterError(f"format must be one of {', '.join(BUDGET_FORMATS)}.")
+    return filters
+
+
+def budget_cells(project, filters):
+    """(wp id, user id, month, contribution) tuples of the filtered budget, ordered like the (wp, user, month) unique index."""
+    entries = overlapping(BudgetEntry.objects.filter(work_package__project=project), filters['months'], 'month')
+    if filters['work_packages'] is not None:
+        entries = entries.filter(work_package__in=filters['work_packages'])
+    if filters['users'] is not None:
+        entries = entries.filter(user__in=filters['users'])
+    return entries.order_by('work_package', 'user', 'month').values_list('work_package', 'user', 'month', 'contribution')
+
+
+def budget_columns(cells):
+    """Cells as parallel arrays, entry i is work_packages[i], users[i], months[i], contributions[i]."""
+    columns = {"work_packages": [], "users": [], "months": [], "contributions": []}
+    if cells:
+        wp_ids, user_ids, months, contributions = zip(*cells)
+        columns.update(work_packages=list(wp_ids), users=list(user_ids), months=list(months),
+                       contributions=[str(c) for c in contributions])
+    return columns
+
+
+def budget_block(cells, months=None):
+    """
+    Cells as a dense block: contributions[i][j][k] is work package work_packages[i], user users[j] and
+    month from_month + k, null where there is no entry. Only WPs and users with a cell get a row. The
+    window is `months` (a month_range() result), its open ends taken from the cells.
+    """
+    wp_ids = sorted({cell[0] for cell in cells})
+    user_ids = sorted({cell[1] for cell in cells})
+    first, last = months or (None, None)
+    if cells:
+        first = min(cell[2] for cell in cells) if first is None else first
+        last = max(cell[2] for cell in cells) if last is None else last
+    width = last - first + 1 if None not in (first, last) else 0
+    if len(wp_ids) * len(user_ids) * width > MAX_DENSE_CELLS:
+        raise BudgetFilterError(f"A dense block cannot have more than {MAX_DENSE_CELLS} cells, narrow the months, wp or user filters.")
+
+    wp_index = {wp_id: i for i, wp_id in enumerate(wp_ids)}
+    user_index = {user_id: j for j, user_id in enumerate(user_ids)}
+    block = [[[None] * width for _ in user_ids] for _ in wp_ids]
+    for wp_id, user_id, month, contribution in cells:
+        block[wp_index[wp_id]][user_index[user_id]][month - first] = str(contribution)
+    return {"work_packages": wp_ids, "users": user_ids, "from_month": first, "to_month": last, "contributions": block}
+
+
+def render_budget(cells, filters):
+    """The body of GET budget/ in the requested format, from budget_cells() already read."""
+    if filters['format'] == 'columns':
+        return budget_columns(cells)
+    if filters['format'] == 'dense':
+        return budget_block(cells, filters['months'])
+    return {budget_key(wp_id, user_id, month): str(contribution) for wp_id, user_id, month, contribution in cells}
+
+
+def parse_budget_changes(data, project, project_lead, replace=False):
+    """
+    Validate a {"wp_user_month": contribution} map without writing anything.
+    A null contribution means the cell should be removed; replace=True validates it as the whole new budget.
+    Nobody may end up above 1.0 in a month, summed over all projects of the lead.
+    Returns {(wp_id, user_id, month): Decimal or None}.
+    """
+    if not isinstance(data, dict):
+        raise BudgetValidationError({"__all__": "Budget data must be an object of wp_user_month keys."})
+
+    contribution_field = BudgetEntrySerializer().fields['contribution']
+    changes = {}
+    errors = {}
+
+    for key, value in data.items():
+        try:
+            cell = parse_budget_key(key)
+        except ValueError as e:
+            errors[key] = str(e)
+            continue
+        if value is None or value == '':
+            changes[cell] = None
+            continue
+        try:
+            changes[cell] = contribution_field.run_validation(value)
+        except serializers.ValidationError as e:
+            errors[key] = ' '.join(str(d) for d in e.detail)
+
+    # ownership of work packages and users checked with one query each
+    wp_ids = {wp_id for wp_id, _, _ in changes}
+    user_ids = {user_id for _, user_id, _ in changes}
+    own_wp_ids = set(WorkPackage.objects.filter(id__in=wp_ids, project=project).values_list('id', flat=True))
+    own_user_ids = set(User.objects.filter(id__in=user_ids, project_lead=project_lead).values_list('id', flat=True))
+
+    for wp_id, user_id, month in changes:
+        key = budget_key(wp_id, user_id, month)
+        if wp_id not in own_wp_ids:
+            errors[key] = f"WorkPackage with ID {wp_id} not found."
+        elif user_id not in own_user_ids:
+            errors[key] = f"User with ID {user_id} not found."
+
+    if errors:
+        raise BudgetValidationError(errors)
+    errors = capacity_errors(project, changes, replace=replace)
+    if errors:
+        raise BudgetValidationError(errors)
+    return changes
+
+
+def apply_budget_changes(project, changes, replace=False):
+    """
+    Write parsed budget changes with bulk queries inside a single transaction.
+    With replace=True every existing entry of the project that is not in `changes` is removed as well.
+    Returns counts of created, updated and deleted entries.
+    """
+    with transaction.atomic():
+        existing_qs = BudgetEntry.objects.filter(work_package__project=project)
+        if not replace:
+            # narrow to the touched cells; exact matching happens below
+            existing_qs = existing_qs.filter(
+                work_package_id__in={wp_id for wp_id, _, _ in changes},
+                user_id__in={user_id for _, user_id, _ in changes},
+                month__in={month for _, _, month in changes},
+            )
+        existing = {
+            (e.work_package_id, e.user_id, e.month): e
+            for e in existing_qs.only('id', 'work_package_id', 'user_id', 'month', 'contribution')
+        }
+
+        to_create, to_update, to_delete = [], [], []
+        for cell, contribution in changes.items():
+            entry = existing.get(cell)
+            if contribution is None:
+                if entry is not None:
+                    to_delete.append(entry.id)
+            elif entry is None:
+                wp_id, user_id, month = cell
+                to_create.append(BudgetEntry(work_package_id=wp_id, user_id=user_id, month=month, contribution=contribution))
+            elif entry.contribution != contribution:
+                entry.contribution = contribution
+                to_update.append(entry)
+
+        if replace:
+            to_delete.extend(e.id for cell, e in existing.items() if cell not in changes)
+
+        # listeners of projects/<id>/events/ get the changed cells in the shape GET /budget/ returns, null = removed
+        deleted = set(to_delete)
+        cells = {cell: None for cell, e in existing.items() if e.id in deleted}
+        cells.update(((e.work_package_id, e.user_id, e.month), str(e.contribution)) for e in to_update + to_create)
+        event = {"type": "budget", "action": "changed", "data": {f"{wp}_{user}_{month}": value for (wp, user, month), value in cells.items()}}
+
+        with batch_writes(project, event, work_package_ids={wp for wp, _, _ in cells}):
+            for i in range(0, len(to_delete), BULK_BATCH_SIZE):
+                BudgetEntry.objects.filter(id__in=to_delete[i:i + BULK_BATCH_SIZE]).delete()
+            if to_update:
+                BudgetEntry.objects.bulk_update(to_update, ['contribution'], batch_size=BULK_BATCH_SIZE)
+            if to_create:
+                BudgetEntry.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE)
+
+    return {"created": len(to_create), "updated": len(to_update), "deleted": len(to_delete)}
+
+
+def _rollup(entries):
+    return entries.annotate(
+        cost=ExpressionWrapper(F('contribution') * F('user__wage'), output_field=DecimalField(max_digits=14, decimal_places=4)),
+    )
+
+
+def _totals(person_months, cost):
+    return {
+        "person_months": (person_months or Decimal(0)).quantize(Decimal('0.01')),
+        "cost": (cost or Decimal(0)).quantize(Decimal('0.01')),
+    }
+
+
+def budget_summary(project):
+    """
+    Person-month and cost totals of a project's budget per user, per work package, per month and overall.
+    Everything is summed by the database; cost is contribution * User.wage.
+    """
+    entries = _rollup(BudgetEntry.objects.filter(work_package__project=project))
+
+    summary = {}
+    for name, column in (('users', 'user'), ('work_packages', 'work_package'), ('months', 'month')):
+        rows = entries.values(column).annotate(pm=Sum('contribution'), total=Sum('cost')).order_by(column)
+        summary[name] = {str(row[column]): _totals(row['pm'], row['total']) for row in rows}
+
+    grand = entries.aggregate(pm=Sum('contribution'), total=Sum('cost'))
+    summary["total"] = _totals(grand['pm'], grand['total'])
+    return summary
@@ -0,0 +1,191 @@
+from array import array
+from decimal import Decimal
+
+from django.db.models import ExpressionWrapper, F, IntegerField, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+from .models import BudgetEntry, User
+
+FULL_TIME = 100  # allocations are kept in hundredths, contributions have two decimal places
+
+
+def calendar_month(start_date, month):
+    """Project month (1 = the month of start_date) -> months since year 0, comparable across projects."""
+    return start_date.year * 12 + start_date.month - 1 + month - 1
+
+
+def month_label(month):
+    """Calendar month index -> "YYYY-MM"."""
+    return f"{month // 12:04d}-{month % 12 + 1:02d}"
+
+
+def hundredths(contribution):
+    return int(Decimal(contribution) * FULL_TIME)
+
+
+class AllocationMatrix:
+    """
+    Dense user x calendar month matrix of allocations in hundredths, stored as one flat integer array
+    (row = user, column = month). Totals are exact integers, so 0.33 + 0.67 is exactly full time.
+    """
+
+    def __init__(self, user_ids, first_month, last_month):
+        self.rows = {user_id: row for row, user_id in enumerate(sorted(user_ids))}
+        self.first_month = first_month
+        self.width = max(last_month - first_month + 1, 0)
+        self.cells = array('q', bytes(8 * len(self.rows) * self.width))
+
+    def index(self, user_id, month):
+        return self.rows[user_id] * self.width + month - self.first_month
+
+    def add(self, user_id, month, amount):
+        self.cells[self.index(user_id, month)] += amount
+
+    def total(self, user_id, month):
+        return self.cells[self.index(user_id, month)]
+
+    def over_capacity(self, limit=FULL_TIME):
+        """Every (user id, calendar month, hundredths) cell above `limit`, found in one pass over the array."""
+        user_ids = sorted(self.rows)
+        return [
+            (user_ids[i // self.width], self.first_month + i % self.width, value)
+            for i, value in enumerate(self.cells) if value > limit
+        ]
+
+
+def capacity_errors(project, changes, replace=False):
+    """
+    Check parsed budget changes of `project` against the one-person-per-month rule across all
+    projects of the same lead. Returns {"capacity_<user>_<month>": message} for every cell the
+    changes push above 1.0; months in the keys and messages are months of `project`.
+    """
+    user_ids = {user_id for _, user_id, _ in changes}
+    if not user_ids:
+        return {}
+
+    # everything the save leaves in place: other projects, and untouched cells of this project
+    others = BudgetEntry.objects.filter(user_id__in=user_ids, work_package__project__deleted_at__isnull=True)
+    if replace:
+        others = others.exclude(work_package__project=project)
+    totals = list(
+        others.values_list('user_id', 'work_package__project__start_date', 'month')
+        .annotate(total=Sum('contribution')).order_by()
+    )
+    if not replace:
+        replaced = BudgetEntry.objects.filter(
+            work_package__project=project,
+            work_package_id__in={wp_id for wp_id, _, _ in changes},
+            user_id__in=user_ids,
+            month__in={month for _, _, month in changes},
+        ).values_list('work_package_id', 'user_id', 'month', 'contribution')
+        totals.extend(
+            (user_id, project.start_date, month, -contribution)
+            for wp_id, user_id, month, contribution in replaced if (wp_id, user_id, month) in changes
+        )
+    totals.extend(
+        (user_id, project.start_date, month, contribution)
+        for (_, user_id, month), contribution in changes.items() if contribution is not None
+    )
+
+    cells = [(user_id, calendar_month(start, month), hundredths(total)) for user_id, start, month, total in totals]
+    months = [month for _, month, _ in cells]
+    matrix = AllocationMatrix(user_ids, min(months, default=0), max(months, default=-1))
+    for user_id, month, amount in cells:
+        matrix.add(user_id, month, amount)
+
+    # only cells this save raises are reported, older overbookings elsewhere don't block it
+    touched = {(user_id, calendar_month(project.start_date, month))
+               for (_, user_id, month), contribution in changes.items() if contribution is not None}
+    offset = calendar_month(project.start_date, 1) - 1
+    errors = {}
+    for user_id, month, total in matrix.over_capacity():
+        if (user_id, month) in touched:
+            allocated = (Decimal(total) / FULL_TIME).quantize(Decimal('0.01'))
+            errors[f"capacity_{user_id}_{month - offset}"] = (
+                f"User with ID {user_id} would be allocated {allocated} in month {month - offset} across all projects, more than 1.0."
+            )
+    return errors
+
+
+PORTFOLIO_MAX_MONTHS = 1200  # widest ?from=&to= window of the portfolio workload
+
+
+class WorkloadFilterError(ValueError):
+    pass
+
+
+def _month(value, name):
+    year, _, month = value.partition('-')
+    if len(year) != 4 or len(month) != 2 or not (year + month).isdigit() or not 1 <= int(month) <= 12:
+        raise WorkloadFilterError(f"{name} must be a month as YYYY-MM.")
+    return int(year) * 12 + int(month) - 1
+
+
+def parse_workload_range(params):
+    """?from=YYYY-MM &to=YYYY-MM -> (first, last) calendar month indexes, None where not given."""
+    first = _month(params['from'], 'from') if params.get('from') else None
+    last = _month(params['to'], 'to') if params.get('to') else None
+    if first is not None and last is not None:
+        if first > last:
+            raise WorkloadFilterError("from cannot be after to.")
+        if last - first + 1 > PORTFOLIO_MAX_MONTHS:
+            raise WorkloadFilterError(f"The range cannot be longer than {PORTFOLIO_MAX_MONTHS} months.")
+    return first, last
+
+
+def _calendar_month_expression():
+    # calendar_month() in SQL, so entries of different projects that fall in the same month are summed together
+    start = 'work_package__project__start_date'
+    return ExtractYear(start) * 12 + ExtractMonth(start) + F('month') - 2
+
+
+def _amounts():
+    # hundredths -> "0.50" like the contribution field, memoized: a matrix repeats few distinct values
+    labels = {}
+
+    def amount(value):
+        label = labels.get(value)
+        if label is None:
+            label = labels[value] = '{:f}'.format((Decimal(value) / FULL_TIME).quantize(Decimal('0.01')))
+        return label
+    return amount
+
+
+def portfolio_workload(lead, first_month=None, last_month=None):
+    """
+    Allocation of every person of `lead` per calendar month across all of the lead's projects.
+    The contributions are summed per (user, calendar month) by the database in one query; the dense
+    user x month matrix runs from `first_month` to `last_month` (calendar month indexes, by default the
+    months that have entries). Cells above full time are listed under "over_allocated".
+    """
+    entries = BudgetEntry.objects.filter(work_package__project__owner=lead, work_package__project__deleted_at__isnull=True,
+                                         user__project_lead=lead).annotate(
+        calendar_month=ExpressionWrapper(_calendar_month_expression(), output_field=IntegerField()))
+    if first_month is not None:
+        entries = entries.filter(calendar_month__gte=first_month)
+    if last_month is not None:
+        entries = entries.filter(calendar_month__lte=last_month)
+    totals = list(entries.values_list('user_id', 'calendar_month').annotate(total=Sum('contribution')).order_by())
+
+    users = list(User.objects.filter(project_lead=lead).order_by('id').values('id', 'name'))
+    months = [month for _, month, _ in totals]
+    if first_month is None:
+        first_month = min(months, default=0)
+    if last_month is None:
+        last_month = max(months, default=-1)
+
+    matrix = AllocationMatrix([user['id'] for user in users], first_month, last_month)
+    for user_id, month, total in totals:
+        matrix.add(user_id, month, hundredths(total))
+
+    width = matrix.width
+    amount = _amounts()
+    return {
+        "months": [month_label(month) for month in range(first_month, first_month + width)],
+        "users": users,
+        "allocations": [[amount(value) for value in matrix.cells[row * width:(row + 1) * width]] for row in range(len(users))],
+        "over_allocated": [
+            {"user": user_id, "month": month_label(month), "allocated": amount(value)}
+            for user_id, month, value in matrix.over_capacity()
+        ],
+    }
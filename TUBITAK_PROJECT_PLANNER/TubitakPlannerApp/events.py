@@ -0,0 +1,198 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .models import WorkPackage, Task, Deliverable, BudgetEntry
+from .serializers import WorkPackageSerializer, TaskSerializer, DeliverableSerializer, BudgetEntrySerializer
+
+# event type -> (model, serializer of a saved row, fields kept of a deleted row)
+ROW_TYPES = {
+    'work_package': (WorkPackage, WorkPackageSerializer, ('id',)),
+    'task': (Task, TaskSerializer, ('id', 'work_package')),
+    'deliverable': (Deliverable, DeliverableSerializer, ('id', 'work_package')),
+    'budget_entry': (BudgetEntry, BudgetEntrySerializer, ('id', 'work_package', 'user', 'month')),
+}
+
+# sent instead of the missed events when a subscriber falls too far behind, the client refetches the project
+RESET = {"type": "project", "action": "reset"}
+
+
+class Subscription:
+    """
+    Events of one project for one client, queued until read. Readable from a thread (get) or from an
+    event loop (aget) without holding a thread while waiting. Holds at most `max_pending` events,
+    on overflow they are dropped and the next read returns RESET.
+    """
+
+    def __init__(self, broker, project_id, max_pending):
+        self.broker = broker
+        self.project_id = project_id
+        self.max_pending = max_pending
+        self.pending = deque()
+        self.overflowed = False
+        self.condition = threading.Condition()
+        self.waiters = set()  # (loop, asyncio.Event) of aget() calls waiting for an event
+
+    def put(self, event):
+        with self.condition:
+            if len(self.pending) >= self.max_pending:
+                self.pending.clear()
+                self.overflowed = True
+            else:
+                self.pending.append(event)
+            self.condition.notify_all()
+            for loop, ready in self.waiters:
+                loop.call_soon_threadsafe(ready.set)
+
+    def _take(self):
+        if self.overflowed:
+            self.overflowed = False
+            return RESET
+        return self.pending.popleft() if self.pending else None
+
+    def get(self, timeout=None):
+        """Next event, or None when nothing arrived within `timeout` seconds."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.pending or self.overflowed, timeout)
+            return self._take()
+
+    async def aget(self, timeout=None):
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self.condition:
+            event = self._take()
+            if event is not None:
+                return event
+            self.waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self.condition:
+                self.waiters.discard(waiter)
+        with self.condition:
+            return self._take()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """
+    Delivers events to the subscribers of this process only. Enough for one server process; with several
+    workers point PROJECT_EVENTS_BROKER at a backend with the same methods (active, subscribe, unsubscribe,
+    publish) that fans out across them, e.g. over Redis pub/sub.
+    """
+
+    def __init__(self, max_pending=1000):
+        self.max_pending = max_pending
+        self.lock = threading.Lock()
+        self.subscriptions = defaultdict(set)  # project id -> {Subscription}
+
+    def active(self):
+        """False when nobody listens anywhere, the signal receivers then skip building events."""
+        return bool(self.subscriptions)
+
+    def subscribe(self, project_id):
+        subscription = Subscription(self, project_id, self.max_pending)
+        with self.lock:
+            self.subscriptions[project_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscriptions = self.subscriptions.get(subscription.project_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self.subscriptions[subscription.project_id]
+
+    def publish(self, project_id, event):
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(project_id, ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        _broker = import_string(getattr(settings, 'PROJECT_EVENTS_BROKER', 'TubitakPlannerApp.events.InProcessBroker'))()
+    return _broker
+
+
+def publish(project_id, event):
+    """Send `event` to the project's subscribers once the current transaction commits (nothing on rollback)."""
+    broker = get_broker()
+    if broker.active():
+        transaction.on_commit(lambda: broker.publish(project_id, event))
+
+
+def publish_row(kind, instance, deleted=False):
+    """
+    One changed row. A saved row is serialized when the transaction commits, so it carries the state
+    the API returns afterwards (users included); a deleted row only carries its identifying fields.
+    """
+    broker = get_broker()
+    if not broker.active():
+        return
+    project_id = instance.project_id if kind == 'work_package' else (
+        WorkPackage.objects.filter(pk=instance.work_package_id).values_list('project_id', flat=True).first())
+    if project_id is None:
+        return
+    model, serializer_class, key_fields = ROW_TYPES[kind]
+    if deleted:
+        data = {field: getattr(instance, field if field == 'id' else f'{field}_id') for field in key_fields}
+        publish(project_id, {"type": kind, "action": "deleted", "id": instance.pk, "data": data})
+        return
+
+    def send():
+        # a row deleted again later in the same transaction has its own "deleted" event
+        row = model.objects.filter(pk=instance.pk).first()
+        if row is not None:
+            broker.publish(project_id, {"type": kind, "action": "saved", "id": row.pk, "data": serializer_class(row).data})
+    transaction.on_commit(send)
+
+
+def _sse(name, event):
+    return f"event: {name}\ndata: {json.dumps(event, cls=DjangoJSONEncoder)}\n\n"
+
+
+def _hello(project):
+    # a reconnecting client refetches when the version moved while it was away
+    return _sse('ready', {"project": project.id, "version": project.version})
+
+
+def _heartbeat_seconds():
+    return getattr(settings, 'PROJECT_EVENTS_HEARTBEAT', 15)
+
+
+def stream_events(subscription, project):
+    """Server-Sent Events of a subscription for WSGI, a comment line every heartbeat keeps proxies from closing it."""
+    try:
+        yield "retry: 3000\n" + _hello(project)
+        while True:
+            event = subscription.get(timeout=_heartbeat_seconds())
+            yield _sse('change', event) if event is not None else ": keep-alive\n\n"
+    finally:
+        subscription.close()
+
+
+async def astream_events(subscription, project):
+    """stream_events() for ASGI, waiting clients don't hold a thread."""
+    try:
+        yield "retry: 3000\n" + _hello(project)
+        while True:
+            event = await subscription.aget(timeout=_heartbeat_seconds())
+            yield _sse('change', event) if event is not None else ": keep-alive\n\n"
+    finally:
+        subscription.close()
@@ -0,0 +1,77 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+from .models import User, WorkPackage, Task, Deliverable, BudgetEntry
+
+EXPORT_FORMAT = 'tubitak-planner-project'
+EXPORT_VERSION = 1
+
+CHUNK_SIZE = 2000  # rows fetched per round trip
+FLUSH_BYTES = 64 * 1024  # bytes buffered before a chunk is sent
+
+
+def _project_users(project):
+    # personnel referenced anywhere in the project
+    return User.objects.filter(project_lead=project.owner_id).filter(
+        Q(id__in=WorkPackage.users.through.objects.filter(workpackage__project=project).values('user_id'))
+        | Q(id__in=Task.users.through.objects.filter(task__work_package__project=project).values('user_id'))
+        | Q(id__in=BudgetEntry.objects.filter(work_package__project=project).values('user_id'))
+    )
+
+
+def export_sections(project):
+    """(name, values queryset) pairs of a project export, in an order that can be imported front to back."""
+    return [
+        ('users', _project_users(project).order_by('id').values('id', 'name', 'wage')),
+        ('work_packages', WorkPackage.objects.filter(project=project).order_by('id').values(
+            'id', 'name', 'description', 'start_date', 'end_date', 'status')),
+        ('work_package_users', WorkPackage.users.through.objects.filter(workpackage__project=project).order_by('id').values_list(
+            'workpackage_id', 'user_id')),
+        ('tasks', Task.objects.filter(work_package__project=project).order_by('id').values(
+            'id', 'name', 'description', 'start_date', 'end_date', 'status', 'work_package')),
+        ('task_users', Task.users.through.objects.filter(task__work_package__project=project).order_by('id').values_list(
+            'task_id', 'user_id')),
+        ('deliverables', Deliverable.objects.filter(work_package__project=project).order_by('id').values(
+            'id', 'name', 'description', 'deadline', 'work_package')),
+        ('budget_entries', BudgetEntry.objects.filter(work_package__project=project).order_by('id').values_list(
+            'work_package_id', 'user_id', 'month', 'contribution')),
+    ]
+
+
+def stream_project_export(project, progress=None):
+    """
+    Yield a project export as JSON text chunks. Each section is read with .iterator(),
+    so memory stays flat and the first chunk goes out before the big tables are read.
+    Assignments and budget entries are written as arrays to keep the document small.
+    `progress(done, total)` is called after each section.
+    """
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    header = {
+        "format": EXPORT_FORMAT,
+        "version": EXPORT_VERSION,
+        "project": {"id": project.id, "name": project.name, "start_date": project.start_date, "version": project.version},
+    }
+    # header without its closing brace, the sections follow as further keys
+    yield encoder.encode(header)[:-1]
+
+    buffer = []
+    size = 0
+    sections = export_sections(project)
+    for done, (name, queryset) in enumerate(sections, start=1):
+        buffer.append(f',{json.dumps(name)}:[')
+        first = True
+        for row in queryset.iterator(chunk_size=CHUNK_SIZE):
+            text = encoder.encode(row)
+            buffer.append(text if first else ',' + text)
+            first = False
+            size += len(text) + 1
+            if size >= FLUSH_BYTES:
+                yield ''.join(buffer)
+                buffer, size = [], 0
+        buffer.append(']')
+        if progress is not None:
+            progress(done, len(sections))
+    buffer.append('}')
+    yield ''.join(buffer)
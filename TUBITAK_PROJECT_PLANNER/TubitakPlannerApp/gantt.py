@@ -0,0 +1,143 @@
+import calendar
+import datetime
+from collections import defaultdict
+
+from django.db.models import Exists, OuterRef
+
+from .models import WorkPackage, Task, Deliverable
+from .pagination import overlapping
+
+KINDS = ('work_packages', 'tasks', 'deliverables')
+STATUSES = ('active', 'closed')
+
+
+class GanttFilterError(ValueError):
+    pass
+
+
+def add_months(date, months):
+    """date + months, the day clamped to the end of a shorter month (same as dayjs().add(n, 'month'))."""
+    year, month = divmod(date.month - 1 + months, 12)
+    year += date.year
+    return date.replace(year=year, month=month + 1, day=min(date.day, calendar.monthrange(year, month + 1)[1]))
+
+
+def months_until(start, date, last=False):
+    """
+    Smallest k with add_months(start, k) >= date, or with last=True the largest k with
+    add_months(start, k) <= date. Turns calendar dates of a filter into project months.
+    """
+    k = (date.year - start.year) * 12 + date.month - start.month
+    if last:
+        while add_months(start, k) > date:
+            k -= 1
+        while add_months(start, k + 1) <= date:
+            k += 1
+    else:
+        while add_months(start, k) < date:
+            k += 1
+        while add_months(start, k - 1) >= date:
+            k -= 1
+    return k
+
+
+def _ids(value, name):
+    try:
+        return [int(v) for v in value.split(',') if v.strip()]
+    except ValueError:
+        raise GanttFilterError(f"{name} must be a comma separated list of ids.")
+
+
+def _date(value, name):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise GanttFilterError(f"{name} must be a date (YYYY-MM-DD).")
+
+
+def parse_gantt_filters(params):
+    """
+    ?status=active|closed &users=1,2 &work_packages=3,4 &from=YYYY-MM-DD &to=YYYY-MM-DD
+    &kinds=work_packages,tasks,deliverables, the filters of the Gantt page. Missing means no filter;
+    an empty users= or work_packages= (everything unticked on the page) matches nothing.
+    """
+    filters = {
+        'status': params.get('status') or None,
+        'users': _ids(params['users'], 'users') if 'users' in params else None,
+        'work_packages': _ids(params['work_packages'], 'work_packages') if 'work_packages' in params else None,
+        'from': _date(params['from'], 'from') if params.get('from') else None,
+        'to': _date(params['to'], 'to') if params.get('to') else None,
+        'kinds': [k.strip() for k in params['kinds'].split(',') if k.strip()] if 'kinds' in params else list(KINDS),
+    }
+    if filters['status'] not in (None,) + STATUSES:
+        raise GanttFilterError(f"status must be one of {', '.join(STATUSES)}.")
+    unknown = set(filters['kinds']) - set(KINDS)
+    if unknown:
+        raise GanttFilterError(f"Unknown kind(s): {', '.join(sorted(unknown))}.")
+    if filters['from'] and filters['to'] and filters['from'] > filters['to']:
+        raise GanttFilterError("from cannot be after to.")
+    return filters
+
+
+def _bar(prefix, row, start, end, css, parent=None):
+    bar = {
+        "id": f"{prefix}-{row['id']}", "name": row['name'],
+        "start": start.isoformat(), "end": end.isoformat(),
+        "custom_class": css, "progress": 100,
+    }
+    if parent:
+        bar["parent"] = parent
+    return bar
+
+
+def gantt_bars(project, filters):
+    """
+    Ready to render frappe-gantt bars of a project: each work package followed by its tasks and
+    deliverables, dates materialized from Project.start_date (a bar ends on the first day after
+    its last month). All filtering is done in SQL, one query per kind.
+    """
+    start = project.start_date
+    # date range -> project months, a bar of months [s, e] covers [start + (s - 1), start + e)
+    bar_months = deadline_months = None
+    if filters['from'] or filters['to']:
+        low = months_until(start, filters['from']) if filters['from'] else None
+        high = months_until(start, filters['to'], last=True) + 1 if filters['to'] else None
+        bar_months = (low, high)
+        deadline_months = (low + 1 if low is not None else None, high)
+
+    work_packages = WorkPackage.objects.filter(project=project)
+    tasks = Task.objects.all()
+    if filters['work_packages'] is not None:
+        work_packages = work_packages.filter(id__in=filters['work_packages'])
+    if filters['status']:
+        work_packages = work_packages.filter(status=filters['status'])
+        tasks = tasks.filter(status=filters['status'])
+    if filters['users'] is not None:
+        work_packages = work_packages.filter(Exists(
+            WorkPackage.users.through.objects.filter(workpackage=OuterRef('pk'), user__in=filters['users'])))
+        tasks = tasks.filter(Exists(Task.users.through.objects.filter(task=OuterRef('pk'), user__in=filters['users'])))
+
+    # tasks and deliverables are listed under their work package, which has to pass the same filters
+    shown_wps = overlapping(work_packages, bar_months, 'start_date', 'end_date') if 'work_packages' in filters['kinds'] else None
+    children = defaultdict(list)
+    if 'tasks' in filters['kinds']:
+        rows = overlapping(tasks.filter(work_package__in=work_packages), bar_months, 'start_date', 'end_date')
+        for row in rows.order_by('start_date', 'end_date', 'id').values('id', 'name', 'start_date', 'end_date', 'work_package'):
+            children[row['work_package']].append(('T', row, row['start_date'], row['end_date'], 'bar-task'))
+    if 'deliverables' in filters['kinds']:
+        rows = overlapping(Deliverable.objects.filter(work_package__in=work_packages, deadline__isnull=False),
+                           deadline_months, 'deadline')
+        for row in rows.order_by('deadline', 'id').values('id', 'name', 'deadline', 'work_package'):
+            children[row['work_package']].append(('D', row, row['deadline'], row['deadline'] - 1, 'bar-deliverable'))
+
+    if shown_wps is None:
+        shown_wps = work_packages.filter(id__in=list(children))
+    bars = []
+    for wp in shown_wps.order_by('start_date', 'end_date', 'id').values('id', 'name', 'start_date', 'end_date'):
+        parent = None
+        if 'work_packages' in filters['kinds']:
+            bars.append(_bar('WP', wp, add_months(start, wp['start_date'] - 1), add_months(start, wp['end_date']), 'bar-wp'))
+            parent = bars[-1]['id']
+        for prefix, row, first, last, css in children[wp['id']]:
+            bars.append(_bar(prefix, row, add_months(start, first - 1), add_months(start, last), css, parent))
+    return bars
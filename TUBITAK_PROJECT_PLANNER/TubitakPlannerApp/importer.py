@@ -0,0 +1,326 @@
+import csv
+import io
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Sum
+
+from .batch import bulk_create_with_ids
+from .budget import BULK_BATCH_SIZE
+from .capacity import FULL_TIME, AllocationMatrix, calendar_month, hundredths
+from .export import EXPORT_FORMAT
+from .models import User, WorkPackage, Task, Project, Deliverable, BudgetEntry
+from .signals import batch_writes, touch_personnel
+
+CSV_SHEETS = ('personnel', 'work_packages', 'tasks', 'deliverables', 'budget')
+MAX_REPORTED_ERRORS = 200
+
+
+class ImportValidationError(Exception):
+    """Raised when an import document is invalid, nothing is written. `errors` is a list of per-row errors."""
+
+    def __init__(self, errors):
+        super().__init__("Invalid import.")
+        self.errors = errors[:MAX_REPORTED_ERRORS]
+
+
+def _blank_to_none(value):
+    return None if value == '' else value
+
+
+def document_from_csv(sheets):
+    """
+    Turn CSV sheets (name -> text) into an import document, the same shape export.py produces.
+      personnel:     id, name, wage
+      work_packages: id, name, description, start_date, end_date, status, users (user ids split by ';')
+      tasks:         id, name, description, start_date, end_date, status, work_package, users
+      deliverables:  name, description, deadline, work_package
+      budget:        work_package, user, month, contribution
+    Ids are only references inside the import, any text works.
+    """
+    unknown = set(sheets) - set(CSV_SHEETS)
+    if unknown:
+        raise ImportValidationError([{"section": name, "error": "Unknown sheet."} for name in sorted(unknown)])
+    rows = {name: list(csv.DictReader(io.StringIO(sheets.get(name, '')))) for name in CSV_SHEETS}
+
+    def refs(value):
+        return [ref.strip() for ref in (value or '').split(';') if ref.strip()]
+
+    def pick(row, *keys):
+        return {key: _blank_to_none(row.get(key)) for key in keys}
+
+    return {
+        "users": [pick(r, 'id', 'name', 'wage') for r in rows['personnel']],
+        "work_packages": [pick(r, 'id', 'name', 'description', 'start_date', 'end_date', 'status') for r in rows['work_packages']],
+        "work_package_users": [[r.get('id'), ref] for r in rows['work_packages'] for ref in refs(r.get('users'))],
+        "tasks": [pick(r, 'id', 'name', 'description', 'start_date', 'end_date', 'status', 'work_package') for r in rows['tasks']],
+        "task_users": [[r.get('id'), ref] for r in rows['tasks'] for ref in refs(r.get('users'))],
+        "deliverables": [pick(r, 'name', 'description', 'deadline', 'work_package') for r in rows['deliverables']],
+        "budget_entries": [[r.get('work_package'), r.get('user'), r.get('month'), r.get('contribution')] for r in rows['budget']],
+    }
+
+
+class ProjectImport:
+    """
+    Validates a whole import document in memory (fields, references, month ranges, task staff being
+    WP staff, nobody above 1.0 in a month) and then writes it with bulk inserts in one transaction.
+    Personnel is matched by name against the lead's existing users, so names must be unique in the document;
+    unknown names are created, matched ones keep their budget on the lead's other projects, which counts towards the 1.0.
+    """
+
+    def __init__(self, document):
+        self.document = document
+        self.errors = []
+        self.project = None
+        self.existing = {}  # name -> the lead's User the import's personnel of that name maps to
+        self.users = {}  # ref -> User
+        self.work_packages = {}  # ref -> WorkPackage
+        self.tasks = {}  # ref -> Task
+        self.deliverables = []
+        self.wp_users = set()  # (wp ref, user ref)
+        self.task_users = set()  # (task ref, user ref)
+        self.budget = {}  # (wp ref, user ref, month) -> Decimal
+
+    def error(self, section, index, error):
+        self.errors.append({"section": section, "index": index, "error": error})
+
+    def rows(self, section):
+        rows = self.document.get(section) or []
+        if not isinstance(rows, list):
+            self.error(section, None, "Must be a list.")
+            return []
+        return rows
+
+    def clean(self, section, index, instance, exclude):
+        try:
+            instance.full_clean(exclude=exclude, validate_unique=False)
+            return True
+        except ValidationError as e:
+            self.error(section, index, e.message_dict)
+            return False
+
+    def collect(self, section, index, row, target, build, exclude):
+        # one referable row: a dict with an id that is unique in its section
+        if not isinstance(row, dict):
+            self.error(section, index, "Must be an object.")
+            return None
+        ref = row.get('id')
+        if ref in (None, ''):
+            self.error(section, index, "id is required.")
+            return None
+        ref = str(ref)
+        if ref in target:
+            self.error(section, index, f"Duplicate id {ref}.")
+            return None
+        instance = build(row)
+        if self.clean(section, index, instance, exclude):
+            target[ref] = instance
+            return instance
+        return None
+
+    def pairs(self, section, left, right, target):
+        for index, pair in enumerate(self.rows(section)):
+            if not isinstance(pair, (list, tuple)) or len(pair) != 2:
+                self.error(section, index, "Must be a [id, user id] pair.")
+                continue
+            a, b = str(pair[0]), str(pair[1])
+            if a not in left or b not in right:
+                self.error(section, index, f"Unknown reference {pair}.")
+                continue
+            target.add((a, b))
+
+    def validate(self, owner, name=None, start_date=None):
+        if not isinstance(self.document, dict):
+            raise ImportValidationError([{"section": None, "index": None, "error": "Import must be a JSON object."}])
+        if self.document.get('format', EXPORT_FORMAT) != EXPORT_FORMAT:
+            raise ImportValidationError([{"section": "format", "index": None, "error": "Unknown document format."}])
+
+        header = self.document.get('project') or {}
+        if not isinstance(header, dict):
+            self.error('project', None, "Must be an object.")
+        else:
+            project = Project(owner=owner, name=name or header.get('name'), start_date=start_date or header.get('start_date'))
+            if self.clean('project', None, project, ['owner']):
+                self.project = project
+
+        names = set()
+        for index, row in enumerate(self.rows('users')):
+            user = self.collect('users', index, row, self.users,
+                                lambda r: User(name=r.get('name'), wage=r.get('wage')), ['project_lead'])
+            # personnel is matched by name, two rows of one name would be one person
+            if user is not None and user.name in names:
+                self.error('users', index, f"Duplicate name {user.name}.")
+            elif user is not None:
+                names.add(user.name)
+
+        for index, row in enumerate(self.rows('work_packages')):
+            wp = self.collect('work_packages', index, row, self.work_packages, lambda r: WorkPackage(
+                name=r.get('name'), description=_blank_to_none(r.get('description')),
+                start_date=r.get('start_date'), end_date=r.get('end_date'), status=r.get('status') or 'active',
+            ), ['project'])
+            if wp is not None and wp.start_date > wp.end_date:
+                self.error('work_packages', index, "WorkPackage cannot end before it starts.")
+        self.pairs('work_package_users', self.work_packages, self.users, self.wp_users)
+
+        task_wp = {}
+        for index, row in enumerate(self.rows('tasks')):
+            task = self.collect('tasks', index, row, self.tasks, lambda r: Task(
+                name=r.get('name'), description=_blank_to_none(r.get('description')),
+                start_date=r.get('start_date'), end_date=r.get('end_date'), status=r.get('status') or 'active',
+            ), ['work_package'])
+            if task is None:
+                continue
+            wp = self.work_packages.get(str(row.get('work_package')))
+            if wp is None:
+                self.error('tasks', index, "WorkPackage not found.")
+            elif task.start_date > task.end_date or task.start_date < wp.start_date or task.end_date > wp.end_date:
+                self.error('tasks', index, "Task weeks cannot exceed WorkPackage weeks.")
+            else:
+                task_wp[str(row['id'])] = str(row.get('work_package'))
+        self.pairs('task_users', self.tasks, self.users, self.task_users)
+        for task_ref, user_ref in self.task_users:
+            if task_ref in task_wp and (task_wp[task_ref], user_ref) not in self.wp_users:
+                self.error('task_users', None, f"User {self.users[user_ref].name} is not part of the WorkPackage of task {task_ref}.")
+
+        for index, row in enumerate(self.rows('deliverables')):
+            if not isinstance(row, dict):
+                self.error('deliverables', index, "Must be an object.")
+                continue
+            deliverable = Deliverable(name=row.get('name'), description=_blank_to_none(row.get('description')),
+                                      deadline=_blank_to_none(row.get('deadline')))
+            if not self.clean('deliverables', index, deliverable, ['work_package']):
+                continue
+            wp = self.work_packages.get(str(row.get('work_package')))
+            if wp is None:
+                self.error('deliverables', index, "WorkPackage not found.")
+            elif deliverable.deadline is not None and not wp.start_date <= deliverable.deadline <= wp.end_date:
+                self.error('deliverables', index, "Deliverable deadline cannot exceed WorkPackage months.")
+            else:
+                self.deliverables.append((deliverable, str(row.get('work_package'))))
+
+        self.validate_budget()
+
+        for user in User.objects.filter(project_lead=owner, name__in={u.name for u in self.users.values()}).order_by('id'):
+            self.existing.setdefault(user.name, user)
+        if not self.errors:
+            self.validate_capacity()
+
+        if self.errors:
+            raise ImportValidationError(self.errors)
+
+    def validate_budget(self):
+        load = defaultdict(Decimal)
+        for index, row in enumerate(self.rows('budget_entries')):
+            if isinstance(row, dict):
+                row = [row.get('work_package'), row.get('user'), row.get('month'), row.get('contribution')]
+            if not isinstance(row, (list, tuple)) or len(row) != 4:
+                self.error('budget_entries', index, "Must be [work package id, user id, month, contribution].")
+                continue
+            wp_ref, user_ref = str(row[0]), str(row[1])
+            entry = BudgetEntry(month=row[2], contribution=row[3])
+            if not self.clean('budget_entries', index, entry, ['work_package', 'user']):
+                continue
+            wp = self.work_packages.get(wp_ref)
+            if wp is None or user_ref not in self.users:
+                self.error('budget_entries', index, "Unknown work package or user.")
+            elif not wp.start_date <= entry.month <= wp.end_date:
+                self.error('budget_entries', index, "Budget month is outside the WorkPackage months.")
+            elif (wp_ref, user_ref, entry.month) in self.budget:
+                self.error('budget_entries', index, "Duplicate budget cell.")
+            else:
+                self.budget[(wp_ref, user_ref, entry.month)] = entry.contribution
+                load[(user_ref, entry.month)] += entry.contribution
+
+        for (user_ref, month), total in sorted(load.items()):
+            if total > 1:
+                self.error('budget_entries', None, f"{self.users[user_ref].name} is allocated {total} in month {month}, more than 1.0.")
+
+    def validate_capacity(self):
+        # the document alone is within 1.0 (validate_budget), existing users add what the lead's live projects give them
+        start = self.project.start_date
+        matched = {ref: self.existing[user.name].id for ref, user in self.users.items() if user.name in self.existing}
+        cells = [(matched[user_ref], calendar_month(start, month), hundredths(contribution))
+                 for (_, user_ref, month), contribution in self.budget.items() if user_ref in matched]
+        if not cells:
+            return
+        totals = (BudgetEntry.objects.filter(user_id__in=set(matched.values()), work_package__project__deleted_at__isnull=True)
+                  .values_list('user_id', 'work_package__project__start_date', 'month').annotate(total=Sum('contribution')).order_by())
+        cells.extend((user_id, calendar_month(project_start, month), hundredths(total)) for user_id, project_start, month, total in totals)
+
+        months = [month for _, month, _ in cells]
+        matrix = AllocationMatrix(set(matched.values()), min(months), max(months))
+        for user_id, month, amount in cells:
+            matrix.add(user_id, month, amount)
+        # only the import's months are reported, older overbookings elsewhere don't block it
+        touched = {(matched[user_ref], calendar_month(start, month)) for _, user_ref, month in self.budget if user_ref in matched}
+        names = {user_id: self.users[ref].name for ref, user_id in matched.items()}
+        offset = calendar_month(start, 1) - 1
+        for user_id, month, total in matrix.over_capacity():
+            if (user_id, month) in touched:
+                allocated = (Decimal(total) / FULL_TIME).quantize(Decimal('0.01'))
+                self.error('budget_entries', None,
+                           f"{names[user_id]} is allocated {allocated} in month {month - offset} across all projects, more than 1.0.")
+
+    @transaction.atomic
+    def save(self):
+        project = self.project
+        owner = project.owner
+        project.save()
+
+        with batch_writes(project):
+            existing = dict(self.existing)
+            new_users = []
+            for ref, user in self.users.items():
+                if user.name in existing:
+                    self.users[ref] = existing[user.name]
+                else:
+                    user.project_lead = owner
+                    existing[user.name] = user
+                    new_users.append(user)
+            bulk_create_with_ids(User, new_users)
+
+            for wp in self.work_packages.values():
+                wp.project = project
+            bulk_create_with_ids(WorkPackage, list(self.work_packages.values()))
+            WorkPackage.users.through.objects.bulk_create([
+                WorkPackage.users.through(workpackage_id=self.work_packages[wp].id, user_id=self.users[user].id)
+                for wp, user in self.wp_users
+            ], batch_size=BULK_BATCH_SIZE)
+
+            task_wp = {str(row['id']): str(row['work_package']) for row in self.rows('tasks')}
+            for ref, task in self.tasks.items():
+                task.work_package = self.work_packages[task_wp[ref]]
+            bulk_create_with_ids(Task, list(self.tasks.values()))
+            Task.users.through.objects.bulk_create([
+                Task.users.through(task_id=self.tasks[task].id, user_id=self.users[user].id)
+                for task, user in self.task_users
+            ], batch_size=BULK_BATCH_SIZE)
+
+            for deliverable, wp_ref in self.deliverables:
+                deliverable.work_package = self.work_packages[wp_ref]
+            Deliverable.objects.bulk_create([d for d, _ in self.deliverables], batch_size=BULK_BATCH_SIZE)
+
+            BudgetEntry.objects.bulk_create([
+                BudgetEntry(work_package=self.work_packages[wp], user=self.users[user], month=month, contribution=contribution)
+                for (wp, user, month), contribution in self.budget.items()
+            ], batch_size=BULK_BATCH_SIZE)
+
+        if new_users:
+            touch_personnel(owner.pk)
+
+        return project, {
+            "users_created": len(new_users),
+            "work_packages": len(self.work_packages),
+            "tasks": len(self.tasks),
+            "deliverables": len(self.deliverables),
+            "budget_entries": len(self.budget),
+        }
+
+
+def import_project(document, owner, name=None, start_date=None):
+    """Validate then write a project document. Raises ImportValidationError, nothing is written in that case."""
+    project_import = ProjectImport(document)
+    project_import.validate(owner, name=name, start_date=start_date)
+    return project_import.save()
@@ -0,0 +1,158 @@
+import logging
+import tempfile
+from datetime import timedelta
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db.models import F
+from django.utils import timezone
+
+from .budget import BudgetValidationError, apply_budget_changes, parse_budget_changes
+from .export import stream_project_export
+from .importer import ImportValidationError, ProjectImport
+from .models import Job, Project
+from .purge import purge_project
+from .serializers import ProjectSerializer
+
+logger = logging.getLogger(__name__)
+
+# kind -> function(job) returning the job's result, registered with @job_handler
+JOB_HANDLERS = {}
+# a job running longer than this is taken as left behind by a dead worker (see fail_stale_jobs)
+STALE_AFTER = timedelta(hours=1)
+# where export jobs write their documents in the default storage, served by jobs/<id>/download/
+EXPORT_DIR = 'exports'
+
+
+class JobFailed(Exception):
+    """Raised by a handler for an expected failure. The message (and `details`, if any) is what the owner sees."""
+
+    def __init__(self, message, details=None):
+        super().__init__(message)
+        self.details = details
+
+
+def job_handler(kind):
+    def register(handler):
+        JOB_HANDLERS[kind] = handler
+        return handler
+    return register
+
+
+def enqueue(owner, kind, **payload):
+    """Queue a job of a registered kind; the payload has to be JSON (DjangoJSONEncoder) serializable."""
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind {kind}.")
+    return Job.objects.create(owner=owner, kind=kind, payload=payload)
+
+
+def claim_job():
+    """
+    Mark the oldest queued job running and return it, None when the queue is empty. The claim is a
+    conditional UPDATE, so two workers never get the same job, without row locks sqlite doesn't have.
+    """
+    while True:
+        job_id = Job.objects.filter(status='queued').order_by('id').values_list('id', flat=True).first()
+        if job_id is None:
+            return None
+        if Job.objects.filter(id=job_id, status='queued').update(status='running', started_at=timezone.now()):
+            return Job.objects.get(id=job_id)
+
+
+def report_progress(job, progress, total=None):
+    """
+    Store how far a running job is, one UPDATE that the jobs/<id>/ endpoint reads. Written inside a
+    transaction it only shows once that commits, so handlers report between their transactions.
+    """
+    job.progress = progress
+    job.total = job.total if total is None else total
+    Job.objects.filter(id=job.id).update(progress=job.progress, total=job.total)
+
+
+def run_job(job):
+    """Run a claimed job with its handler and store the result or the error."""
+    try:
+        result = JOB_HANDLERS[job.kind](job)
+    except JobFailed as e:
+        Job.objects.filter(id=job.id).update(status='failed', error=str(e), result={"details": e.details} if e.details else None,
+                                             finished_at=timezone.now())
+        return False
+    except Exception:
+        logger.exception("Job %s (%s) failed", job.id, job.kind)
+        Job.objects.filter(id=job.id).update(status='failed', error="The job failed unexpectedly.", finished_at=timezone.now())
+        return False
+    Job.objects.filter(id=job.id).update(status='done', result=result, progress=F('total'), finished_at=timezone.now())
+    return True
+
+
+def fail_stale_jobs(older_than):
+    """
+    Mark running jobs started more than `older_than` (a timedelta) ago failed: their worker died. They are
+    not run again, deleting or importing twice is worse than asking the owner to retry.
+    """
+    return Job.objects.filter(status='running', started_at__lt=timezone.now() - older_than).update(
+        status='failed', error="The worker stopped before the job finished, please try again.", finished_at=timezone.now())
+
+
+def _owned_project(job):
+    try:
+        return Project.objects.get(id=job.payload['project'], owner=job.owner)
+    except Project.DoesNotExist:
+        raise JobFailed("Project not found or not yours.")
+
+
+@job_handler('delete_project')
+def delete_project(job):
+    # the API soft-deletes the project before queueing this, so it is looked up among the deleted ones too
+    try:
+        project = Project.all_objects.get(id=job.payload['project'], owner=job.owner)
+    except Project.DoesNotExist:
+        raise JobFailed("Project not found or not yours.")
+    # one step per committed chunk of PURGE_CHUNK_SIZE work packages
+    deleted = purge_project(project, progress=lambda done, total: report_progress(job, done, total))
+    return {"message": "Project deleted successfully!", "deleted_rows": deleted}
+
+
+@job_handler('save_budget')
+def save_budget(job):
+    # payload: project, data ({"wp_user_month": contribution}), replace (POST) or not (PATCH)
+    project = _owned_project(job)
+    replace = job.payload.get('replace', False)
+    report_progress(job, 0, 2)
+    try:
+        changes = parse_budget_changes(job.payload['data'], project, job.owner, replace=replace)
+    except BudgetValidationError as e:
+        raise JobFailed("Failed to save some budget entries. Please check the data and try again.", e.errors)
+    report_progress(job, 1)
+    counts = apply_budget_changes(project, changes, replace=replace)
+    if replace:
+        return {"message": "Budget saved successfully!", "saved_entries": sum(1 for c in changes.values() if c is not None), **counts}
+    return {"message": "Budget updated successfully!", **counts}
+
+
+@job_handler('import_project')
+def import_project_job(job):
+    # payload: document (JSON, CSV sheets are converted before queueing), name, start_date.
+    # Two steps: the validation, then the save, one transaction whose inserts only show once it commits.
+    report_progress(job, 0, 2)
+    project_import = ProjectImport(job.payload['document'])
+    try:
+        project_import.validate(job.owner, name=job.payload.get('name'), start_date=job.payload.get('start_date'))
+    except ImportValidationError as e:
+        raise JobFailed("Import failed, nothing was saved. Please check the data.", e.errors)
+    report_progress(job, 1)
+    project, counts = project_import.save()
+    return {"message": "Project imported successfully!", "project": ProjectSerializer(project).data, **counts}
+
+
+@job_handler('export_project')
+def export_project(job):
+    # the document is streamed to a file in the default storage, the result only names it;
+    # one step per section of the export
+    project = _owned_project(job)
+    with tempfile.TemporaryFile() as document:
+        for chunk in stream_project_export(project, progress=lambda done, total: report_progress(job, done, total)):
+            document.write(chunk.encode())
+        size = document.tell()
+        name = default_storage.save(f'{EXPORT_DIR}/project-{project.id}-job-{job.id}.json', File(document))
+    return {"message": "Project exported successfully!", "file": name, "size": size}
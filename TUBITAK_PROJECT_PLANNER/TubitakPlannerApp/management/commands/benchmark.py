@@ -0,0 +1,247 @@
+import contextlib
+import datetime
+import io
+import json
+import logging
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import django
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from TubitakPlannerApp import urls
+from TubitakPlannerApp.jobs import claim_job, enqueue, run_job
+from TubitakPlannerApp.models import ProjectLeadUser, User, Task, Deliverable, BudgetEntry, WorkPackageDependency, TaskDependency
+from TubitakPlannerApp.synthetic import generate_project
+
+
+def endpoint_requests(ctx):
+    """
+    route in TubitakPlannerApp/urls.py -> requests to time, as (method, url, body).
+    A body may be a callable taking the iteration number, for requests that must differ every time.
+    Writes send unchanged data so every iteration sees the same project.
+    """
+    project, wp, task, deliverable, person, entry = ctx['project'], ctx['wp'], ctx['task'], ctx['deliverable'], ctx['user'], ctx['entry']
+    wp_body = {'name': wp.name, 'description': wp.description, 'start_date': wp.start_date, 'end_date': wp.end_date,
+               'status': wp.status, 'users': list(wp.users.values_list('id', flat=True))}
+    task_body = {'name': task.name, 'description': task.description, 'start_date': task.start_date, 'end_date': task.end_date,
+                 'status': task.status, 'users': list(task.users.values_list('id', flat=True)), 'work_package': task.work_package_id}
+    cell = {f"{entry.work_package_id}_{entry.user_id}_{entry.month}": str(entry.contribution)}
+    return {
+        'users/': [('GET', 'users/', None)],
+        'users/<int:id>/': [('GET', f'users/{person.id}/', None), ('PUT', f'users/{person.id}/', {'name': person.name, 'wage': str(person.wage)})],
+        'workpackages/': [('GET', 'workpackages/', None)],
+        'workpackages/dependencies/': [('GET', 'workpackages/dependencies/', None)],
+        # a small random project may have no links, the route is then reported as unmeasured
+        'workpackages/dependencies/<int:id>/': [('GET', f"workpackages/dependencies/{ctx['wp_link'].id}/", None)] if ctx['wp_link'] else [],
+        'workpackages/batch/': [('POST', 'workpackages/batch/', {'update': [{'id': wp.id, 'name': wp.name}]})],
+        'workpackages/<int:id>/': [('GET', f'workpackages/{wp.id}/', None), ('PUT', f'workpackages/{wp.id}/', wp_body)],
+        'tasks/': [('GET', 'tasks/', None), ('GET', 'tasks/?limit=100&fields=id,name,start_date,end_date,work_package', None),
+                   ('GET', 'tasks/?from_month=12&to_month=14', None)],
+        'tasks/dependencies/': [('GET', 'tasks/dependencies/', None)],
+        'tasks/dependencies/<int:id>/': [('GET', f"tasks/dependencies/{ctx['task_link'].id}/", None)] if ctx['task_link'] else [],
+        'tasks/batch/': [('POST', 'tasks/batch/', {'update': [{'id': task.id, 'name': task.name}]})],
+        'tasks/<int:id>/': [('GET', f'tasks/{task.id}/', None), ('PUT', f'tasks/{task.id}/', task_body)],
+        'projects/': [('GET', 'projects/', None)],
+        'projects/import/': [('POST', 'projects/import/', lambda i: {
+            'project': {'name': f'Imported {i}', 'start_date': '2024-01-01'},
+            'users': [{'id': 1, 'name': person.name, 'wage': str(person.wage)}],
+            'work_packages': [{'id': 1, 'name': 'Imported WP', 'start_date': 1, 'end_date': 12}],
+            'work_package_users': [[1, 1]],
+            'tasks': [{'id': 1, 'name': 'Imported task', 'start_date': 1, 'end_date': 6, 'work_package': 1}],
+            'task_users': [[1, 1]],
+            'deliverables': [{'name': 'Imported deliverable', 'deadline': 12, 'work_package': 1}],
+            'budget_entries': [[1, 1, month, '0.10'] for month in range(1, 13)],
+        })],
+        'projects/<int:id>/': [('GET', f'projects/{project.id}/', None)],
+        'projects/<int:id>/snapshot/': [('GET', f'projects/{project.id}/snapshot/', None)],
+        'projects/<int:id>/export/': [('GET', f'projects/{project.id}/export/', None), ('POST', f'projects/{project.id}/export/', None)],
+        'projects/<int:id>/gantt/': [('GET', f'projects/{project.id}/gantt/', None),
+                                      ('GET', f'projects/{project.id}/gantt/?status=active&from=2026-01-01&to=2026-06-30', None)],
+        'projects/<int:id>/events/': [('GET', f'projects/{project.id}/events/', None)],
+        'projects/<int:id>/schedule/': [('GET', f'projects/{project.id}/schedule/', None)],
+        'projects/<int:id>/reschedule/': [('POST', f'projects/{project.id}/reschedule/',
+                                           {'work_package': wp.id, 'start_date': wp.start_date, 'end_date': wp.end_date})],
+        'deliverables/': [('GET', 'deliverables/', None)],
+        'deliverables/batch/': [('POST', 'deliverables/batch/', {'update': [{'id': deliverable.id, 'name': deliverable.name}]})],
+        'deliverables/<int:id>/': [('GET', f'deliverables/{deliverable.id}/', None)],
+        'budget/': [('GET', 'budget/', None), ('GET', 'budget/?from_month=12&to_month=14', None),
+                    ('GET', 'budget/?format=columns', None), ('GET', f'budget/?format=dense&wp={wp.id}&from_month=1&to_month=12', None),
+                    ('PATCH', 'budget/', cell)],
+        'budget/segments/': [('GET', 'budget/segments/', None), ('PATCH', 'budget/segments/', {'segments': [
+            {'work_package': entry.work_package_id, 'user': entry.user_id, 'start_month': entry.month, 'end_month': entry.month,
+             'contribution': str(entry.contribution)}]})],
+        'budget/summary/': [('GET', 'budget/summary/', None)],
+        'jobs/<int:id>/': [('GET', f"jobs/{ctx['job'].id}/", None)],
+        'jobs/<int:id>/download/': [('GET', f"jobs/{ctx['job'].id}/download/", None)],
+        'portfolio/workload/': [('GET', 'portfolio/workload/', None), ('GET', 'portfolio/workload/?from=2026-01&to=2026-12', None)],
+        'token/': [('POST', 'token/', {'username': ctx['lead'].username, 'password': ctx['password']})],
+        'token/refresh/': [('POST', 'token/refresh/', {'refresh': ctx['refresh']})],
+        'token/verify/': [('POST', 'token/verify/', {'token': ctx['access']})],
+        'register/': [('POST', 'register/', lambda i: {'username': f'bench{i}', 'email': f'bench{i}@example.com', 'password': 'x', 'password_confirm': 'x'})],
+    }
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every endpoint of TubitakPlannerApp/urls.py in-process against a synthetic project "
+        "in a throwaway test database. Reports p50/p95 latency, queries per request and peak memory as JSON. "
+        "The response cache is cleared before every timed request unless --warm is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--work-packages', type=int, default=50)
+        parser.add_argument('--tasks', type=int, default=2000)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--months', type=int, default=60)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeat', type=int, default=20, help="Timed requests per endpoint.")
+        parser.add_argument('--warm', action='store_true',
+                            help="Keep the response cache between timed requests, so cached reads are measured as hits. "
+                                 "By default it is cleared before each one.")
+        parser.add_argument('--output', help="Where to write the JSON results (default: benchmark-<timestamp>.json).")
+        parser.add_argument('--compare', help="Earlier results file to print the differences against.")
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError("--repeat must be at least 1.")
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+
+        logging.getLogger('TubitakPlannerApp.metrics').setLevel(logging.WARNING)
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            # views may print (registerProjectLead does), keep that out of the report; export files are thrown away too
+            with contextlib.redirect_stdout(io.StringIO()), tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media):
+                results = self.run_benchmark(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            "meta": {
+                "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "django": django.get_version(),
+                "python": platform.python_version(),
+                "database": connection.vendor,
+                **{key: options[key] for key in ('work_packages', 'tasks', 'users', 'months', 'seed', 'repeat', 'warm')},
+            },
+            "results": results,
+        }
+        output = options['output'] or f"benchmark-{datetime.datetime.now():%Y%m%d-%H%M%S}.json"
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+        self.print_table(results, baseline['results'] if baseline else {})
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output}"))
+
+    def run_benchmark(self, options):
+        password = 'benchmark'
+        lead = ProjectLeadUser.objects.create_user(username='benchmark', email='benchmark@example.com', password=password)
+        started = time.perf_counter()
+        project = generate_project(
+            lead, 'Benchmark project',
+            work_packages=options['work_packages'], tasks=options['tasks'],
+            users=options['users'], months=options['months'], seed=options['seed'],
+        )
+        self.stdout.write(f"Generated project in {time.perf_counter() - started:.1f}s")
+
+        refresh = RefreshToken.for_user(lead)
+        ctx = {
+            'lead': lead, 'password': password, 'project': project,
+            'refresh': str(refresh), 'access': str(refresh.access_token),
+            'wp': project.work_packages.order_by('id').first(),
+            'task': Task.objects.filter(work_package__project=project).order_by('id').first(),
+            'deliverable': Deliverable.objects.filter(work_package__project=project).order_by('id').first(),
+            'user': User.objects.filter(project_lead=lead).order_by('id').first(),
+            'entry': BudgetEntry.objects.filter(work_package__project=project).order_by('id').first(),
+            'wp_link': WorkPackageDependency.objects.filter(successor__project=project).order_by('id').first(),
+            'task_link': TaskDependency.objects.filter(successor__work_package__project=project).order_by('id').first(),
+            'job': enqueue(lead, 'export_project', project=project.id),
+        }
+        run_job(claim_job())  # a done export, so its file can be downloaded
+        client = Client(HTTP_AUTHORIZATION=f"Bearer {ctx['access']}", HTTP_X_PROJECT_ID=str(project.id))
+        specs = endpoint_requests(ctx)
+
+        for pattern in urls.urlpatterns:
+            if str(pattern.pattern) not in specs:
+                self.stderr.write(f"No benchmark request defined for {pattern.pattern}, skipped.")
+            elif not specs[str(pattern.pattern)]:
+                self.stderr.write(f"The synthetic project has no row for {pattern.pattern}, unmeasured.")
+
+        results = {}
+        iteration = 0
+        for route, requests in specs.items():
+            for method, url, body in requests:
+                def send():
+                    nonlocal iteration
+                    iteration += 1
+                    data = body(iteration) if callable(body) else body
+                    kwargs = {'data': json.dumps(data), 'content_type': 'application/json'} if data is not None else {}
+                    response = getattr(client, method.lower())(f'/{url}', **kwargs)
+                    # streamed responses are only produced while they are read, an event stream up to its first event
+                    if response.streaming and response['Content-Type'] == 'text/event-stream':
+                        response.body = next(iter(response.streaming_content))
+                        response.close()
+                    else:
+                        response.body = b''.join(response.streaming_content) if response.streaming else response.content
+                    return response
+
+                response = send()  # warm up
+                if response.status_code >= 400:
+                    self.stderr.write(f"{method} /{url} answered {response.status_code}: {response.body[:200]!r}")
+
+                timings, queries = [], []
+                for _ in range(options['repeat']):
+                    if not options['warm']:
+                        caches['responses'].clear()
+                    with CaptureQueriesContext(connection) as ctx_queries:
+                        start = time.perf_counter()
+                        send()
+                        timings.append((time.perf_counter() - start) * 1000)
+                    queries.append(len(ctx_queries))
+
+                # memory is measured on a separate request, tracemalloc would distort the timings
+                if not options['warm']:
+                    caches['responses'].clear()
+                tracemalloc.start()
+                send()
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+                query = url.partition('?')[2]
+                results[f"{method} {route}" + (f" ?{query}" if query else "")] = {
+                    "p50_ms": round(statistics.median(timings), 3),
+                    "p95_ms": round(percentile(timings, 95), 3),
+                    "mean_ms": round(statistics.fmean(timings), 3),
+                    "queries": max(queries),
+                    "peak_kb": round(peak / 1024, 1),
+                    "response_bytes": len(response.body),
+                }
+        return results
+
+    def print_table(self, results, baseline):
+        self.stdout.write(f"{'endpoint':<40} {'p50 ms':>9} {'p95 ms':>9} {'queries':>8} {'peak KB':>10}")
+        for name, row in results.items():
+            line = f"{name:<40} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['queries']:>8} {row['peak_kb']:>10.1f}"
+            old = baseline.get(name)
+            if old:
+                change = (row['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100 if old['p50_ms'] else 0.0
+                line += f"   p50 {change:+.0f}%, queries {row['queries'] - old['queries']:+d}"
+            self.stdout.write(line)
@@ -0,0 +1,128 @@
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import include, path
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from TubitakPlannerApp import urls, views
+from TubitakPlannerApp.models import ProjectLeadUser
+from TubitakPlannerApp.synthetic import generate_project
+
+# async view -> the sync view it replaced, the WSGI path is benchmarked with these
+SYNC_VIEWS = {
+    views.userAsyncApi: views.userApi,
+    views.workPackageAsyncApi: views.workPackageApi,
+    views.taskAsyncApi: views.taskApi,
+    views.deliverableAsyncApi: views.deliverableApi,
+    views.budgetEntryAsyncApi: views.budgetEntryApi,
+    views.projectDetailAsyncApi: views.projectDetailApi,
+}
+
+
+class SyncUrls:
+    """The app's URLconf with every async read view swapped back to its sync view."""
+    urlpatterns = [path('', include([
+        path(str(pattern.pattern), SYNC_VIEWS.get(pattern.callback, pattern.callback), name=pattern.name)
+        for pattern in urls.urlpatterns
+    ]))]
+
+
+def endpoint_urls(project):
+    return ['users/', 'workpackages/', 'tasks/', 'deliverables/', 'budget/', f'projects/{project.id}/']
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare requests/sec of the async read endpoints under ASGI with their sync views under WSGI, "
+        "at the same number of concurrent requests, in-process against a synthetic project in a throwaway "
+        "test database. The WSGI side is a thread pool of sync Clients, the ASGI side AsyncClients on one event loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--work-packages', type=int, default=20)
+        parser.add_argument('--tasks', type=int, default=200)
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--months', type=int, default=36)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--concurrency', type=int, default=16, help="Requests in flight at once.")
+        parser.add_argument('--requests', type=int, default=200, help="Requests per endpoint and path.")
+        parser.add_argument('--output', help="Also write the JSON results to this file.")
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError("--concurrency and --requests must be at least 1.")
+
+        logging.getLogger('TubitakPlannerApp.metrics').setLevel(logging.WARNING)
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                results = self.run_benchmark(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({"meta": {key: options[key] for key in ('concurrency', 'requests', 'tasks', 'seed')},
+                           "results": results}, f, indent=2)
+
+        self.stdout.write(f"{'endpoint':<24} {'wsgi req/s':>11} {'asgi req/s':>11} {'change':>8}")
+        for url, row in results.items():
+            change = (row['asgi_rps'] - row['wsgi_rps']) / row['wsgi_rps'] * 100 if row['wsgi_rps'] else 0.0
+            self.stdout.write(f"{url:<24} {row['wsgi_rps']:>11.1f} {row['asgi_rps']:>11.1f} {change:>+7.0f}%")
+
+    def run_benchmark(self, options):
+        lead = ProjectLeadUser.objects.create_user(username='benchmark', email='benchmark@example.com', password='benchmark')
+        project = generate_project(
+            lead, 'Benchmark project',
+            work_packages=options['work_packages'], tasks=options['tasks'],
+            users=options['users'], months=options['months'], seed=options['seed'],
+        )
+        headers = {'Authorization': f"Bearer {RefreshToken.for_user(lead).access_token}", 'X-Project-Id': str(project.id)}
+
+        results = {}
+        for url in endpoint_urls(project):
+            with override_settings(ROOT_URLCONF=SyncUrls):
+                wsgi = self.run_wsgi(f'/{url}', headers, options['concurrency'], options['requests'])
+            asgi = asyncio.run(self.run_asgi(f'/{url}', headers, options['concurrency'], options['requests']))
+            results[url] = {"wsgi_rps": round(wsgi, 1), "asgi_rps": round(asgi, 1)}
+        return results
+
+    def run_wsgi(self, url, headers, concurrency, count):
+        client = Client(headers=headers)
+
+        def send(_):
+            response = client.get(url)
+            if response.status_code != 200:
+                raise CommandError(f"WSGI GET {url} answered {response.status_code}: {response.content[:200]!r}")
+
+        send(0)  # warm up
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            start = time.perf_counter()
+            list(pool.map(send, range(count)))
+            return count / (time.perf_counter() - start)
+
+    async def run_asgi(self, url, headers, concurrency, count):
+        client = AsyncClient()
+        slots = asyncio.Semaphore(concurrency)
+
+        async def send():
+            async with slots:
+                response = await client.get(url, headers=headers)
+            if response.status_code != 200:
+                raise CommandError(f"ASGI GET {url} answered {response.status_code}: {response.content[:200]!r}")
+
+        await send()  # warm up
+        start = time.perf_counter()
+        await asyncio.gather(*(send() for _ in range(count)))
+        return count / (time.perf_counter() - start)
@@ -0,0 +1,86 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from TubitakPlannerApp.models import ProjectLeadUser, User, WorkPackage, Task
+from TubitakPlannerApp.rows import ValueRows
+from TubitakPlannerApp.serializers import UserSerializer, WorkPackageSerializer, TaskSerializer
+from TubitakPlannerApp.synthetic import generate_project
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class Command(BaseCommand):
+    help = (
+        "Per-row cost of the list reads: ModelSerializer instances (the old path) against values() rows (rows.py), "
+        "each including its queries, plus the JSON encoding of the result. Runs on a synthetic project in a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--work-packages', type=int, default=50)
+        parser.add_argument('--tasks', type=int, default=2000)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--months', type=int, default=60)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError("--repeat must be at least 1.")
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.run_benchmark(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def timed(self, repeat, func):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings), result
+
+    def run_benchmark(self, options):
+        lead = ProjectLeadUser.objects.create_user(username='benchmark', email='benchmark@example.com', password='benchmark')
+        project = generate_project(
+            lead, 'Benchmark project',
+            work_packages=options['work_packages'], tasks=options['tasks'],
+            users=options['users'], months=options['months'], seed=options['seed'],
+        )
+        lists = [
+            ('users', UserSerializer, User.objects.filter(project_lead=lead)),
+            ('work_packages', WorkPackageSerializer, WorkPackage.objects.filter(project=project).prefetch_related('users')),
+            ('tasks', TaskSerializer, Task.objects.filter(work_package__project=project).prefetch_related('users')),
+        ]
+
+        header = f"{'list':<14} {'rows':>6} {'serializer us/row':>18} {'values us/row':>14} {'speedup':>8} {'json us/row':>12}"
+        if orjson is not None:
+            header += f" {'orjson us/row':>14}"
+        self.stdout.write(header)
+        for name, serializer_class, queryset in lists:
+            queryset = queryset.order_by('id')
+            serializer_time, expected = self.timed(options['repeat'], lambda: serializer_class(queryset.all(), many=True).data)
+            value_rows = ValueRows(serializer_class)
+            values_time, rows = self.timed(options['repeat'], lambda: value_rows.rows(list(value_rows.values(queryset))))
+            json_time, body = self.timed(options['repeat'], lambda: json.dumps(rows, cls=DjangoJSONEncoder))
+            if body != json.dumps(expected, cls=DjangoJSONEncoder):
+                self.stderr.write(f"{name}: values() rows differ from the serializer output.")
+
+            count = max(len(rows), 1)
+            line = (f"{name:<14} {len(rows):>6} {serializer_time / count * 1e6:>18.2f} {values_time / count * 1e6:>14.2f} "
+                    f"{serializer_time / values_time if values_time else 0:>7.1f}x {json_time / count * 1e6:>12.2f}")
+            if orjson is not None:
+                orjson_time, _ = self.timed(options['repeat'], lambda: orjson.dumps(rows))
+                line += f" {orjson_time / count * 1e6:>14.2f}"
+            self.stdout.write(line)
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from TubitakPlannerApp.models import ProjectLeadUser
+from TubitakPlannerApp.synthetic import generate_project
+
+
+class Command(BaseCommand):
+    help = "Generate a synthetic project of a given size with bulk inserts (for load testing)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lead', default='synthetic', help="Username of the owning project lead, created if missing.")
+        parser.add_argument('--name', default='Synthetic project')
+        parser.add_argument('--work-packages', type=int, default=50)
+        parser.add_argument('--tasks', type=int, default=2000)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--months', type=int, default=60)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if min(options['work_packages'], options['users'], options['months']) < 1:
+            raise CommandError("--work-packages, --users and --months must be at least 1.")
+
+        lead, created = ProjectLeadUser.objects.get_or_create(
+            username=options['lead'], defaults={'email': f"{options['lead']}@example.com"},
+        )
+        if created:
+            lead.set_password(options['lead'])
+            lead.save()
+
+        project = generate_project(
+            lead, options['name'],
+            work_packages=options['work_packages'], tasks=options['tasks'],
+            users=options['users'], months=options['months'], seed=options['seed'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Created project {project.id} ({project.name}) for {lead.username}."))
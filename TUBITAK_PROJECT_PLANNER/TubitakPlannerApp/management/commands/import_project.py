@@ -0,0 +1,46 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from TubitakPlannerApp.importer import CSV_SHEETS, ImportValidationError, document_from_csv, import_project
+from TubitakPlannerApp.models import ProjectLeadUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a project from an export document (JSON file) or from a directory of CSV sheets "
+        f"({', '.join(name + '.csv' for name in CSV_SHEETS)}). Everything is validated before anything is written."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help="JSON export file or directory with CSV sheets.")
+        parser.add_argument('--lead', required=True, help="Username of the project lead that will own the project.")
+        parser.add_argument('--name', help="Project name, defaults to the name in the document.")
+        parser.add_argument('--start-date', help="Project start date (YYYY-MM-DD), defaults to the one in the document.")
+
+    def handle(self, *args, **options):
+        try:
+            owner = ProjectLeadUser.objects.get(username=options['lead'])
+        except ProjectLeadUser.DoesNotExist:
+            raise CommandError(f"Project lead {options['lead']} does not exist.")
+
+        source = Path(options['source'])
+        if source.is_dir():
+            document = document_from_csv({
+                name: (source / f'{name}.csv').read_text(encoding='utf-8-sig')
+                for name in CSV_SHEETS if (source / f'{name}.csv').exists()
+            })
+        else:
+            with source.open(encoding='utf-8') as f:
+                document = json.load(f)
+
+        try:
+            project, counts = import_project(document, owner, name=options['name'], start_date=options['start_date'])
+        except ImportValidationError as e:
+            for error in e.errors:
+                self.stderr.write(json.dumps(error, default=str))
+            raise CommandError("Import failed, nothing was saved.")
+
+        summary = ', '.join(f"{value} {key.replace('_', ' ')}" for key, value in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Imported project {project.id} ({project.name}): {summary}."))
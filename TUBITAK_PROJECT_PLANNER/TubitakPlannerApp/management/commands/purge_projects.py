@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from TubitakPlannerApp.models import Project
+from TubitakPlannerApp.purge import purge_project
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the rows of soft-deleted projects (DELETE projects/<id>/?async=1) whose purge job "
+        "did not run, failed or stopped midway. Each chunk of a project's work packages is deleted in its own transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only list the projects that would be purged.")
+
+    def handle(self, *args, **options):
+        projects = list(Project.all_objects.filter(deleted_at__isnull=False).order_by('id'))
+        deleted = 0
+        for project in projects:
+            if options['dry_run']:
+                self.stdout.write(f"Project {project.id} ({project.name}), deleted at {project.deleted_at:%Y-%m-%d %H:%M}.")
+            else:
+                deleted += purge_project(project)
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"{len(projects)} project(s) would be purged."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{len(projects)} project(s) purged, {deleted} rows deleted."))
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from TubitakPlannerApp.models import Project, WorkPackage, WorkPackageSummary, ProjectSummary
+from TubitakPlannerApp.summary import WORK_PACKAGE_FIELDS, PROJECT_FIELDS, project_summaries, save_summaries, work_package_summaries
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the work package and project summaries from the base tables and overwrite the rows that drifted "
+        "(e.g. after raw SQL, a restored backup or a bulk path that skipped the signals)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', type=int, action='append', help="Only this project id (repeatable).")
+        parser.add_argument('--batch-size', type=int, default=100, help="Projects recomputed per transaction.")
+        parser.add_argument('--dry-run', action='store_true', help="Only report the drift.")
+
+    def handle(self, *args, **options):
+        project_ids = Project.objects.order_by('id').values_list('id', flat=True)
+        if options['project']:
+            project_ids = project_ids.filter(id__in=options['project'])
+        project_ids = list(project_ids)
+        size = max(options['batch_size'], 1)
+
+        drifted = {WorkPackageSummary: 0, ProjectSummary: 0}
+        for i in range(0, len(project_ids), size):
+            batch = project_ids[i:i + size]
+            with transaction.atomic():
+                # the project rows roll up the WP rows, so those are corrected first (and rolled back on --dry-run)
+                for model, fields, summaries, rows in (
+                    (WorkPackageSummary, WORK_PACKAGE_FIELDS, work_package_summaries, WorkPackage.objects.filter(project_id__in=batch)),
+                    (ProjectSummary, PROJECT_FIELDS, project_summaries, Project.objects.filter(id__in=batch)),
+                ):
+                    stored = {row.pop('pk'): row for row in model.objects.filter(pk__in=rows.values('pk')).values('pk', *fields)}
+                    changed = [summary for summary in summaries(rows)
+                               if stored.get(summary.pk) != {field: getattr(summary, field) for field in fields}]
+                    drifted[model] += len(changed)
+                    save_summaries(changed)
+                if options['dry_run']:
+                    transaction.set_rollback(True)
+
+        verb = "would be corrected" if options['dry_run'] else "corrected"
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(project_ids)} project(s) checked: {drifted[WorkPackageSummary]} work package and "
+            f"{drifted[ProjectSummary]} project summaries {verb}."
+        ))
@@ -0,0 +1,45 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from TubitakPlannerApp.jobs import STALE_AFTER, claim_job, fail_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the background jobs the API queued with ?async=1 (project deletes, budget saves, imports, exports), "
+        "one at a time, polling the database. Start as many workers as the database can take."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Exit once the queue is empty instead of polling.")
+        parser.add_argument('--sleep', type=float, default=1.0, help="Seconds between polls of an empty queue.")
+        parser.add_argument('--stale-after', type=int, default=int(STALE_AFTER.total_seconds()),
+                            help="Seconds after which a running job is taken as left behind by a dead worker and failed.")
+
+    def handle(self, *args, **options):
+        stale_after = timedelta(seconds=options['stale_after'])
+        done = failed = 0
+        try:
+            while True:
+                close_old_connections()
+                stale = fail_stale_jobs(stale_after)
+                if stale:
+                    self.stderr.write(f"{stale} job(s) left running by a stopped worker marked failed.")
+                job = claim_job()
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['sleep'])
+                    continue
+                if run_job(job):
+                    done += 1
+                    self.stdout.write(f"Job {job.id} ({job.kind}) done.")
+                else:
+                    failed += 1
+                    self.stderr.write(f"Job {job.id} ({job.kind}) failed.")
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"{done} job(s) done, {failed} failed."))
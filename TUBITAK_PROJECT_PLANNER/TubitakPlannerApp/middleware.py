@@ -0,0 +1,98 @@
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import connections
+
+logger = logging.getLogger('TubitakPlannerApp.metrics')
+
+
+class QueryTimer:
+    """execute_wrapper that counts queries and sums their time."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class RequestMetricsMiddleware:
+    """
+    Measures every request and reports it in a Server-Timing header and one JSON log line:
+      db        number of queries and time spent in the database
+      serialize time spent in the view outside the database (serializers, validation, JSON encoding)
+      total     time from this middleware to the response (URL resolving, view decorators, view)
+    Keep it last in MIDDLEWARE so the time after process_view is the view alone.
+    """
+
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timer = request._query_timer = QueryTimer()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            self.wrap_connections(stack, timer)
+            response = self.get_response(request)
+        return self.report(request, response, timer, start)
+
+    async def __acall__(self, request):
+        # under ASGI the ORM runs in the request's sync thread, the wrappers have to be installed there
+        timer = request._query_timer = QueryTimer()
+        start = time.perf_counter()
+        stack = ExitStack()
+        await sync_to_async(self.wrap_connections)(stack, timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.report(request, response, timer, start)
+
+    @staticmethod
+    def wrap_connections(stack, timer):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(timer))
+
+    def report(self, request, response, timer, start):
+        end = time.perf_counter()
+
+        serialize = 0.0
+        if hasattr(request, '_view_started'):
+            view_start, view_db_start = request._view_started
+            serialize = max((end - view_start) - (timer.duration - view_db_start), 0.0)
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={timer.duration * 1000:.2f};desc="{timer.count} queries"',
+            f'serialize;dur={serialize * 1000:.2f}',
+            f'total;dur={(end - start) * 1000:.2f}',
+        ])
+        logger.info(json.dumps({
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "queries": timer.count,
+            "db_ms": round(timer.duration * 1000, 2),
+            "serialize_ms": round(serialize * 1000, 2),
+            "total_ms": round((end - start) * 1000, 2),
+        }))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._view_started = (time.perf_counter(), request._query_timer.duration)
+        return None
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TubitakPlannerApp', '0012_user_project_lead'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='version',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='projectleaduser',
+            name='personnel_version',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
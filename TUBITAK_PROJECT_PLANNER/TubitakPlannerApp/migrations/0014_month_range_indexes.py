@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TubitakPlannerApp', '0013_project_version_projectleaduser_personnel_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='budgetentry',
+            index=models.Index(fields=['work_package', 'month'], name='budgetentry_month_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deliverable',
+            index=models.Index(fields=['work_package', 'deadline'], name='deliverable_deadline_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['work_package', 'start_date', 'end_date'], name='task_months_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workpackage',
+            index=models.Index(fields=['project', 'start_date', 'end_date'], name='workpackage_months_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TubitakPlannerApp', '0014_month_range_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskDependency',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('lag', models.IntegerField(default=0)),
+                ('predecessor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='successor_links', to='TubitakPlannerApp.task')),
+                ('successor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='predecessor_links', to='TubitakPlannerApp.task')),
+            ],
+            options={
+                'unique_together': {('predecessor', 'successor')},
+            },
+        ),
+        migrations.CreateModel(
+            name='WorkPackageDependency',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('lag', models.IntegerField(default=0)),
+                ('predecessor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='successor_links', to='TubitakPlannerApp.workpackage')),
+                ('successor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='predecessor_links', to='TubitakPlannerApp.workpackage')),
+            ],
+            options={
+                'unique_together': {('predecessor', 'successor')},
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TubitakPlannerApp', '0015_dependencies'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectSummary',
+            fields=[
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='TubitakPlannerApp.project')),
+                ('work_package_count', models.IntegerField(default=0)),
+                ('task_count', models.IntegerField(default=0)),
+                ('deliverable_count', models.IntegerField(default=0)),
+                ('start_month', models.IntegerField(null=True)),
+                ('end_month', models.IntegerField(null=True)),
+                ('person_months', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('cost', models.DecimalField(decimal_places=4, default=0, max_digits=18)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='WorkPackageSummary',
+            fields=[
+                ('work_package', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='TubitakPlannerApp.workpackage')),
+                ('task_count', models.IntegerField(default=0)),
+                ('deliverable_count', models.IntegerField(default=0)),
+                ('person_months', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('cost', models.DecimalField(decimal_places=4, default=0, max_digits=18)),
+            ],
+        ),
+    ]
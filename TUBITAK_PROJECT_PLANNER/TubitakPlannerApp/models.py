@@ -1,8 +1,35 @@
 from django.db import models
+from django.db.models import F
+from django.core.serializers.json import DjangoJSONEncoder
 from django.contrib.auth.models import AbstractUser
 
-class ProjectLeadUser(AbstractUser):
+
+class VersionCounterMixin:
+    """
+    Keeps `version_field` out of regular saves so a stale instance can never move it backwards.
+    The counter is only ever changed by bump_version, which runs UPDATE ... SET field = field + 1.
+    """
+    version_field = 'version'
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name != self.version_field
+            ]
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def bump_version(cls, **filters):
+        cls._default_manager.filter(**filters).update(**{cls.version_field: F(cls.version_field) + 1})
+
+
+class ProjectLeadUser(VersionCounterMixin, AbstractUser):
     email = models.EmailField(unique=True)
+    # bumped on every change to the lead's personnel, used as ETag of the users list
+    personnel_version = models.BigIntegerField(default=0)
+    version_field = 'personnel_version'
+
     def __str__(self):
         return self.username
 
@@ -34,6 +61,10 @@ class WorkPackage(models.Model):
     project = models.ForeignKey('Project', on_delete=models.CASCADE, related_name='work_packages')
     users = models.ManyToManyField(User, related_name='work_packages')
 
+    class Meta:
+        # month range (overlap) filters of the list endpoints
+        indexes = [models.Index(fields=['project', 'start_date', 'end_date'], name='workpackage_months_idx')]
+
     def __str__(self):
         return self.name
 
@@ -55,16 +86,32 @@ class Task(models.Model):
     users = models.ManyToManyField(User, related_name='tasks')
     work_package = models.ForeignKey(WorkPackage, on_delete=models.CASCADE, related_name='tasks')
 
+    class Meta:
+        indexes = [models.Index(fields=['work_package', 'start_date', 'end_date'], name='task_months_idx')]
+
     def __str__(self):
         return self.name
 
 
-class Project(models.Model):
+class LiveProjectManager(models.Manager):
+    # soft-deleted projects are gone for the API right away, their rows wait for the purge (see purge.py)
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
+class Project(VersionCounterMixin, models.Model):
     id = models.AutoField(primary_key=True)
     owner = models.ForeignKey(ProjectLeadUser, on_delete=models.CASCADE, related_name='projects')
     name = models.CharField(max_length=255)
     start_date = models.DateField()
     created_at = models.DateTimeField(auto_now_add=True)
+    # bumped on every write to the project's WPs, tasks, deliverables or budget, used as ETag of reads
+    version = models.BigIntegerField(default=0)
+    # set by a soft delete, the project is purged later by a background job
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    objects = LiveProjectManager()
+    all_objects = models.Manager()
     class Mega:
         unique_together = ('owner', 'name')
 
@@ -79,6 +126,31 @@ class Deliverable(models.Model) :
     deadline = models.IntegerField(null=True, blank=True)
     work_package = models.ForeignKey(WorkPackage, on_delete=models.CASCADE, related_name='deliverables')    
 
+    class Meta:
+        indexes = [models.Index(fields=['work_package', 'deadline'], name='deliverable_deadline_idx')]
+
+class WorkPackageDependency(models.Model):
+    # finish-to-start: the successor starts at the earliest `lag` months after the month the predecessor ends
+    id = models.AutoField(primary_key=True)
+    predecessor = models.ForeignKey(WorkPackage, on_delete=models.CASCADE, related_name='successor_links')
+    successor = models.ForeignKey(WorkPackage, on_delete=models.CASCADE, related_name='predecessor_links')
+    lag = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('predecessor', 'successor')
+
+
+class TaskDependency(models.Model):
+    # same rule as WorkPackageDependency, between tasks (also of different work packages)
+    id = models.AutoField(primary_key=True)
+    predecessor = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='successor_links')
+    successor = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='predecessor_links')
+    lag = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('predecessor', 'successor')
+
+
 class BudgetEntry(models.Model):
     id = models.AutoField(primary_key=True)
     work_package = models.ForeignKey(WorkPackage, on_delete=models.CASCADE, related_name='budget_entries')
@@ -88,6 +160,59 @@ class BudgetEntry(models.Model):
 
     class Meta:
         unique_together = ('work_package', 'user', 'month')
+        indexes = [models.Index(fields=['work_package', 'month'], name='budgetentry_month_idx')]
+
+    def __str__(self):
+        return f"{self.work_package.name} - {self.user.name} - Month {self.month}: {self.contribution}"
+
+# HEADLINE NUMBERS kept next to the rows they summarize, so lists don't aggregate on every read.
+# The receivers in signals.py add each write's difference in its own transaction (summary.py),
+# `manage.py rebuild_summaries` reconciles drift. cost is sum(contribution * wage), kept exact.
+class WorkPackageSummary(models.Model):
+    work_package = models.OneToOneField(WorkPackage, on_delete=models.CASCADE, primary_key=True, related_name='summary')
+    task_count = models.IntegerField(default=0)
+    deliverable_count = models.IntegerField(default=0)
+    person_months = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    cost = models.DecimalField(max_digits=18, decimal_places=4, default=0)
+
+
+class ProjectSummary(models.Model):
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, primary_key=True, related_name='summary')
+    work_package_count = models.IntegerField(default=0)
+    task_count = models.IntegerField(default=0)
+    deliverable_count = models.IntegerField(default=0)
+    # first and last project month of the work packages, null while there are none
+    start_month = models.IntegerField(null=True)
+    end_month = models.IntegerField(null=True)
+    person_months = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    cost = models.DecimalField(max_digits=18, decimal_places=4, default=0)
+
+
+# BACKGROUND JOBS: heavy operations the API queues instead of running them in the request (?async=1),
+# picked up by `manage.py run_jobs`. The database is the queue, see jobs.py.
+class Job(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    id = models.AutoField(primary_key=True)
+    owner = models.ForeignKey(ProjectLeadUser, on_delete=models.CASCADE, related_name='jobs')
+    kind = models.CharField(max_length=50)
+    status = models.CharField(max_length=7, choices=STATUS_CHOICES, default='queued')
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    # `progress` of `total` steps done, reported by the running job
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'id'], name='job_queue_idx')]
 
     def __str__(self):
-        return f"{self.work_package.name} - {self.user.name} - Month {self.month}: {self.contribution}"
\ No newline at end of file
+        return f"{self.kind} #{self.id} ({self.status})"
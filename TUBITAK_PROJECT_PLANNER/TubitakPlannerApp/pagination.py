@@ -0,0 +1,132 @@
+import base64
+import json
+
+from django.db.models import F, Q
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class PaginationError(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise PaginationError("Invalid cursor.")
+    if not isinstance(values, list) or len(values) != size:
+        raise PaginationError("Invalid cursor.")
+    return values
+
+
+def order_by_keys(queryset, keys):
+    """`keys` is a list of (field, nullable); nullable fields sort their NULLs last on every backend."""
+    return queryset.order_by(*(F(field).asc(nulls_last=True) if nullable else field for field, nullable in keys))
+
+
+def _after(keys, values):
+    # rows strictly after `values` in the (nulls last) key order
+    condition = Q(pk__in=[])
+    equal = Q()
+    for (field, nullable), value in zip(keys, values):
+        if value is None:
+            greater = Q(pk__in=[])  # nothing sorts after NULL
+            same = Q(**{f'{field}__isnull': True})
+        else:
+            greater = Q(**{f'{field}__gt': value})
+            if nullable:
+                greater |= Q(**{f'{field}__isnull': True})
+            same = Q(**{field: value})
+        condition |= equal & greater
+        equal &= same
+    return condition
+
+
+def _page_queryset(queryset, keys, cursor, limit):
+    try:
+        limit = int(limit) if limit not in (None, '') else DEFAULT_PAGE_SIZE
+    except ValueError:
+        raise PaginationError("limit must be a number.")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise PaginationError(f"limit must be between 1 and {MAX_PAGE_SIZE}.")
+
+    queryset = order_by_keys(queryset, keys)
+    if cursor:
+        try:
+            queryset = queryset.filter(_after(keys, decode_cursor(cursor, len(keys))))
+        except (ValueError, TypeError):
+            raise PaginationError("Invalid cursor.")
+    return queryset[:limit + 1], limit
+
+
+def _page_result(rows, keys, limit):
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor([last[field] if isinstance(last, dict) else getattr(last, field) for field, _ in keys])
+
+
+def paginate(queryset, keys, cursor=None, limit=None):
+    """
+    Keyset (cursor) pagination over `keys`, which must end with a unique field such as id.
+    Returns (rows, next cursor or None). Every page is one indexed range query, however deep.
+    """
+    queryset, limit = _page_queryset(queryset, keys, cursor, limit)
+    return _page_result(list(queryset), keys, limit)
+
+
+async def apaginate(queryset, keys, cursor=None, limit=None):
+    """paginate() for async views, the page is read with the async ORM."""
+    queryset, limit = _page_queryset(queryset, keys, cursor, limit)
+    return _page_result([row async for row in queryset], keys, limit)
+
+
+def month_range(params):
+    """Parse ?from_month=&to_month= (inclusive, either may be left out) into (from, to), None when neither is given."""
+    bounds = []
+    for name in ('from_month', 'to_month'):
+        value = params.get(name)
+        try:
+            bounds.append(int(value) if value not in (None, '') else None)
+        except ValueError:
+            raise PaginationError(f"{name} must be a number.")
+    if bounds == [None, None]:
+        return None
+    if None not in bounds and bounds[0] > bounds[1]:
+        raise PaginationError("from_month cannot be after to_month.")
+    return tuple(bounds)
+
+
+def overlapping(queryset, months, start_field, end_field=None):
+    """
+    Rows whose [start_field, end_field] months overlap `months` (a month_range() result).
+    Both bounds are plain range conditions, so the (parent, start, end) indexes serve them.
+    """
+    if months is None:
+        return queryset
+    from_month, to_month = months
+    end_field = end_field or start_field
+    filters = {}
+    if from_month is not None:
+        filters[f'{end_field}__gte'] = from_month
+    if to_month is not None:
+        filters[f'{start_field}__lte'] = to_month
+    return queryset.filter(**filters)
+
+
+def requested_fields(fields_param, serializer_class):
+    """Parse ?fields=a,b into a list of serializer fields, None when the parameter is missing."""
+    if not fields_param:
+        return None
+    fields = [name.strip() for name in fields_param.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in serializer_class.Meta.fields]
+    if unknown:
+        raise PaginationError(f"Unknown field(s): {', '.join(unknown)}.")
+    return fields
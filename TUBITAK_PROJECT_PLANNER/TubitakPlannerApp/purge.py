@@ -0,0 +1,107 @@
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .events import publish
+from .models import (Project, WorkPackage, Task, Deliverable, BudgetEntry, WorkPackageDependency, TaskDependency,
+                     WorkPackageSummary, ProjectSummary)
+from .signals import batch_writes
+
+# work packages whose rows are deleted per round of statements, keeps the IN lists and each statement's work bounded
+PURGE_CHUNK_SIZE = 100
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def _column(model, field):
+    return connection.ops.quote_name(model._meta.get_field(field).column)
+
+
+def _delete(model, where, params):
+    # a plain DELETE ... WHERE through the cursor: no rows are loaded and no per-row signals are sent, which
+    # the callers make up for (batch_writes() or the project being gone). QuerySet.delete() would load the
+    # rows of every model that has delete receivers, which most of these have.
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {_table(model)} WHERE {where}", params)
+        return cursor.rowcount
+
+
+def delete_work_package_rows(work_package_ids):
+    """
+    Delete work packages and everything that hangs off them with set-based statements, children first,
+    `PURGE_CHUNK_SIZE` WPs at a time. Nothing is loaded into memory and no signals are sent.
+    Call it inside a transaction. Returns the number of deleted rows.
+    """
+    work_package_ids = list(work_package_ids)
+    deleted = 0
+    for i in range(0, len(work_package_ids), PURGE_CHUNK_SIZE):
+        chunk = work_package_ids[i:i + PURGE_CHUNK_SIZE]
+        ids = ', '.join(['%s'] * len(chunk))
+
+        def of_chunk(model, field):
+            return f"{_column(model, field)} IN ({ids})"
+
+        # the chunk's tasks as a subquery of another table, which every backend (MySQL too) deletes by
+        tasks = f"SELECT {_column(Task, 'id')} FROM {_table(Task)} WHERE {of_chunk(Task, 'work_package')}"
+        for model, where, params in (
+            # links may cross into WPs that stay, either end going removes the link
+            (TaskDependency, f"{_column(TaskDependency, 'predecessor')} IN ({tasks}) OR {_column(TaskDependency, 'successor')} IN ({tasks})",
+             chunk * 2),
+            (WorkPackageDependency, f"{of_chunk(WorkPackageDependency, 'predecessor')} OR {of_chunk(WorkPackageDependency, 'successor')}",
+             chunk * 2),
+            (Task.users.through, f"{_column(Task.users.through, 'task')} IN ({tasks})", chunk),
+            (WorkPackage.users.through, of_chunk(WorkPackage.users.through, 'workpackage'), chunk),
+            (BudgetEntry, of_chunk(BudgetEntry, 'work_package'), chunk),
+            (Deliverable, of_chunk(Deliverable, 'work_package'), chunk),
+            (Task, of_chunk(Task, 'work_package'), chunk),
+            (WorkPackageSummary, of_chunk(WorkPackageSummary, 'work_package'), chunk),
+            (WorkPackage, of_chunk(WorkPackage, 'id'), chunk),
+        ):
+            deleted += _delete(model, where, params)
+    return deleted
+
+
+def purge_work_packages(project, work_package_ids):
+    """
+    Delete some of a project's WPs with delete_work_package_rows() in one transaction. The project is
+    touched, its summary rolled up and a "deleted" event sent per WP, as a regular delete would do.
+    """
+    work_package_ids = list(WorkPackage.objects.filter(project=project, id__in=work_package_ids).values_list('id', flat=True))
+    with transaction.atomic(), batch_writes(project, work_package_ids=()):
+        deleted = delete_work_package_rows(work_package_ids)
+        for wp_id in work_package_ids:
+            publish(project.id, {"type": "work_package", "action": "deleted", "id": wp_id, "data": {"id": wp_id}})
+    return deleted
+
+
+def soft_delete_project(project):
+    """Hide a project from every read right away (Project.objects skips it); purge_project() removes its rows later."""
+    Project.all_objects.filter(id=project.id).update(deleted_at=timezone.now())
+    publish(project.id, {"type": "project", "action": "deleted"})
+
+
+def purge_project(project, progress=None):
+    """
+    Delete a project with all of its rows, set-based and chunked by work package instead of Django's
+    collector, which loads every row of the project first. The project is soft-deleted first, so each
+    chunk commits on its own without a half-deleted project ever showing; a purge that stops midway is
+    finished by `manage.py purge_projects`. `progress(done, total)` is called after every committed
+    chunk. Returns the number of deleted rows.
+    """
+    if project.deleted_at is None:
+        soft_delete_project(project)
+    work_package_ids = list(WorkPackage.objects.filter(project_id=project.id).values_list('id', flat=True))
+    chunks = [work_package_ids[i:i + PURGE_CHUNK_SIZE] for i in range(0, len(work_package_ids), PURGE_CHUNK_SIZE)]
+    deleted = 0
+    for done, chunk in enumerate(chunks, start=1):
+        with transaction.atomic():
+            deleted += delete_work_package_rows(chunk)
+        if progress is not None:
+            progress(done, len(chunks) + 1)
+    with transaction.atomic():
+        deleted += _delete(ProjectSummary, f"{_column(ProjectSummary, 'project')} = %s", [project.id])
+        deleted += _delete(Project, f"{_column(Project, 'id')} = %s", [project.id])
+    if progress is not None:
+        progress(len(chunks) + 1, len(chunks) + 1)
+    return deleted
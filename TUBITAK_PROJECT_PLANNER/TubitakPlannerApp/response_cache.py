@@ -0,0 +1,55 @@
+import hashlib
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+RESPONSE_CACHE_ALIAS = 'responses'
+
+
+def response_cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', RESPONSE_CACHE_ALIAS)]
+
+
+def cache_key(project, request):
+    """
+    (project, endpoint, query params) of a read. The key also holds Project.version, which the signal
+    receivers bump on every post_save, post_delete and m2m_changed of the project's rows (see signals.py),
+    so a write makes every older entry of that project unreachable and nothing else. created_at tells
+    apart a project that reuses the id of a deleted one.
+    """
+    params = hashlib.sha1(urlencode(sorted(request.GET.lists()), doseq=True).encode()).hexdigest()
+    return f"resp:{project.id}.{project.created_at.timestamp():.6f}.{project.version}:{request.path}:{params}"
+
+
+def _cached(body):
+    response = HttpResponse(body, content_type='application/json')
+    response['X-Cache'] = 'hit'
+    return response
+
+
+def cached_json(project, request, render):
+    """Rendered JSON bytes of a project read from the cache, or render() stored for the next reader (200s only)."""
+    cache = response_cache()
+    key = cache_key(project, request)
+    body = cache.get(key)
+    if body is not None:
+        return _cached(body)
+    response = render()
+    if response.status_code == 200:
+        cache.set(key, response.content)
+    return response
+
+
+async def acached_json(project, request, render):
+    """cached_json() for async views, render is a coroutine function."""
+    cache = response_cache()
+    key = cache_key(project, request)
+    body = await cache.aget(key)
+    if body is not None:
+        return _cached(body)
+    response = await render()
+    if response.status_code == 200:
+        await cache.aset(key, response.content)
+    return response
@@ -0,0 +1,216 @@
+from collections import defaultdict, deque
+
+from django.db import transaction
+
+from .budget import BULK_BATCH_SIZE
+from .models import WorkPackage, Task, Deliverable, WorkPackageDependency, TaskDependency
+from .signals import batch_writes
+
+WORK_PACKAGE = 'work_package'
+TASK = 'task'
+
+
+def _label(node):
+    kind, item_id = node
+    return f"{'WorkPackage' if kind == WORK_PACKAGE else 'Task'} {item_id}"
+
+
+class ScheduleError(Exception):
+    """Raised when a plan cannot be scheduled (dependency cycle, dates out of bounds). `errors` is a list of messages."""
+
+    def __init__(self, errors):
+        super().__init__("Invalid schedule.")
+        self.errors = errors
+
+
+class Plan:
+    """
+    The dated items of a project as a graph. Nodes are (WORK_PACKAGE, id) and (TASK, id) with
+    [start, end] months; edges are the finish-to-start dependencies plus work package -> task
+    containment, since tasks move together with their work package.
+    Every pass below visits each node and edge once, O(V + E).
+    """
+
+    def __init__(self, work_packages, tasks, deliverables, work_package_links, task_links):
+        self.dates = {}  # node -> [start, end]
+        self.parent = {}  # task node -> work package node
+        self.deliverables = {}  # id -> [deadline, work package node]
+        self.preds = defaultdict(list)  # node -> [(node, lag)]
+        self.succs = defaultdict(list)
+        for wp_id, start, end in work_packages:
+            self.dates[(WORK_PACKAGE, wp_id)] = [start, end]
+        for task_id, start, end, wp_id in tasks:
+            self.dates[(TASK, task_id)] = [start, end]
+            self.parent[(TASK, task_id)] = (WORK_PACKAGE, wp_id)
+        for deliverable_id, deadline, wp_id in deliverables:
+            self.deliverables[deliverable_id] = [deadline, (WORK_PACKAGE, wp_id)]
+        for kind, links in ((WORK_PACKAGE, work_package_links), (TASK, task_links)):
+            for predecessor, successor, lag in links:
+                self.link((kind, predecessor), (kind, successor), lag)
+
+    @classmethod
+    def load(cls, project):
+        return cls(
+            WorkPackage.objects.filter(project=project).values_list('id', 'start_date', 'end_date'),
+            Task.objects.filter(work_package__project=project).values_list('id', 'start_date', 'end_date', 'work_package'),
+            Deliverable.objects.filter(work_package__project=project).values_list('id', 'deadline', 'work_package'),
+            WorkPackageDependency.objects.filter(successor__project=project).values_list('predecessor', 'successor', 'lag'),
+            TaskDependency.objects.filter(successor__work_package__project=project).values_list('predecessor', 'successor', 'lag'),
+        )
+
+    def link(self, predecessor, successor, lag):
+        self.preds[successor].append((predecessor, lag))
+        self.succs[predecessor].append((successor, lag))
+
+    def children(self):
+        children = defaultdict(list)
+        for task, wp in self.parent.items():
+            children[wp].append(task)
+        return children
+
+    def order(self):
+        """Topological order of the nodes (Kahn), parents before their tasks. Raises ScheduleError on a cycle."""
+        children = self.children()
+        incoming = {node: len(self.preds[node]) + (node in self.parent) for node in self.dates}
+        queue = deque(sorted(node for node, count in incoming.items() if count == 0))
+        order = []
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            for successor in [s for s, _ in self.succs[node]] + children[node]:
+                incoming[successor] -= 1
+                if incoming[successor] == 0:
+                    queue.append(successor)
+        if len(order) != len(self.dates):
+            raise ScheduleError(["The dependencies contain a cycle."])
+        return order
+
+    def critical_path(self):
+        """
+        Critical path method with the planned starts as start-no-earlier-than dates.
+        A task can slip inside its work package; a work package can slip as far as its own successors
+        and every one of its tasks allow. Returns (finish month, {node: timings}, critical nodes by start).
+        """
+        order = self.order()
+        children = self.children()
+        early = {}
+        for node in order:
+            start, end = self.dates[node]
+            es = start
+            if node in self.parent:
+                wp = self.parent[node]
+                es += early[wp][0] - self.dates[wp][0]  # moved with its work package
+            for predecessor, lag in self.preds[node]:
+                es = max(es, early[predecessor][1] + 1 + lag)
+            early[node] = (es, es + end - start)
+        finish = max((ef for _, ef in early.values()), default=0)
+
+        late, free = {}, {}
+        for node in reversed(order):
+            es, ef = early[node]
+            lf = finish
+            for successor, lag in self.succs[node]:
+                lf = min(lf, late[successor][0] - 1 - lag)
+            if node in self.parent:
+                free[node] = lf - ef  # delay possible if its work package moved along
+                lf = min(lf, early[self.parent[node]][1])
+            else:
+                lf = min([lf] + [ef + free[task] for task in children[node]])
+            late[node] = (lf - (ef - es), lf)
+
+        timings = {
+            node: {"es": early[node][0], "ef": early[node][1], "ls": late[node][0], "lf": late[node][1],
+                   "slack": late[node][1] - early[node][1]}
+            for node in order
+        }
+        position = {node: i for i, node in enumerate(order)}
+        critical = sorted((node for node in order if timings[node]["slack"] <= 0), key=lambda n: (early[n][0], position[n]))
+        return finish, timings, critical
+
+    def reschedule(self, root, start, end):
+        """
+        Move `root` to [start, end] and cascade: tasks and deliverables of a moved work package shift with it,
+        successors that would start too early are pushed later. Nothing is pulled earlier.
+        Returns ({node: (start, end)}, {deliverable id: deadline}) of what changed; raises ScheduleError
+        with every violated rule when the result does not fit.
+        """
+        if root not in self.dates:
+            raise ScheduleError([f"{_label(root)} not found."])
+        if start > end:
+            raise ScheduleError(["start_date cannot be after end_date."])
+
+        old = {node: tuple(dates) for node, dates in self.dates.items()}
+        new = dict(old)
+        new[root] = (start, end)
+        for node in self.order():
+            if node == root:
+                continue
+            s, e = new[node]
+            if node in self.parent:
+                wp = self.parent[node]
+                shift = new[wp][0] - old[wp][0]
+                s, e = s + shift, e + shift
+            if (s, e) == old[node] and all(new[p] == old[p] for p, _ in self.preds[node]):
+                continue  # not affected by the move
+            required = max((new[p][1] + 1 + lag for p, lag in self.preds[node]), default=s)
+            if required > s:
+                s, e = required, e + required - s
+            new[node] = (s, e)
+
+        deadlines = {}
+        for deliverable_id, (deadline, wp) in self.deliverables.items():
+            if deadline is not None:
+                deadlines[deliverable_id] = deadline + new[wp][0] - old[wp][0]
+
+        changed = {node: dates for node, dates in new.items() if dates != old[node]}
+        moved = {d: deadline for d, deadline in deadlines.items() if deadline != self.deliverables[d][0]}
+        self.check(new, deadlines, changed.keys() | {root}, moved.keys())
+        return changed, moved
+
+    def check(self, dates, deadlines, nodes, deliverables):
+        # only what the move touches is checked, older problems elsewhere in the plan don't block it
+        nodes = set(nodes) | {task for task, wp in self.parent.items() if wp in nodes}
+        deliverables = set(deliverables) | {d for d, (_, wp) in self.deliverables.items() if wp in nodes}
+        errors = []
+        for node in sorted(nodes):
+            start, end = dates[node]
+            if start < 1:
+                errors.append(f"{_label(node)} would start before month 1.")
+            wp = self.parent.get(node)
+            if wp is not None and not dates[wp][0] <= start <= end <= dates[wp][1]:
+                errors.append(f"{_label(node)} would no longer fit in {_label(wp)}.")
+            for predecessor, lag in self.preds[node]:
+                if start < dates[predecessor][1] + 1 + lag:
+                    errors.append(f"{_label(node)} would start before its predecessor {_label(predecessor)} allows.")
+        for deliverable_id in sorted(deliverables & deadlines.keys()):
+            deadline, wp = deadlines[deliverable_id], self.deliverables[deliverable_id][1]
+            if not dates[wp][0] <= deadline <= dates[wp][1]:
+                errors.append(f"Deliverable {deliverable_id} would no longer fit in {_label(wp)}.")
+        if errors:
+            raise ScheduleError(errors)
+
+
+def save_reschedule(project, changed, deadlines):
+    """
+    Write a reschedule with one bulk_update per model (per BULK_BATCH_SIZE rows).
+    Returns the updated (work packages, tasks, deliverables).
+    """
+    wp_dates = {item_id: dates for (kind, item_id), dates in changed.items() if kind == WORK_PACKAGE}
+    task_dates = {item_id: dates for (kind, item_id), dates in changed.items() if kind == TASK}
+    # only dates move, no WP summary changes (the project's month span is rolled up anyway)
+    with transaction.atomic(), batch_writes(project, work_package_ids=()):
+        work_packages = list(WorkPackage.objects.filter(id__in=wp_dates).prefetch_related('users'))
+        tasks = list(Task.objects.filter(id__in=task_dates).prefetch_related('users'))
+        deliverables = list(Deliverable.objects.filter(id__in=deadlines))
+        for rows, dates in ((work_packages, wp_dates), (tasks, task_dates)):
+            for row in rows:
+                row.start_date, row.end_date = dates[row.id]
+        for deliverable in deliverables:
+            deliverable.deadline = deadlines[deliverable.id]
+        if work_packages:
+            WorkPackage.objects.bulk_update(work_packages, ['start_date', 'end_date'], batch_size=BULK_BATCH_SIZE)
+        if tasks:
+            Task.objects.bulk_update(tasks, ['start_date', 'end_date'], batch_size=BULK_BATCH_SIZE)
+        if deliverables:
+            Deliverable.objects.bulk_update(deliverables, ['deadline'], batch_size=BULK_BATCH_SIZE)
+    return work_packages, tasks, deliverables
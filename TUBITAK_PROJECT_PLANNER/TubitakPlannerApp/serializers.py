@@ -1,5 +1,31 @@
 from rest_framework import serializers
-from TubitakPlannerApp.models import ProjectLeadUser, User, WorkPackage, Task, Project, Deliverable, BudgetEntry
+from rest_framework.relations import MANY_RELATION_KWARGS
+from TubitakPlannerApp.models import ProjectLeadUser, User, WorkPackage, Task, Project, Deliverable, BudgetEntry, WorkPackageDependency, TaskDependency, WorkPackageSummary, ProjectSummary, Job
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    # a list of primary keys is looked up with one query, not one per key
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        for pk in data:
+            if isinstance(pk, bool) or not isinstance(pk, int):
+                self.child_relation.fail('incorrect_type', data_type=type(pk).__name__)
+        found = self.child_relation.get_queryset().in_bulk(data)
+        for pk in data:
+            if pk not in found:
+                self.child_relation.fail('does_not_exist', pk_value=pk)
+        return [found[pk] for pk in data]
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        list_kwargs.update((key, value) for key, value in kwargs.items() if key in MANY_RELATION_KWARGS)
+        return BulkManyRelatedField(**list_kwargs)
+
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -11,6 +37,8 @@ class UserSerializer(serializers.ModelSerializer):
 
 
 class WorkPackageSerializer(serializers.ModelSerializer):
+    serializer_related_field = BulkPrimaryKeyRelatedField
+
     class Meta:
         model = WorkPackage
         fields = ('id',
@@ -24,6 +52,8 @@ class WorkPackageSerializer(serializers.ModelSerializer):
         
         
 class TaskSerializer(serializers.ModelSerializer):
+    serializer_related_field = BulkPrimaryKeyRelatedField
+
     class Meta:
         model = Task
         fields = ('id',
@@ -41,16 +71,82 @@ class ProjectSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'start_date']   
         read_only_fields = ['id']
         
+# headline numbers of summary.py, read only
+class WorkPackageSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WorkPackageSummary
+        fields = ('task_count', 'deliverable_count', 'person_months', 'cost')
+
+class ProjectSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ProjectSummary
+        fields = ('work_package_count', 'task_count', 'deliverable_count', 'start_month', 'end_month', 'person_months', 'cost')
+
+class ProjectListSerializer(ProjectSerializer):
+    # expects select_related('summary')
+    summary = ProjectSummarySerializer(read_only=True)
+
+    class Meta(ProjectSerializer.Meta):
+        fields = ProjectSerializer.Meta.fields + ['summary']
+
 class DeliverableSerializer(serializers.ModelSerializer):
     class Meta:
         model = Deliverable
         fields = ['id', 'name', 'description', 'deadline', 'work_package']
 
+class WorkPackageSnapshotSerializer(WorkPackageSerializer):
+    # nested read-only view, expects tasks/deliverables/users to be prefetched
+    tasks = TaskSerializer(many=True, read_only=True)
+    deliverables = DeliverableSerializer(many=True, read_only=True)
+
+    class Meta(WorkPackageSerializer.Meta):
+        fields = WorkPackageSerializer.Meta.fields + ('tasks', 'deliverables')
+
+# Item serializers for the batch endpoints. Related ids are plain integers so validating
+# a batch does not query once per row; batch.py checks them with set-based queries.
+class WorkPackageBatchSerializer(serializers.ModelSerializer):
+    users = serializers.ListField(child=serializers.IntegerField(), required=False)
+
+    class Meta:
+        model = WorkPackage
+        fields = ('name', 'description', 'start_date', 'end_date', 'status', 'users')
+
+class TaskBatchSerializer(serializers.ModelSerializer):
+    users = serializers.ListField(child=serializers.IntegerField(), required=False)
+    work_package = serializers.IntegerField()
+
+    class Meta:
+        model = Task
+        fields = ('name', 'description', 'start_date', 'end_date', 'status', 'users', 'work_package')
+
+class DeliverableBatchSerializer(serializers.ModelSerializer):
+    work_package = serializers.IntegerField()
+
+    class Meta:
+        model = Deliverable
+        fields = ('name', 'description', 'deadline', 'work_package')
+
+class WorkPackageDependencySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WorkPackageDependency
+        fields = ('id', 'predecessor', 'successor', 'lag')
+
+class TaskDependencySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TaskDependency
+        fields = ('id', 'predecessor', 'successor', 'lag')
+
 class BudgetEntrySerializer(serializers.ModelSerializer):
     class Meta:
         model = BudgetEntry
         fields = ('id', 'work_package', 'user', 'month', 'contribution')                     
 
+# status of a background job for jobs/<id>/, the payload stays on the server
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = ('id', 'kind', 'status', 'progress', 'total', 'result', 'error', 'created_at', 'started_at', 'finished_at')
+
 class ProjectLeadRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
     password_confirm = serializers.CharField(write_only=True)
@@ -0,0 +1,228 @@
+import threading
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.db.models.signals import post_init, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from .authentication import token_cache
+from .events import publish, publish_row
+from .models import ProjectLeadUser, Project, User, WorkPackage, Task, Deliverable, BudgetEntry, WorkPackageDependency, TaskDependency, WorkPackageSummary, ProjectSummary
+from .summary import add_budget, add_to_summaries, refresh_projects, roll_up
+
+_local = threading.local()
+
+
+def touch_projects(**filters):
+    """Record a write to the projects matching `filters`, e.g. touch_projects(id=3)."""
+    Project.bump_version(**filters)
+
+
+def touch_personnel(project_lead_id):
+    """Record a write to a lead's personnel; their projects embed user ids and wages so they are touched too."""
+    ProjectLeadUser.bump_version(pk=project_lead_id)
+    touch_projects(owner_id=project_lead_id)
+
+
+@contextmanager
+def batch_writes(project, event=None, work_package_ids=None):
+    """
+    For bulk write paths (bulk_create/bulk_update do not send signals anyway).
+    Silences the per-row receivers below and touches the project once when the block succeeds.
+    Call it inside the write transaction so the version moves together with the data.
+    `event` is what listeners of the project's change events get, by default a "changed" that makes them refetch.
+    The summaries of the WPs with an id in `work_package_ids` (all when None) and of the project are recomputed.
+    """
+    _local.depth = getattr(_local, 'depth', 0) + 1
+    try:
+        yield
+    finally:
+        _local.depth -= 1
+    touch_projects(id=project.id)
+    refresh_projects(work_package_ids, id=project.id)
+    publish(project.id, event or {"type": "project", "action": "changed"})
+
+
+def _batched():
+    return getattr(_local, 'depth', 0) > 0
+
+
+@receiver([post_save, post_delete], sender=ProjectLeadUser)
+def _project_lead_changed(sender, instance, **kwargs):
+    # covers deactivation and password changes, cached tokens of the lead must be validated again
+    token_cache.evict_user(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=WorkPackage)
+def _work_package_changed(sender, instance, **kwargs):
+    if not _batched():
+        touch_projects(id=instance.project_id)
+
+
+@receiver([post_save, post_delete], sender=Task)
+@receiver([post_save, post_delete], sender=Deliverable)
+@receiver([post_save, post_delete], sender=BudgetEntry)
+def _work_package_child_changed(sender, instance, **kwargs):
+    if not _batched():
+        touch_projects(work_packages=instance.work_package_id)
+
+
+@receiver([post_save, post_delete], sender=WorkPackageDependency)
+def _work_package_dependency_changed(sender, instance, **kwargs):
+    if not _batched():
+        touch_projects(work_packages=instance.successor_id)
+
+
+@receiver([post_save, post_delete], sender=TaskDependency)
+def _task_dependency_changed(sender, instance, **kwargs):
+    if not _batched():
+        touch_projects(work_packages__tasks=instance.successor_id)
+
+
+# CHANGE EVENTS of single rows for projects/<id>/events/ (see events.py)
+EVENT_TYPES = {WorkPackage: 'work_package', Task: 'task', Deliverable: 'deliverable', BudgetEntry: 'budget_entry'}
+
+
+@receiver(post_save, sender=WorkPackage)
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=Deliverable)
+@receiver(post_save, sender=BudgetEntry)
+def _row_saved(sender, instance, **kwargs):
+    if not _batched():
+        publish_row(EVENT_TYPES[sender], instance)
+
+
+@receiver(post_delete, sender=WorkPackage)
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Deliverable)
+@receiver(post_delete, sender=BudgetEntry)
+def _row_deleted(sender, instance, **kwargs):
+    if not _batched():
+        publish_row(EVENT_TYPES[sender], instance, deleted=True)
+
+
+@receiver(post_save, sender=Project)
+def _project_changed(sender, instance, created, **kwargs):
+    if not created and not _batched():
+        touch_projects(id=instance.id)
+
+
+@receiver([post_save, post_delete], sender=User)
+def _user_changed(sender, instance, **kwargs):
+    if not _batched():
+        touch_personnel(instance.project_lead_id)
+
+
+@receiver(m2m_changed, sender=WorkPackage.users.through)
+@receiver(m2m_changed, sender=Task.users.through)
+def _assignments_changed(sender, instance, action, reverse, **kwargs):
+    if not action.startswith('post_') or _batched():
+        return
+    if reverse:
+        # user.work_packages.add(...) style call, instance is the User
+        touch_projects(owner_id=instance.project_lead_id)
+        return
+    if isinstance(instance, WorkPackage):
+        touch_projects(id=instance.project_id)
+    else:
+        touch_projects(work_packages=instance.work_package_id)
+    publish_row(EVENT_TYPES[type(instance)], instance)  # the row again, with its new users
+
+
+# SUMMARY ROWS (summary.py): every write adds its difference to the WP's and the project's row in its own
+# transaction, the values a row was loaded with tell what changed. Deletes only ever update rows, a cascade
+# may be removing the WP or project (and with it their summary rows) at the same time.
+SUMMARY_INPUTS = {
+    Task: ('work_package_id',),
+    Deliverable: ('work_package_id',),
+    BudgetEntry: ('work_package_id', 'user_id', 'contribution'),
+    User: ('wage',),
+}
+
+
+def _loaded(instance, field):
+    return getattr(instance, '_summary_loaded', {}).get(field)
+
+
+@receiver(post_init, sender=Task)
+@receiver(post_init, sender=Deliverable)
+@receiver(post_init, sender=BudgetEntry)
+@receiver(post_init, sender=User)
+def _remember_loaded(sender, instance, **kwargs):
+    # __dict__ only, a deferred field must not be fetched here
+    instance._summary_loaded = {field: instance.__dict__.get(field) for field in SUMMARY_INPUTS[sender]}
+
+
+@receiver(post_save, sender=Project)
+def _project_created(sender, instance, created, **kwargs):
+    if created:
+        ProjectSummary.objects.create(project=instance)
+
+
+@receiver(post_save, sender=WorkPackage)
+def _work_package_saved(sender, instance, created, **kwargs):
+    if _batched():
+        return
+    if created:
+        WorkPackageSummary.objects.create(work_package=instance)
+    roll_up(instance.project_id)  # count and month span
+
+
+@receiver(post_delete, sender=WorkPackage)
+def _work_package_deleted(sender, instance, **kwargs):
+    if not _batched():
+        roll_up(instance.project_id, create=False)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=Deliverable)
+def _counted_row_saved(sender, instance, created, **kwargs):
+    if _batched():
+        return
+    field = 'task_count' if sender is Task else 'deliverable_count'
+    previous = _loaded(instance, 'work_package_id')
+    if created:
+        add_to_summaries(instance.work_package_id, **{field: 1})
+    elif previous != instance.work_package_id:
+        # moved to another WP
+        add_to_summaries(previous, **{field: -1})
+        add_to_summaries(instance.work_package_id, **{field: 1})
+    instance._summary_loaded['work_package_id'] = instance.work_package_id
+
+
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Deliverable)
+def _counted_row_deleted(sender, instance, **kwargs):
+    if not _batched():
+        add_to_summaries(instance.work_package_id, **{'task_count' if sender is Task else 'deliverable_count': -1})
+
+
+@receiver(post_save, sender=BudgetEntry)
+def _budget_entry_saved(sender, instance, created, **kwargs):
+    if _batched():
+        return
+    contribution = Decimal(str(instance.contribution))
+    previous = _loaded(instance, 'contribution')
+    if not created and previous is None:
+        # loaded without its contribution, the old value is unknown
+        refresh_projects([instance.work_package_id], work_packages=instance.work_package_id)
+    else:
+        if not created:
+            add_budget(_loaded(instance, 'work_package_id'), _loaded(instance, 'user_id'), -Decimal(str(previous)))
+        add_budget(instance.work_package_id, instance.user_id, contribution)
+    instance._summary_loaded.update(work_package_id=instance.work_package_id, user_id=instance.user_id, contribution=contribution)
+
+
+@receiver(post_delete, sender=BudgetEntry)
+def _budget_entry_deleted(sender, instance, **kwargs):
+    if not _batched():
+        add_budget(instance.work_package_id, instance.user_id, -Decimal(str(instance.contribution)))
+
+
+@receiver(post_save, sender=User)
+def _wage_changed(sender, instance, created, **kwargs):
+    previous = _loaded(instance, 'wage')
+    if not created and not _batched() and previous is not None and Decimal(str(previous)) != Decimal(str(instance.wage)):
+        # every cost of the person changes, recounted from the base tables
+        refresh_projects(set(instance.budget_entries.values_list('work_package_id', flat=True)), owner_id=instance.project_lead_id)
+    instance._summary_loaded['wage'] = instance.wage
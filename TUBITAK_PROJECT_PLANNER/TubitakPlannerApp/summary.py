@@ -0,0 +1,109 @@
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models import Count, DecimalField, F, IntegerField, Max, Min, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Project, User, WorkPackage, Task, Deliverable, BudgetEntry, WorkPackageSummary, ProjectSummary
+
+_AMOUNT = DecimalField(max_digits=18, decimal_places=4)
+# keeps every bulk statement under the parameter limits of sqlite/oracle, as in budget.py
+BULK_BATCH_SIZE = 500
+
+WORK_PACKAGE_FIELDS = ('task_count', 'deliverable_count', 'person_months', 'cost')
+PROJECT_FIELDS = ('work_package_count', 'task_count', 'deliverable_count', 'start_month', 'end_month', 'person_months', 'cost')
+
+
+def _per_row(queryset, link, value, output_field, default):
+    """`value` aggregated over the rows of `queryset` that belong to the outer row through `link`, as a subquery."""
+    rows = queryset.filter(**{link: OuterRef('pk')}).order_by().values(link).annotate(value=value).values('value')
+    subquery = Subquery(rows, output_field=output_field)
+    return subquery if default is None else Coalesce(subquery, Value(default), output_field=output_field)
+
+
+def work_package_summaries(work_packages):
+    """Fresh WorkPackageSummary rows (unsaved) of a WorkPackage queryset, counted from the base tables in one query."""
+    columns = {
+        'task_count': _per_row(Task.objects.all(), 'work_package', Count('pk'), IntegerField(), 0),
+        'deliverable_count': _per_row(Deliverable.objects.all(), 'work_package', Count('pk'), IntegerField(), 0),
+        'person_months': _per_row(BudgetEntry.objects.all(), 'work_package', Sum('contribution'), _AMOUNT, Decimal(0)),
+        'cost': _per_row(BudgetEntry.objects.all(), 'work_package',
+                         Sum(F('contribution') * F('user__wage'), output_field=_AMOUNT), _AMOUNT, Decimal(0)),
+    }
+    rows = work_packages.order_by().annotate(**columns).values('pk', *WORK_PACKAGE_FIELDS)
+    return [WorkPackageSummary(work_package_id=row.pop('pk'), **row) for row in rows]
+
+
+def project_summaries(projects):
+    """Fresh ProjectSummary rows (unsaved) of a Project queryset, rolled up from its WPs and their summary rows in one query."""
+    # one WP has at most one summary row, so the joins don't repeat anything that is summed
+    columns = {
+        'work_package_count': Count('work_packages'),
+        'start_month': Min('work_packages__start_date'),
+        'end_month': Max('work_packages__end_date'),
+    }
+    for field, default in (('task_count', 0), ('deliverable_count', 0), ('person_months', Decimal(0)), ('cost', Decimal(0))):
+        columns[field] = Coalesce(Sum(f'work_packages__summary__{field}'), Value(default))
+    rows = projects.order_by().annotate(**columns).values('pk', *PROJECT_FIELDS)
+    return [ProjectSummary(project_id=row.pop('pk'), **row) for row in rows]
+
+
+def save_summaries(summaries, create=True):
+    """
+    Insert or overwrite summary rows, one statement per model where the database has an upsert with a
+    conflict target. Elsewhere (Oracle, MySQL) the existing keys are read first and the rows go out with
+    bulk_update and bulk_create, like apply_budget_changes(). With create=False existing rows are only
+    updated: on deletes a cascade may be removing the WP or project itself, whose summary row is already
+    gone and must not come back.
+    """
+    upsert = connection.features.supports_update_conflicts_with_target
+    for model, key, fields in ((WorkPackageSummary, 'work_package', WORK_PACKAGE_FIELDS), (ProjectSummary, 'project', PROJECT_FIELDS)):
+        rows = [summary for summary in summaries if isinstance(summary, model)]
+        if not rows:
+            continue
+        if create and upsert:
+            model.objects.bulk_create(rows, update_conflicts=True, unique_fields=[key], update_fields=list(fields))
+        elif not create:
+            for row in rows:
+                model.objects.filter(pk=row.pk).update(**{field: getattr(row, field) for field in fields})
+        else:
+            existing = set(model.objects.filter(pk__in=[row.pk for row in rows]).values_list('pk', flat=True))
+            if existing:
+                model.objects.bulk_update([row for row in rows if row.pk in existing], list(fields), batch_size=BULK_BATCH_SIZE)
+            model.objects.bulk_create([row for row in rows if row.pk not in existing], batch_size=BULK_BATCH_SIZE)
+
+
+def add_to_summaries(work_package_id, **deltas):
+    """
+    Add `deltas` (task_count=1, person_months=Decimal('-0.5'), ...) to a WP's summary row and its project's,
+    two UPDATEs whatever the size of the project. A `cost` delta may be an expression, e.g. contribution * wage.
+    """
+    changes = {field: F(field) + value for field, value in deltas.items()}
+    WorkPackageSummary.objects.filter(pk=work_package_id).update(**changes)
+    ProjectSummary.objects.filter(project__work_packages=work_package_id).update(**changes)
+
+
+def add_budget(work_package_id, user_id, contribution):
+    """add_to_summaries() of a budget entry's contribution (negative when it is removed), costed at the current wage."""
+    wage = Subquery(User.objects.filter(pk=user_id).values('wage')[:1], output_field=_AMOUNT)
+    add_to_summaries(work_package_id, person_months=contribution, cost=Value(contribution, output_field=_AMOUNT) * wage)
+
+
+def roll_up(project_id, create=True):
+    """Recompute a project's row from its WPs (counts, month span) and their summary rows, two queries."""
+    save_summaries(project_summaries(Project.objects.filter(pk=project_id)), create)
+
+
+def refresh_projects(work_package_ids=None, **filters):
+    """
+    Recompute the summaries of the projects matching `filters` from the base tables: the rows of their
+    WPs (all, or only those with an id in `work_package_ids`), then the project rows. For the bulk write paths,
+    which send no per-row signals, and for wage changes.
+    """
+    projects = Project.objects.filter(**filters)
+    if work_package_ids is None or work_package_ids:
+        changed = WorkPackage.objects.filter(project__in=projects)
+        if work_package_ids is not None:
+            changed = changed.filter(pk__in=work_package_ids)
+        save_summaries(work_package_summaries(changed))
+    save_summaries(project_summaries(projects))
@@ -0,0 +1,94 @@
+import datetime
+import random
+from decimal import Decimal
+
+from django.db import transaction
+
+from .batch import bulk_create_with_ids
+from .budget import BULK_BATCH_SIZE
+from .models import User, WorkPackage, Task, Project, Deliverable, BudgetEntry, WorkPackageDependency, TaskDependency
+from .summary import refresh_projects
+
+
+def generate_project(lead, name, work_packages=50, tasks=2000, users=100, months=60, seed=0):
+    """
+    Create a synthetic project of the given size with bulk inserts only.
+    WPs get random month windows and staff, tasks and deliverables stay inside their WP,
+    and budget allocations never put a person above 1.0 in any month.
+    Dependencies only link items that already finish before their successor starts.
+    """
+    rng = random.Random(seed)
+    with transaction.atomic():
+        project = Project.objects.create(owner=lead, name=name, start_date=datetime.date(2025, 1, 1))
+
+        people = [
+            User(name=f"{name} person {i + 1}", wage=Decimal(rng.randrange(20000, 120000)) / 10, project_lead=lead)
+            for i in range(users)
+        ]
+        bulk_create_with_ids(User, people)
+
+        wps = []
+        for i in range(work_packages):
+            start = rng.randint(1, max(1, months - 6))
+            end = min(months, start + rng.randint(5, 24))
+            wps.append(WorkPackage(
+                name=f"WP{i + 1}", description=f"Synthetic work package {i + 1}. " * 5,
+                start_date=start, end_date=end, project=project,
+            ))
+        bulk_create_with_ids(WorkPackage, wps)
+
+        wp_staff = {wp.id: rng.sample(people, min(len(people), rng.randint(3, 8))) for wp in wps}
+        WorkPackage.users.through.objects.bulk_create(
+            [WorkPackage.users.through(workpackage_id=wp_id, user_id=person.id) for wp_id, staff in wp_staff.items() for person in staff],
+            batch_size=BULK_BATCH_SIZE,
+        )
+
+        task_objs = []
+        for i in range(tasks):
+            wp = wps[i % len(wps)]
+            start = rng.randint(wp.start_date, wp.end_date)
+            task_objs.append(Task(
+                name=f"Task {i + 1}", description=f"Synthetic task {i + 1}.",
+                start_date=start, end_date=rng.randint(start, wp.end_date),
+                status=rng.choice(['active', 'active', 'closed']), work_package_id=wp.id,
+            ))
+        bulk_create_with_ids(Task, task_objs)
+        Task.users.through.objects.bulk_create(
+            [Task.users.through(task_id=task.id, user_id=person.id)
+             for task in task_objs for person in rng.sample(wp_staff[task.work_package_id], rng.randint(1, 3))],
+            batch_size=BULK_BATCH_SIZE,
+        )
+
+        Deliverable.objects.bulk_create([
+            Deliverable(name=f"D{wp.id}.{n + 1}", deadline=rng.randint(wp.start_date, wp.end_date), work_package_id=wp.id)
+            for wp in wps for n in range(2)
+        ], batch_size=BULK_BATCH_SIZE)
+
+        # allocations in steps of 0.05, capped so nobody exceeds 1.0 in a month
+        load = {}
+        entries = []
+        for wp in wps:
+            for person in wp_staff[wp.id]:
+                share = Decimal(rng.randint(1, 8)) * Decimal('0.05')
+                for month in range(wp.start_date, wp.end_date + 1):
+                    used = load.get((person.id, month), Decimal(0))
+                    contribution = min(share, Decimal(1) - used)
+                    if contribution > 0:
+                        load[(person.id, month)] = used + contribution
+                        entries.append(BudgetEntry(work_package_id=wp.id, user_id=person.id, month=month, contribution=contribution))
+        BudgetEntry.objects.bulk_create(entries, batch_size=BULK_BATCH_SIZE)
+
+        # a link needs two items, a project of one WP or one task has none
+        wp_links = {(a.id, b.id) for a, b in (rng.sample(wps, 2) for _ in range(len(wps) if len(wps) >= 2 else 0))
+                    if a.end_date < b.start_date}
+        WorkPackageDependency.objects.bulk_create(
+            [WorkPackageDependency(predecessor_id=a, successor_id=b) for a, b in sorted(wp_links)], batch_size=BULK_BATCH_SIZE,
+        )
+        task_links = {(a.id, b.id) for a, b in (rng.sample(task_objs, 2) for _ in range(len(task_objs) if len(task_objs) >= 2 else 0))
+                      if a.end_date < b.start_date}
+        TaskDependency.objects.bulk_create(
+            [TaskDependency(predecessor_id=a, successor_id=b) for a, b in sorted(task_links)], batch_size=BULK_BATCH_SIZE,
+        )
+        refresh_projects(id=project.id)
+
+    return project
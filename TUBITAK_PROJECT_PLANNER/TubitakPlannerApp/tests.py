@@ -1,3 +1,1505 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import json
+import tempfile
+import time
+from contextlib import contextmanager, redirect_stdout
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+
+from django.db import connection
+from django.http import JsonResponse, QueryDict
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .authentication import CachedJWTAuthentication, TokenUserCache, token_cache
+from .budget import BudgetValidationError, cells_from_segments, segments_from_cells
+from .export import EXPORT_FORMAT, EXPORT_VERSION
+from .events import RESET, InProcessBroker, get_broker
+from .gantt import add_months, parse_gantt_filters
+from . import urls
+from .jobs import claim_job, enqueue, fail_stale_jobs, run_job
+from .purge import purge_project, soft_delete_project
+from .models import ProjectLeadUser, User, WorkPackage, Task, Project, Deliverable, BudgetEntry, WorkPackageSummary, ProjectSummary, Job, WorkPackageDependency, TaskDependency
+from .rows import ValueRows
+from .summary import refresh_projects
+from .serializers import UserSerializer, WorkPackageSerializer, TaskSerializer, DeliverableSerializer
+from .scheduling import TASK, WORK_PACKAGE, Plan, ScheduleError
+
+
+class QueryBudgetMixin:
+    """assertMaxQueries fails when a block runs more queries than its budget, listing what ran."""
+
+    @contextmanager
+    def assertMaxQueries(self, limit):
+        with CaptureQueriesContext(connection) as ctx:
+            yield ctx
+        if len(ctx) > limit:
+            queries = '\n'.join(f"{i}. {q['sql']}" for i, q in enumerate(ctx.captured_queries, start=1))
+            self.fail(f"{len(ctx)} queries executed, budget is {limit}:\n{queries}")
+
+
+def make_project(lead, name, work_packages, tasks_per_wp, users):
+    project = Project.objects.create(owner=lead, name=name, start_date=datetime.date(2025, 1, 1))
+    people = [User.objects.create(name=f"{name} user {i}", wage=1000 + i, project_lead=lead) for i in range(users)]
+    for w in range(work_packages):
+        wp = WorkPackage.objects.create(name=f"WP{w}", start_date=1, end_date=12, project=project)
+        wp.users.set(people)
+        Deliverable.objects.create(name=f"D{w}", deadline=12, work_package=wp)
+        for t in range(tasks_per_wp):
+            task = Task.objects.create(name=f"T{w}.{t}", start_date=1, end_date=6, work_package=wp)
+            task.users.set(people)
+        BudgetEntry.objects.bulk_create(
+            BudgetEntry(work_package=wp, user=person, month=month, contribution='0.10')
+            for person in people for month in range(1, 13)
+        )
+    return project
+
+
+class AuthenticationTests(QueryBudgetMixin, TestCase):
+    """Validated access tokens are cached per process, but never past their expiry or a change of the lead."""
+
+    def setUp(self):
+        self.lead = ProjectLeadUser.objects.create_user(username='lead', email='lead@example.com', password='pw')
+        self.token = str(RefreshToken.for_user(self.lead).access_token)
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+
+    def get(self):
+        return self.client.get('/projects/', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+    def test_lru_bound(self):
+        cache = TokenUserCache(max_size=2, ttl=60)
+        expires = time.time() + 300
+        cache.set('a', self.lead, expires)
+        cache.set('b', self.lead, expires)
+        self.assertEqual(cache.get('a'), self.lead)  # b is now the least recently used
+        cache.set('c', self.lead, expires)
+        self.assertEqual([cache.get(token) for token in 'abc'], [self.lead, None, self.lead])
+        cache.evict_user(self.lead.pk)
+        self.assertEqual([cache.get(token) for token in 'ac'], [None, None])
+
+    def test_ttl_capped_at_expiry(self):
+        cache = TokenUserCache(max_size=10, ttl=60)
+        now = time.monotonic()
+        cache.set('short', self.lead, time.time() + 5)
+        cache.set('long', self.lead, time.time() + 300)
+        with mock.patch('TubitakPlannerApp.authentication.time.monotonic', return_value=now + 10):
+            self.assertEqual((cache.get('short'), cache.get('long')), (None, self.lead))
+        with mock.patch('TubitakPlannerApp.authentication.time.monotonic', return_value=now + 61):
+            self.assertIsNone(cache.get('long'))
+
+        # a zero TTL or size turns the cache off
+        for size, ttl in ((0, 60), (10, 0)):
+            off = TokenUserCache(max_size=size, ttl=ttl)
+            off.set('a', self.lead, time.time() + 300)
+            self.assertIsNone(off.get('a'))
+
+    def test_lead_changes_evict(self):
+        self.assertEqual(self.get().status_code, 200)
+        self.assertIsNotNone(token_cache.get(self.token))
+        with self.assertMaxQueries(1):
+            self.assertEqual(self.get().status_code, 200)  # only the project list, no user query
+
+        self.lead.set_password('new password')
+        self.lead.save()
+        self.assertIsNone(token_cache.get(self.token))
+
+        self.assertEqual(self.get().status_code, 200)
+        self.lead.is_active = False
+        self.lead.save()
+        self.assertEqual(self.get().status_code, 401)
+
+        self.lead.is_active = True
+        self.lead.save()
+        self.assertEqual(self.get().status_code, 200)
+        self.lead.delete()
+        self.assertIsNone(token_cache.get(self.token))
+        self.assertEqual(self.get().status_code, 401)
+
+    def test_inactive_lead(self):
+        ProjectLeadUser.objects.filter(pk=self.lead.pk).update(is_active=False)
+        response = self.get()
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {'error': 'Invalid or expired token.'})
+        self.assertIsNone(token_cache.get(self.token))
+
+    @override_settings(JWT_AUTH_STATELESS=True)
+    def test_stateless(self):
+        # the user is built from the token, not loaded: it carries only its pk
+        with self.assertMaxQueries(0):
+            user = CachedJWTAuthentication().authenticate_token(self.token.encode())
+        self.assertEqual((user.pk, user.username), (self.lead.pk, ''))
+        self.assertFalse(user._state.adding)
+
+        # an inactive lead is not noticed until the token expires
+        token_cache.clear()
+        ProjectLeadUser.objects.filter(pk=self.lead.pk).update(is_active=False)
+        self.assertEqual(self.get().status_code, 200)
+
+
+class EndpointQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    Every endpoint has to stay within the same query budget for a tiny and a larger project,
+    so an N+1 pattern fails here instead of in production.
+    """
+    SIZES = {'small': (1, 1, 1), 'large': (8, 5, 6)}
+
+    def setUp(self):
+        self.lead = ProjectLeadUser.objects.create_user(username='lead', email='lead@example.com', password='pw')
+        refresh = RefreshToken.for_user(self.lead)
+        self.tokens = {'refresh': str(refresh), 'access': str(refresh.access_token)}
+        self.auth = {'HTTP_AUTHORIZATION': f"Bearer {self.tokens['access']}"}
+        self.projects = {size: make_project(self.lead, size, *shape) for size, shape in self.SIZES.items()}
+        # export jobs write their documents to the default storage
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+    def request(self, method, url, project, data=None):
+        kwargs = dict(self.auth, HTTP_X_PROJECT_ID=str(project.id))
+        if data is not None:
+            kwargs.update(data=json.dumps(data), content_type='application/json')
+        return getattr(self.client, method)(url, **kwargs)
+
+    def assertBudget(self, limit, method, url, data=None, status=200):
+        for size, project in self.projects.items():
+            target = url(project) if callable(url) else url
+            payload = data(project) if callable(data) else data
+            with self.subTest(size=size, method=method, url=target):
+                with self.assertMaxQueries(limit):
+                    response = self.request(method, target, project, payload)
+                    # streamed responses only run their queries while they are read, an event stream up to its first event
+                    if response.streaming and response['Content-Type'] == 'text/event-stream':
+                        next(iter(response.streaming_content))
+                    elif response.streaming:
+                        b''.join(response.streaming_content)
+                response.close()
+                self.assertEqual(response.status_code, status, getattr(response, 'content', b''))
+
+    def follow_up(self, project, kind):
+        """A new work package or task after the first one of `project`, as the ids of a dependency between them."""
+        wp = project.work_packages.order_by('id').first()
+        if kind == WORK_PACKAGE:
+            successor = WorkPackage.objects.create(name='Follow-up', start_date=1, end_date=12, project=project)
+            return {'predecessor': wp.id, 'successor': successor.id, 'lag': 0}
+        successor = Task.objects.create(name='Follow-up', start_date=7, end_date=12, work_package=wp)
+        return {'predecessor': wp.tasks.order_by('id').first().id, 'successor': successor.id, 'lag': 0}
+
+    def link(self, project, kind):
+        pair = self.follow_up(project, kind)
+        if kind == WORK_PACKAGE:
+            return WorkPackageDependency.objects.create(predecessor_id=pair['predecessor'], successor_id=pair['successor']).id
+        return TaskDependency.objects.create(predecessor_id=pair['predecessor'], successor_id=pair['successor']).id
+
+    def exported(self, project):
+        job = enqueue(self.lead, 'export_project', project=project.id)
+        run_job(job)
+        return job.id
+
+    def budgets(self):
+        """
+        (route in urls.py, limit, method, url, data, status) of every request to budget. The writes run
+        after the reads, in this order, each one on the rows the earlier ones left.
+        """
+        def first_wp(project):
+            return project.work_packages.order_by('id').first()
+
+        def first_task(project):
+            return Task.objects.filter(work_package__project=project).order_by('id').first()
+
+        def first_deliverable(project):
+            return Deliverable.objects.filter(work_package__project=project).order_by('id').first()
+
+        def first_user(project):
+            return first_wp(project).users.order_by('id').first()
+
+        def person(project):
+            user = first_user(project)
+            return {'name': user.name, 'wage': str(user.wage)}
+
+        def work_package(project):
+            wp = first_wp(project)
+            return {'name': wp.name, 'description': wp.description, 'start_date': wp.start_date, 'end_date': wp.end_date,
+                    'status': wp.status, 'users': list(wp.users.values_list('id', flat=True))}
+
+        def task(project):
+            task = first_task(project)
+            return {'name': task.name, 'description': task.description, 'start_date': task.start_date, 'end_date': task.end_date,
+                    'status': task.status, 'users': list(task.users.values_list('id', flat=True)), 'work_package': task.work_package_id}
+
+        def export(project):
+            response = self.request('get', f'/projects/{project.id}/export/', project)
+            document = json.loads(b''.join(response.streaming_content))
+            # the personnel is matched to the existing users, a lighter copy keeps them within 1.0
+            for entry in document['budget_entries']:
+                entry[3] = '0.01'
+            return document
+
+        def cells(project):
+            wp = first_wp(project)
+            return {f"{wp.id}_{wp.users.first().id}_{month}": '0.20' for month in range(1, 13)}
+
+        def segment(project):
+            wp = first_wp(project)
+            return {'segments': [{'work_package': wp.id, 'user': wp.users.first().id, 'start_month': 1, 'end_month': 12, 'contribution': '0.15'}]}
+
+        def work_packages(project):
+            people = list(User.objects.filter(project_lead=self.lead).values_list('id', flat=True)[:3])
+            return {'create': [{'name': f'New {i}', 'start_date': 1, 'end_date': 6, 'users': people} for i in range(10)]}
+
+        def tasks(project):
+            wp = first_wp(project)
+            return {'create': [{'name': f'New {i}', 'start_date': 1, 'end_date': 6, 'work_package': wp.id} for i in range(10)],
+                    'update': [{'id': first_task(project).id, 'name': 'Renamed'}]}
+
+        def deliverables(project):
+            wp = first_wp(project)
+            return {'create': [{'name': f'New {i}', 'deadline': 12, 'work_package': wp.id} for i in range(10)],
+                    'update': [{'id': first_deliverable(project).id, 'name': 'Renamed'}]}
+
+        def move(project):
+            return {'work_package': first_wp(project).id, 'start_date': 2, 'end_date': 13}
+
+        def register(project):
+            return {'username': f'lead{project.id}', 'email': f'lead{project.id}@example.com', 'password': 'x', 'password_confirm': 'x'}
+
+        return [
+            ('users/', 3, 'get', '/users/', None, 200),
+            ('users/<int:id>/', 3, 'get', lambda p: f'/users/{first_user(p).id}/', None, 200),
+            ('users/<int:id>/', 4, 'put', lambda p: f'/users/{first_user(p).id}/', person, 200),
+            ('workpackages/', 4, 'get', '/workpackages/', None, 200),
+            ('workpackages/<int:id>/', 4, 'get', lambda p: f'/workpackages/{first_wp(p).id}/', None, 200),
+            ('workpackages/<int:id>/', 11, 'put', lambda p: f'/workpackages/{first_wp(p).id}/', work_package, 200),
+            ('workpackages/dependencies/', 12, 'post', '/workpackages/dependencies/', lambda p: self.follow_up(p, WORK_PACKAGE), 200),
+            ('workpackages/dependencies/', 4, 'get', '/workpackages/dependencies/', None, 200),
+            ('workpackages/dependencies/<int:id>/', 4, 'get', lambda p: f'/workpackages/dependencies/{self.link(p, WORK_PACKAGE)}/', None, 200),
+            ('tasks/', 4, 'get', '/tasks/', None, 200),
+            ('tasks/', 4, 'get', '/tasks/?from_month=3&to_month=8', None, 200),
+            ('tasks/<int:id>/', 4, 'get', lambda p: f'/tasks/{first_task(p).id}/', None, 200),
+            ('tasks/<int:id>/', 9, 'put', lambda p: f'/tasks/{first_task(p).id}/', task, 200),
+            ('tasks/dependencies/', 12, 'post', '/tasks/dependencies/', lambda p: self.follow_up(p, TASK), 200),
+            ('tasks/dependencies/', 4, 'get', '/tasks/dependencies/', None, 200),
+            ('tasks/dependencies/<int:id>/', 4, 'get', lambda p: f'/tasks/dependencies/{self.link(p, TASK)}/', None, 200),
+            ('deliverables/', 3, 'get', '/deliverables/', None, 200),
+            ('deliverables/<int:id>/', 3, 'get', lambda p: f'/deliverables/{first_deliverable(p).id}/', None, 200),
+            ('budget/', 3, 'get', '/budget/', None, 200),
+            ('budget/', 3, 'get', '/budget/?from_month=3&to_month=8', None, 200),
+            ('budget/', 3, 'get', '/budget/?format=columns&user=1,2', None, 200),
+            ('budget/', 3, 'get', '/budget/?format=dense&from_month=3&to_month=8', None, 200),
+            ('budget/segments/', 3, 'get', '/budget/segments/', None, 200),
+            ('budget/summary/', 6, 'get', '/budget/summary/', None, 200),
+            ('portfolio/workload/', 4, 'get', '/portfolio/workload/', None, 200),
+            ('projects/', 2, 'get', '/projects/', None, 200),
+            ('projects/<int:id>/', 3, 'get', lambda p: f'/projects/{p.id}/', None, 200),
+            ('projects/<int:id>/snapshot/', 8, 'get', lambda p: f'/projects/{p.id}/snapshot/', None, 200),
+            ('projects/<int:id>/gantt/', 5, 'get', lambda p: f'/projects/{p.id}/gantt/', None, 200),
+            ('projects/<int:id>/gantt/', 5, 'get', lambda p: f'/projects/{p.id}/gantt/?status=active&users=1,2&from=2025-03-01', None, 200),
+            ('projects/<int:id>/export/', 8, 'get', lambda p: f'/projects/{p.id}/export/', None, 200),
+            ('projects/<int:id>/export/', 4, 'post', lambda p: f'/projects/{p.id}/export/', None, 202),
+            ('projects/<int:id>/events/', 4, 'get', lambda p: f'/projects/{p.id}/events/', None, 200),
+            ('projects/<int:id>/schedule/', 8, 'get', lambda p: f'/projects/{p.id}/schedule/', None, 200),
+            ('jobs/<int:id>/', 2, 'get', lambda p: f"/jobs/{enqueue(self.lead, 'export_project', project=p.id).id}/", None, 200),
+            ('jobs/<int:id>/download/', 2, 'get', lambda p: f'/jobs/{self.exported(p)}/download/', None, 200),
+            ('token/', 4, 'post', '/token/', {'username': 'lead', 'password': 'pw'}, 200),
+            ('token/refresh/', 4, 'post', '/token/refresh/', {'refresh': self.tokens['refresh']}, 200),
+            ('token/verify/', 0, 'post', '/token/verify/', {'token': self.tokens['access']}, 200),
+            ('register/', 4, 'post', '/register/', register, 201),
+            # one INSERT per table, SQLite splits the 576 budget rows of the large project into three,
+            # plus five for the summary rows of the new project and one for the users' load on other projects
+            ('projects/import/', 19, 'post', '/projects/import/', export, 201),
+            # includes the two reads of the cross-project capacity check and the four of the summary refresh
+            ('budget/', 16, 'patch', '/budget/', cells, 200),
+            ('budget/segments/', 16, 'patch', '/budget/segments/', segment, 200),
+            # four of them recompute the project's summary rows
+            ('workpackages/batch/', 13, 'post', '/workpackages/batch/', work_packages, 200),
+            ('tasks/batch/', 14, 'post', '/tasks/batch/', tasks, 200),
+            ('deliverables/batch/', 13, 'post', '/deliverables/batch/', deliverables, 200),
+            # the plan is read with one query per table however many rows move, two roll up the project summary
+            ('projects/<int:id>/reschedule/', 20, 'post', lambda p: f'/projects/{p.id}/reschedule/', move, 200),
+        ]
+
+    def test_every_route(self):
+        budgets = self.budgets()
+        budgeted = {route for route, *_ in budgets}
+        routes = [str(pattern.pattern) for pattern in urls.urlpatterns]
+        self.assertEqual([route for route in routes if route not in budgeted], [], "Every route in urls.py needs a query budget.")
+        self.assertEqual(budgeted - set(routes), set())
+
+        with redirect_stdout(io.StringIO()):  # registerProjectLead prints the request
+            for route, limit, method, url, data, status in budgets:
+                self.assertBudget(limit, method, url, data, status)
+
+    def test_not_modified(self):
+        project = self.projects['large']
+        etag = self.request('get', '/tasks/', project)['ETag']
+        with self.assertMaxQueries(2):
+            response = self.client.get('/tasks/', HTTP_IF_NONE_MATCH=etag, HTTP_X_PROJECT_ID=str(project.id), **self.auth)
+        self.assertEqual(response.status_code, 304)
+
+
+class AsyncReadTests(TestCase):
+    """The hot read endpoints are async views; under ASGI they must answer like the sync ones did."""
+
+    def setUp(self):
+        self.lead = ProjectLeadUser.objects.create_user(username='lead', email='lead@example.com', password='pw')
+        self.project = make_project(self.lead, 'async', 2, 2, 2)
+        token = str(RefreshToken.for_user(self.lead).access_token)
+        self.headers = {'Authorization': f'Bearer {token}', 'X-Project-Id': str(self.project.id)}
+
+    async def test_reads(self):
+        response = await self.async_client.get('/budget/?from_month=3&to_month=4', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2 * 2 * 2)
+        self.assertEqual(set(response.json().values()), {'0.10'})
+        self.assertIn('db;dur=', response['Server-Timing'])
+
+        response = await self.async_client.get('/workpackages/?limit=1', headers=self.headers)
+        self.assertEqual(len(response.json()['results']), 1)
+        response = await self.async_client.get(f"/workpackages/?limit=1&cursor={response.json()['next']}", headers=self.headers)
+        self.assertEqual([wp['name'] for wp in response.json()['results']], ['WP1'])
+        self.assertIsNone(response.json()['next'])
+        response = await self.async_client.get(f'/projects/{self.project.id}/', headers=self.headers)
+        self.assertEqual(response.json()['name'], 'async')
+
+    async def test_not_modified_and_auth(self):
+        etag = (await self.async_client.get('/tasks/', headers=self.headers))['ETag']
+        response = await self.async_client.get('/tasks/', headers={**self.headers, 'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        response = await self.async_client.get('/deliverables/', headers={'X-Project-Id': str(self.project.id)})
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get('/users/', headers={**self.headers, 'Authorization': 'Bearer nope'})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_writes_fall_back_to_sync_views(self):
+        response = await self.async_client.post('/users/', {'name': 'New', 'wage': 100}, content_type='application/json', headers=self.headers)
+        self.assertEqual(response.status_code, 200, response.content)
+        response = await self.async_client.get('/users/', headers=self.headers)
+        self.assertIn('New', [user['name'] for user in response.json()])
+
+
+class BudgetSegmentTests(TestCase):
+    """Runs of equal months in and out of the monthly budget rows, and the other read formats of the budget."""
+
+    def setUp(self):
+        self.lead = ProjectLeadUser.objects.create_user(username='lead', email='lead@example.com', password='pw')
+        self.project = make_project(self.lead, 'segments', 1, 0, 2)
+        self.wp = self.project.work_packages.get()
+        self.first, self.second = User.objects.filter(project_lead=self.lead).order_by('id')
+        token = str(RefreshToken.for_user(self.lead).access_token)
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {token}', 'HTTP_X_PROJECT_ID': str(self.project.id)}
+
+    def segment(self, user, start, end, contribution):
+        return {'work_package': self.wp.id, 'user': user.id, 'start_month': start, 'end_month': end, 'contribution': contribution}
+
+    def test_conversion(self):
+        cells = [(1, 1, 1, '0.5'), (1, 1, 2, '0.5'), (1, 1, 4, '0.5'), (1, 1, 5, '0.2'), (1, 2, 6, '0.2'), (2, 2, 7, '0.2')]
+        segments = segments_from_cells(cells)
+        self.assertEqual([(s['work_package'], s['user'], s['start_month'], s['end_month']) for s in segments],
+                         [(1, 1, 1, 2), (1, 1, 4, 4), (1, 1, 5, 5), (1, 2, 6, 6), (2, 2, 7, 7)])
+        self.assertEqual(cells_from_segments(segments), {f'{wp}_{user}_{month}': c for wp, user, month, c in cells})
+        with self.assertRaises(BudgetValidationError) as e:
+            cells_from_segments([{'work_package': 1, 'user': 1, 'start_month': 3, 'end_month': 2}, {'work_package': 1}])
+        self.assertEqual(set(e.exception.errors), {'segment_0', 'segment_1'})
+
+    def test_api(self):
+        response = self.client.get('/budget/segments/', **self.auth)
+        self.assertEqual(response.json()['segments'], [self.segment(self.first, 1, 12, '0.10'), self.segment(self.second, 1, 12, '0.10')])
+
+        # a propagate edit is one segment
+        response = self.client.patch('/budget/segments/', data=json.dumps({'segments': [
+            self.segment(self.first, 4, 12, '0.60'), self.segment(self.second, 11, 12, None)]}),
+            content_type='application/json', **self.auth)
+        self.assertEqual(response.json()['updated'], 9)
+        self.assertEqual(response.json()['deleted'], 2)
+        response = self.client.get('/budget/segments/?from_month=2', **self.auth)
+        self.assertEqual(response.json()['segments'], [
+            self.segment(self.first, 2, 3, '0.10'), self.segment(self.first, 4, 12, '0.60'), self.segment(self.second, 2, 10, '0.10')])
+        self.assertEqual(self.client.get('/budget/', **self.auth).json()[f'{self.wp.id}_{self.first.id}_5'], '0.60')
+
+        response = self.client.patch('/budget/segments/', data=json.dumps({'segments': [self.segment(self.first, 1, 2, '1.50')]}),
+                                     content_type='application/json', **self.auth)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(f'capacity_{self.first.id}_1', response.json()['details'])
+
+    def test_formats(self):
+        wp, first, second = self.wp.id, self.first.id, self.second.id
+        response = self.client.get(f'/budget/?format=columns&user={second}&from_month=11', **self.auth)
+        self.assertEqual(response.json(), {'work_packages': [wp, wp], 'users': [second, second], 'months': [11, 12],
+                                           'contributions': ['0.10', '0.10']})
+
+        self.client.patch('/budget/', data=json.dumps({f'{wp}_{first}_3': '0.50', f'{wp}_{second}_3': None}),
+                          content_type='application/json', **self.auth)
+        response = self.client.get(f'/budget/?format=dense&wp={wp}&from_month=2&to_month=4', **self.auth)
+        self.assertEqual(response.json(), {'work_packages': [wp], 'users': [first, second], 'from_month': 2, 'to_month': 4,
+                                           'contributions': [[['0.10', '0.50', '0.10'], ['0.10', None, '0.10']]]})
+        self.assertEqual(self.client.get('/budget/?format=dense&wp=0', **self.auth).json()['contributions'], [])
+        self.assertEqual(self.client.get('/budget/?format=keys&to_month=1', **self.auth).json(),
+                         {f'{wp}_{first}_1': '0.10', f'{wp}_{second}_1': '0.10'})
+
+        for query in ('format=csv', 'wp=a', 'from_month=4&to_month=2', 'format=dense&from_month=1&to_month=200000'):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f'/budget/?{query}', **self.auth).status_code, 400)
+
+
+class PaginationTests(TestCase):
+    """Walking every page with ?limit=&cursor= gives each row once, in the order of the plain list."""
+
+    def setUp(self):
+        self.lead = ProjectLeadUser.objects.create_user(username='lead', email='lead@example.com', password='pw')
+        self.project = make_project(self.lead, 'pages', 2, 0, 1)
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.lead).access_token}',
+                     'HTTP_X_PROJECT_ID': str(self.project.id)}
+        first, second = self.project.work_packages.order_by('id')
+        # ties on every key but the id, and NULL deadlines that sort last
+        for i, deadline in enumerate([3, None, 3, 5, None, 3, 12, None, 5, 3, None]):
+            Deliverable.objects.create(name=f'X{i}', deadline=deadline, work_package=first if i % 2 else second)
+        for i, (start, end) in enumerate([(2, 4), (1, 6), (2, 4), (2, 3), (1, 6), (2, 4), (5, 5), (2, 4)]):
+            Task.objects.create(name=f'T{i}', start_date=start, end_date=end, work_package=first if i % 3 else second)
+
+    def walk(self, url, limit):
+        ids, cursor, pages = [], None, 0
+        while True:
+            page = self.client.get(f"{url}{'&' if '?' in url else '?'}limit={limit}" + (f'&cursor={cursor}' if cursor else ''), **self.auth)
+            self.assertEqual(page.status_code, 200, page.content)
+            page = page.json()
+            self.assertLessEqual(len(page['results']), limit)
+            ids += [row['id'] for row in page['results']]
+            pages += 1
+            cursor = page['next']
+            if cursor is None:
+                return ids, pages
+
+    def test_ties_and_nulls(self):
+        deliverables = list(Deliverable.objects.filter(work_package__project=self.project).values_list('deadline', 'id'))
+        expected = [pk for deadline, pk in sorted(deliverables, key=lambda d: (d[0] is None, d[0] or 0, d[1]))]
+        tasks = list(Task.objects.filter(work_package__project=self.project).values_list('start_date', 'end_date', 'id'))
+        for url, rows in (('/deliverables/', expected), ('/tasks/', [pk for *_, pk in sorted(tasks)])):
+            self.assertEqual([row['id'] for row in self.client.get(url, **self.auth).json()], rows)
+            for limit in (1, 2, 3, 4, len(rows) - 1, len(rows), 100):
+                with self.subTest(url=url, limit=limit):
+                    ids, pages = self.walk(url, limit)
+                    self.assertEqual(ids, rows)
+                    self.assertEqual(pages, max(1, -(-len(rows) // limit)))
+
+        # with a filter and sparse fields the cursor keys are still read
+        in_range = [pk for start, end, pk in sorted(tasks) if end >= 5]
+        self.assertEqual(self.walk('/tasks/?from_month=5&fields=id,name', 2)[0], in_range)
+
+    def test_cursor_row_deleted(self):
+        # the cursor holds key values, not a row: the walk goes on past a row deleted meanwhile, here the first NULL
+        full = [row['id'] for row in self.client.get('/deliverables/', **self.auth).json()]
+        page = self.client.get('/deliverables/?limit=10', **self.auth).json()
+        self.assertIsNone(Deliverable.objects.get(id=page['results'][-1]['id']).deadline)
+        Deliverable.objects.filter(id=page['results'][-1]['id']).delete()
+        rest = self.client.get(f"/deliverables/?limit=100&cursor={page['next']}", **self.auth).json()['results']
+        self.assertEqual([row['id'] for row in page['results'] + rest], full)
+
+        for query in ('cursor=abc', 'limit=0', 'limit=x', 'limit=1001'):
+            self.assertEqual(self.client.get(f'/deliverables/?{query}', **self.auth).status_code, 400)
+
+
+class BudgetSummaryTests(TestCase):
+    """budget/summary/ sums person-months and cost (contribution x wage) per user, WP and month in SQL."""
+
+    def test_totals(self):
+        lead = ProjectLeadUser.objects.create_user(username='lead', email='lead@example.com', password='pw')
+        project = Project.objects.create(owner=lead, name='P', start_date=datetime.date(2025, 1, 1))
+        a = User.objects.create(name='A', wage='1000.00', project_lead=lead)
+        b = User.objects.create(name='B', wage='2500.50', project_lead=lead)
+        wp1, wp2 = (WorkPackage.objects.create(name=name, start_date=1, end_date=12, project=project) for name in ('WP1', 'WP2'))
+        for wp, user, month, contribution in ((wp1, a, 1, '0.50'), (wp1, a, 2, '0.25'), (wp1, b, 1, '0.10'),
+                                              (wp2, a, 1, '0.20'), (wp2, b, 3, '1.00')):
+            BudgetEntry.objects.create(work_package=wp, user=user, month=month, contribution=contribution)
+        # another project of the same people stays out
+        other = make_project(lead, 'other', 1, 0, 0)
+        BudgetEntry.objects.create(work_package=other.work_packages.get(), user=a, month=1, contribution='0.30')
+
+        response = self.client.get('/budget/summary/', HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(lead).access_token}',
+                                   HTTP_X_PROJECT_ID=str(project.id))
+        self.assertEqual(response.status_code, 200)
+
+        def totals(pm, cost):
+            return {'person_months': pm, 'cost': cost}
+        self.assertEqual(response.json(), {
+            'users': {str(a.id): totals('0.95', '950.00'), str(b.id): totals('1.10', '2750.55')},
+            'work_packages': {str(wp1.id): totals('0.85', '1000.05'), str(wp2.id): totals('1.20', '2700.50')},
+            'months': {'1': totals('0.80', '950.05'), '2': totals('0.25', '250.00'), '3': totals('1.00', '2500.50')},
+            'total': totals('2.05', '3700.55'),
+        })
+
+
+class MonthRangeTests(TestCase):
+    """?from_month=&to_month= keep the rows whose months overlap the range, bounds included."""
+
+    def setUp(self):
+        self.lead = ProjectLeadUser.objects.create_user(username='lead', email='lead@example.com', password='pw')
+        self.project = make_project(self.lead, 'range', 1, 0, 1)
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.lead).access_token}',
+                     'HTTP_X_PROJECT_ID': str(self.project.id)}
+        self.wp = self.project.work_packages.get()
+        # before, starting before, inside, ending after, spanning, after the range 4..6
+        for name, start, end in (('before', 1, 3), ('starts before', 2, 4), ('inside', 5, 5), ('ends after', 6, 9),
+                                 ('spans', 3, 8), ('after', 7, 10)):
+            Task.objects.create(name=name, start_date=start, end_date=end, work_package=self.wp)
+            WorkPackage.objects.create(name=name, start_date=start, end_date=end, project=self.project)
+        Deliverable.objects.filter(work_package=self.wp).delete()
+        for deadline in (3, 4, 6, 7, None):
+            Deliverable.objects.create(name=f'D{deadline}', deadline=deadline, work_package=self.wp)
+
+    def names(self, url):
+        response = self.client.get(url, **self.auth)
+        self.assertEqual(response.status_code, 200, response.content)
+        return sorted(row['name'] for row in response.json())
+
+    def test_overlap(self):
+        overlapping = sorted(['starts before', 'inside', 'ends after', 'spans'])
+        self.assertEqual(self.names('/tasks/?from_month=4&to_month=6'), overlapping)
+        self.assertEqual(self.names('/workpackages/?from_month=4&to_month=6'), sorted(overlapping + ['WP0']))  # WP0 is 1..12
+        self.assertEqual(self.names('/tasks/?from_month=7'), ['after', 'ends after', 'spans'])
+        self.assertEqual(self.names('/tasks/?to_month=2'), ['before', 'starts before'])
+        self.assertEqual(self.names('/tasks/?from_month=11&to_month=20'), [])
+        # a deliverable is a single month, one without a deadline is in no range
+        self.assertEqual(self.names('/deliverables/?from_month=4&to_month=6'), ['D4', 'D6'])
+        self.assertEqual(len(self.names('/deliverables/')), 5)
+
+        # the budget of make_project runs over months 1..12
+        cells = self.client.get('/budget/?from_month=12&to_month=14', **self.auth).json()
+        self.assertEqual([key.rsplit('_', 1)[1] for key in cells], ['12'])
+
+    def test_malformed(self):
+        for url in ('/tasks/', '/workpackages/', '/deliverables/', '/budget/'):
+            for query in ('from_month=x', 'to_month=1.5', 'from_month=6&to_month=4'):
+                with self.subTest(url=url, query=query):
+                    self.assertEqual(self.client.get(f'{url}?{query}', **self.auth).status_code, 400)
+
+
+class ValueRowsTests(TestCase):
+    """The values() read path renders the same bytes as the serializers it replaces."""
+
+    def test_same_bytes_as_serializers(self):
+        lead = ProjectLeadUser.objects.create_user(username='lead', email='lead@example.com', password='pw')
+        project = make_project(lead, 'rows', 3, 3, 4)
+        task = Task.objects.filter(work_package__project=project).first()
+        people = list(User.objects.filter(project_lead=lead))
+        task.users.set([people[2], people[0]])  # assigned out of id order
+        WorkPackage.objects.filter(project=project).update(description=None)
+        lists = [
+            (UserSerializer, User.objects.filter(project_lead=lead)),
+            (WorkPackageSerializer, WorkPackage.objects.filter(project=project)),
+            (TaskSerializer, Task.objects.filter(work_package__project=project)),
+            (DeliverableSerializer, Deliverable.objects.filter(work_package__project=project)),
+        ]
+        for serializer_class, queryset in lists:
+            for fields in (None, ['users', 'name', 'id']):
+                if fields and serializer_class is UserSerializer:
+                    continue
+                with self.subTest(serializer=serializer_class.__name__, fields=fields):
+                    queryset = queryset.order_by('id')
+                    expected = serializer_class(queryset.prefetch_related('users') if hasattr(queryset.model, 'users') else queryset,
+                                                many=True).data
+                    if fields:
+                        expected = [{name: row[name] for name in serializer_class.Meta.fields if name in fields} for row in expected]
+                    value_rows = ValueRows(serializer_class, fields)
+                    rows = value_rows.rows(list(value_rows.values(queryset)))
+                    self.assertEqual(JsonResponse(rows, safe=False).content, JsonResponse(expected, safe=False).content)
+
+
+class ResponseCacheTests(QueryBudgetMixin, TestCase):
+    """Project list reads are served from the cache until a write to that project, whatever the cache backend."""
+
+    def setUp(self):
+        self.lead = ProjectLeadUser.objects.create_user(username='lead', email='lead@example.com', password='pw')
+        self.project = make_project(self.lead, 'cached', 2, 2, 2)
+        self.other = make_project(self.lead, 'other', 1, 1, 1)
+        token = str(RefreshToken.for_user(self.lead).access_token)
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def get(self, url, project):
+        return self.client.get(url, HTTP_X_PROJECT_ID=str(project.id), **self.auth)
+
+    def check_invalidation(self):
+        first = self.get('/tasks/', self.project)
+        self.assertNotIn('X-Cache', first)
+        self.get('/tasks/', self.other)
+        with self.assertMaxQueries(1):  # the project lookup of the ETag check
+            second = self.get('/tasks/', self.project)
+        self.assertEqual((second['X-Cache'], second.content), ('hit', first.content))
+        self.assertNotIn('X-Cache', self.get('/tasks/?fields=id,name', self.project))
+
+        task = Task.objects.filter(work_package__project=self.project).first()
+        task.name = 'Renamed'
+        task.save()
+        third = self.get('/tasks/', self.project)
+        self.assertNotIn('X-Cache', third)
+        self.assertIn('Renamed', [t['name'] for t in third.json()])
+        self.assertEqual(self.get('/tasks/', self.other)['X-Cache'], 'hit')  # other projects keep their entries
+
+        person = User.objects.filter(project_lead=self.lead).first()
+        self.get('/budget/', self.project)
+        self.assertEqual(self.get('/budget/', self.project)['X-Cache'], 'hit')
+        task.users.remove(person)  # m2m_changed
+        self.assertNotIn('X-Cache', self.get('/tasks/', self.project))
+
+    def test_locmem(self):
+        self.check_invalidation()
+
+    def test_file_backend(self):
+        with tempfile.TemporaryDirectory() as location:
+            caches = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                      'responses': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location,
+                                    'OPTIONS': {'MAX_ENTRIES': 50}}}
+            with override_settings(CACHES=caches):
+                self.check_invalidation()
+
+    async def test_async_views(self):
+        headers = {'Authorization': self.auth['HTTP_AUTHORIZATION'], 'X-Project-Id': str(self.project.id)}
+        first = await self.async_client.get('/workpackages/', headers=headers)
+        second = await self.async_client.get('/workpackages/', headers=headers)
+        self.assertEqual((second['X-Cache'], second.content), ('hit', first.content))
+
+
+@override_settings(PROJECT_EVENTS_HEARTBEAT=0.1)
+class ProjectEventsTests(TestCase):
+    """Open event streams get each saved or deleted row of their project once the write commits."""
+
+    def setUp(self):
+        self.lead = ProjectLeadUser.objects.create_user(username='lead', email='lead@example.com', password='pw')
+        self.project = make_project(self.lead, 'events', 1, 1, 1)
+        self.other = make_project(self.lead, 'other', 1, 1, 1)
+        token = str(RefreshToken.for_user(self.lead).access_token)
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {token}', 'HTTP_X_PROJECT_ID': str(self.project.id)}
+
+    def next_event(self, stream):
+        chunk = next(stream).decode()
+        while chunk.startswith(':'):  # keep-alive
+            chunk = next(stream).decode()
+        name, data = chunk.strip().split('\n')[-2:]
+        return name.removeprefix('event: '), json.loads(data.removeprefix('data: '))
+
+    def test_row_events(self):
+        response = self.client.get(f'/projects/{self.project.id}/events/', **self.auth)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = iter(response.streaming_content)
+        self.project.refresh_from_db()
+        self.assertEqual(self.next_event(stream), ('ready', {'project': self.project.id, 'version': self.project.version}))
+
+        wp = self.project.work_packages.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            WorkPackage.objects.get(project=self.other).save()  # another project, not sent
+            wp.name = 'Renamed'
+            wp.save()
+        name, event = self.next_event(stream)
+        self.assertEqual((name, event['type'], event['action']), ('change', 'work_package', 'saved'))
+        self.assertEqual(event['data']['name'], 'Renamed')
+
+        task = Task.objects.get(work_package=wp)
+        task_id = task.id
+        with self.captureOnCommitCallbacks(execute=True):
+            task.delete()
+        self.assertEqual(self.next_event(stream)[1],
+                         {'type': 'task', 'action': 'deleted', 'id': task_id, 'data': {'id': task_id, 'work_package': wp.id}})
+
+        person = wp.users.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch('/budget/', data=json.dumps({f'{wp.id}_{person.id}_1': '0.5', f'{wp.id}_{person.id}_2': None}),
+                              content_type='application/json', **self.auth)
+        self.assertEqual(self.next_event(stream)[1], {'type': 'budget', 'action': 'changed', 'data': {
+            f'{wp.id}_{person.id}_1': '0.50', f'{wp.id}_{person.id}_2': None}})
+
+        response.close()
+        self.assertFalse(get_broker().active())
+
+    def test_nothing_built_without_listeners(self):
+        wp = self.project.work_packages.get()
+        with self.captureOnCommitCallbacks() as callbacks:
+            wp.save()
+        self.assertEqual(callbacks, [])
+
+    def test_slow_subscriber_gets_reset(self):
+        broker = InProcessBroker(max_pending=2)
+        subscription = broker.subscribe(self.project.id)
+        for i in range(3):
+            broker.publish(self.project.id, {'n': i})
+        self.assertEqual(subscription.get(timeout=0), RESET)
+        self.assertIsNone(subscription.get(timeout=0))
+        subscription.close()
+        self.assertFalse(broker.active())
+
+    async def test_async_subscription(self):
+        broker = InProcessBroker()
+        subscription = broker.subscribe(self.project.id)
+        self.assertIsNone(await subscription.aget(timeout=0.01))
+        broker.publish(self.project.id, {'n': 1})
+        self.assertEqual(await subscription.aget(timeout=1), {'n': 1})
+
+
+class BatchTests(TestCase):
+    """Batch writes are validated as a whole: one bad item and nothing of the batch is saved."""
+
+    def setUp(self):
+        self.lead = ProjectLeadUser.objects.create_user(username='lead', email='lead@example.com', password='pw')
+        self.project = make_project(self.lead, 'batch', 2, 2, 2)
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.lead).access_token}',
+                     'HTTP_X_PROJECT_ID': str(self.project.id)}
+        self.wp, self.other_wp = self.project.work_packages.order_by('id')
+        self.people = list(User.objects.filter(project_lead=self.lead).order_by('id').values_list('id', flat=True))
+        # rows of another lead, never reachable through this project
+        stranger = ProjectLeadUser.objects.create_user(username='other', email='other@example.com', password='pw')
+        foreign = make_project(stranger, 'foreign', 1, 1, 1)
+        self.foreign_wp = foreign.work_packages.get()
+        self.foreign_task = self.foreign_wp.tasks.get()
+        self.foreign_user = User.objects.get(project_lead=stranger)
+
+    def post(self, model, payload):
+        return self.client.post(f'/{model}/batch/', json.dumps(payload), content_type='application/json', **self.auth)
+
+    def snapshot(self):
+        return (list(Task.objects.order_by('id').values_list('id', 'name', 'start_date', 'end_date', 'work_package')),
+                list(Task.users.through.objects.order_by('id').values_list('task_id', 'user_id')),
+                list(WorkPackage.objects.order_by('id').values_list('id', 'name', 'start_date', 'end_date')),
+                list(Deliverable.objects.order_by('id').values_list('id', 'name', 'deadline')))
+
+    def test_all_or_nothing(self):
+        before = self.snapshot()
+        task, other = self.wp.tasks.order_by('id')
+        response = self.post('tasks', {
+            'create': [{'name': 'New', 'start_date': 1, 'end_date': 3, 'work_package': self.wp.id},
+                       {'name': 'Backwards', 'start_date': 5, 'end_date': 2, 'work_package': self.wp.id}],
+            'update': [{'id': task.id, 'name': 'Renamed'}, {'id': 999999, 'name': 'Missing'}, {'id': other.id, 'end_date': 'soon'}],
+            'delete': [other.id, 888888],
+        })
+        self.assertEqual(response.status_code, 400)
+        details = response.json()['details']
+        # every bad item is reported with its index, row checks after the lookups
+        self.assertEqual([(e['op'], e['index']) for e in details],
+                         [('update', 1), ('update', 2), ('delete', 1), ('create', 1)])
+        self.assertEqual([e['error'] for e in details], [
+            "Task with ID 999999 not found.", f"Task with ID {other.id} is also deleted.",
+            "Task with ID 888888 not found.", "Task cannot end before it starts.",
+        ])
+        self.assertEqual(self.snapshot(), before)
+
+    def test_malformed_ids(self):
+        before = self.snapshot()
+        task = self.wp.tasks.order_by('id').first()
+        response = self.post('workpackages', {
+            'update': [{'id': [1]}, {'name': 'No id'}, {'id': '1', 'name': 'X'}, 'text'],
+            'delete': [{'a': 1}, True, None, self.other_wp.id],
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['details'], [
+            *({'op': 'update', 'index': i, 'error': "id must be an integer."} for i in range(4)),
+            *({'op': 'delete', 'index': i, 'error': "id must be an integer."} for i in range(3)),
+        ])
+        response = self.post('tasks', {'update': [{'id': {'id': task.id}}], 'delete': [[task.id]]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.snapshot(), before)
+
+    def test_partial_updates_and_results(self):
+        task, gone = self.wp.tasks.order_by('id')
+        users = set(task.users.values_list('id', flat=True))
+        response = self.post('tasks', {
+            'delete': [gone.id],
+            'update': [{'id': task.id, 'name': 'Renamed'}],
+            'create': [{'name': 'A', 'start_date': 1, 'end_date': 2, 'work_package': self.wp.id, 'users': self.people[:1]},
+                       {'name': 'B', 'start_date': 2, 'end_date': 4, 'work_package': self.other_wp.id}],
+        })
+        self.assertEqual(response.status_code, 200, response.content)
+        results = response.json()['results']
+        # creates, updates then deletes, each in the order sent
+        self.assertEqual([(r['op'], r['index']) for r in results], [('create', 0), ('create', 1), ('update', 0), ('delete', 0)])
+        created = [Task.objects.get(id=r['id']) for r in results[:2]]
+        self.assertEqual([(t.name, t.work_package_id) for t in created], [('A', self.wp.id), ('B', self.other_wp.id)])
+        self.assertEqual(list(created[0].users.values_list('id', flat=True)), self.people[:1])
+        self.assertEqual((results[2]['id'], results[3]['id']), (task.id, gone.id))
+
+        # fields that are not sent stay as they were, users included
+        task.refresh_from_db()
+        self.assertEqual((task.name, task.start_date, task.end_date, task.work_package_id), ('Renamed', 1, 6, self.wp.id))
+        self.assertEqual(set(task.users.values_list('id', flat=True)), users)
+        self.assertFalse(Task.objects.filter(id=gone.id).exists())
+        self.assertEqual(WorkPackageSummary.objects.get(work_package=self.wp).task_count, 2)
+
+        response = self.post('workpackages', {'update': [{'id': self.wp.id, 'end_date': 13}]})
+        self.assertEqual(response.status_code, 200)
+        self.wp.refresh_from_db()
+        self.assertEqual((self.wp.name, self.wp.start_date, self.wp.end_date), ('WP0', 1, 13))
+        # its deliverable is due in month 12
+        response = self.post('workpackages', {'update': [{'id': self.wp.id, 'end_date': 8}]})
+        self.assertEqual(response.json()['details'], [{'op': 'update', 'index': 0, 'error': "Deliverable months cannot exceed WorkPackage months."}])
+
+    def test_foreign_rows(self):
+        before = self.snapshot()
+        cases = [
+            ('workpackages', {'create': [{'name': 'X', 'start_date': 1, 'end_date': 2, 'users': [self.foreign_user.id]}]},
+             f"User with ID {self.foreign_user.id} not found."),
+            ('workpackages', {'update': [{'id': self.foreign_wp.id, 'name': 'X'}]}, f"WorkPackage with ID {self.foreign_wp.id} not found."),
+            ('workpackages', {'delete': [self.foreign_wp.id]}, f"WorkPackage with ID {self.foreign_wp.id} not found."),
+            ('tasks', {'create': [{'name': 'X', 'start_date': 1, 'end_date': 2, 'work_package': self.foreign_wp.id}]}, "WorkPackage not found."),
+            ('tasks', {'update': [{'id': self.foreign_task.id, 'name': 'X'}]}, f"Task with ID {self.foreign_task.id} not found."),
+            ('tasks', {'create': [{'name': 'X', 'start_date': 1, 'end_date': 2, 'work_package': self.wp.id, 'users': [self.foreign_user.id]}]},
+             f"User with ID {self.foreign_user.id} is not part of the WorkPackage."),
+            ('deliverables', {'create': [{'name': 'X', 'deadline': 2, 'work_package': self.foreign_wp.id}]}, "WorkPackage not found."),
+        ]
+        for model, payload, error in cases:
+            with self.subTest(model=model, payload=payload):
+                response = self.post(model, payload)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual([e['error'] for e in response.json()['details']], [error])
+        self.assertEqual(self.snapshot(), before)
+        self.assertEqual(self.foreign_wp.tasks.get().name, self.foreign_task.name)
+
+
+class SummaryTests(QueryBudgetMixin, TestCase):
+    """Summary rows follow every write in the same transaction, rebuild_summaries repairs drift."""
+
+    def setUp(self):
+        self.lead = ProjectLeadUser.objects.create_user(username='lead', email='lead@example.com', password='pw')
+        self.project = make_project(self.lead, 'summaries', 2, 3, 2)
+        refresh_projects(id=self.project.id)  # make_project bulk-creates the budget, bulk_create sends no signals
+        self.first, self.second = self.project.work_packages.order_by('id')
+        token = str(RefreshToken.for_user(self.lead).access_token)
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {token}', 'HTTP_X_PROJECT_ID': str(self.project.id)}
+
+    def numbers(self, summary, *fields):
+        return tuple(getattr(summary, field) for field in fields)
+
+    def test_signals(self):
+        project = ProjectSummary.objects.get(project=self.project)
+        # 2 WPs x 2 people x 12 months x 0.10, wages 1000 and 1001
+        self.assertEqual(self.numbers(project, 'work_package_count', 'task_count', 'deliverable_count', 'start_month', 'end_month'),
+                         (2, 6, 2, 1, 12))
+        self.assertEqual((project.person_months, project.cost), (Decimal('4.80'), Decimal('4802.4')))
+
+        task = self.first.tasks.first()
+        task.work_package = self.second
+        task.save()
+        self.assertEqual(WorkPackageSummary.objects.get(work_package=self.first).task_count, 2)
+        self.assertEqual(WorkPackageSummary.objects.get(work_package=self.second).task_count, 4)
+
+        person = User.objects.get(name='summaries user 0')
+        person.wage = 2000
+        person.save()
+        self.assertEqual(ProjectSummary.objects.get(project=self.project).cost, Decimal('7202.40'))
+
+        self.client.patch('/budget/', json.dumps({f'{self.first.id}_{person.id}_1': '0.50'}), content_type='application/json', **self.auth)
+        self.assertEqual(WorkPackageSummary.objects.get(work_package=self.first).person_months, Decimal('2.80'))
+
+        # the batch path recounts the WPs a task left and joined
+        moved, deleted = self.second.tasks.order_by('id')[:2]
+        response = self.client.post('/tasks/batch/', json.dumps({'update': [{'id': moved.id, 'work_package': self.first.id}], 'delete': [deleted.id]}),
+                                    content_type='application/json', **self.auth)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(WorkPackageSummary.objects.get(work_package=self.first).task_count, 3)
+        self.assertEqual(WorkPackageSummary.objects.get(work_package=self.second).task_count, 2)
+        self.assertEqual(ProjectSummary.objects.get(project=self.project).task_count, 5)
+
+        self.second.delete()
+        project = ProjectSummary.objects.get(project=self.project)
+        self.assertEqual(self.numbers(project, 'work_package_count', 'task_count', 'person_months'), (1, 3, Decimal('2.80')))
+
+    def test_api(self):
+        with self.assertMaxQueries(2):
+            projects = self.client.get('/projects/', **self.auth).json()
+        self.assertEqual(projects[0]['summary']['task_count'], 6)
+        self.assertEqual(projects[0]['summary']['person_months'], '4.80')
+
+        self.assertNotIn('summary', self.client.get('/workpackages/', **self.auth).json()[0])
+        rows = self.client.get('/workpackages/?summary=1', **self.auth).json()
+        detail = self.client.get(f'/workpackages/{self.first.id}/?summary=1', **self.auth).json()
+        self.assertEqual(rows[0], detail)
+        self.assertEqual(detail['summary'], {'task_count': 3, 'deliverable_count': 1, 'person_months': '2.40', 'cost': '2401.2000'})
+
+    def test_rebuild(self):
+        ProjectSummary.objects.update(task_count=0)
+        WorkPackageSummary.objects.filter(work_package=self.first).delete()
+        out = io.StringIO()
+        call_command('rebuild_summaries', '--dry-run', stdout=out)
+        self.assertIn('1 work package and 1 project summaries would be corrected', out.getvalue())
+        self.assertEqual(ProjectSummary.objects.get(project=self.project).task_count, 0)
+
+        call_command('rebuild_summaries', stdout=io.StringIO())
+        self.assertEqual(ProjectSummary.objects.get(project=self.project).task_count, 6)
+        self.assertEqual(WorkPackageSummary.objects.get(work_package=self.first).task_count, 3)
+        out = io.StringIO()
+        call_command('rebuild_summaries', stdout=out)
+        self.assertIn('0 work package and 0 project summaries corrected', out.getvalue())
+
+    def test_without_upsert(self):
+        # Oracle and MySQL have no ON CONFLICT with a target, the summaries are written with plain bulk queries
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False):
+            WorkPackageSummary.objects.filter(work_package=self.first).delete()
+            ProjectSummary.objects.update(task_count=0)
+            refresh_projects(id=self.project.id)
+            wp = WorkPackage.objects.create(name='New', start_date=1, end_date=24, project=self.project)
+        self.assertEqual(WorkPackageSummary.objects.get(work_package=self.first).task_count, 3)
+        self.assertEqual(WorkPackageSummary.objects.get(work_package=wp).task_count, 0)
+        summary = ProjectSummary.objects.get(project=self.project)
+        self.assertEqual(self.numbers(summary, 'work_package_count', 'task_count', 'end_month'), (3, 6, 24))
+
+
+class CapacityTests(TestCase):
+    """Nobody may be planned above 1.0 in a calendar month, summed over all projects of the lead."""
+
+    def setUp(self):
+        self.lead = ProjectLeadUser.objects.create_user(username='lead', email='lead@example.com', password='pw')
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.lead).access_token}'}
+        self.person = User.objects.create(name='Ayse', wage=1000, project_lead=self.lead)
+        self.project = Project.objects.create(owner=self.lead, name='A', start_date=datetime.date(2025, 1, 1))
+        self.wp = WorkPackage.objects.create(name='WP', start_date=1, end_date=12, project=self.project)
+        # month 1 of this project is month 4 of the first one
+        other = Project.objects.create(owner=self.lead, name='B', start_date=datetime.date(2025, 4, 1))
+        other_wp = WorkPackage.objects.create(name='WP', start_date=1, end_date=12, project=other)
+        BudgetEntry.objects.create(work_package=other_wp, user=self.person, month=1, contribution='0.60')
+
+    def save(self, method, cells):
+        data = {f"{self.wp.id}_{self.person.id}_{month}": value for month, value in cells.items()}
+        return getattr(self.client, method)('/budget/', json.dumps(data), content_type='application/json',
+                                            HTTP_X_PROJECT_ID=str(self.project.id), **self.auth)
+
+    def test_other_projects_count(self):
+        response = self.save('patch', {3: '0.50', 4: '0.50'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.json()['details']), [f'capacity_{self.person.id}_4'])
+        self.assertFalse(BudgetEntry.objects.filter(work_package=self.wp).exists())
+
+        self.assertEqual(self.save('post', {3: '0.50', 4: '0.40'}).status_code, 201)
+        self.assertEqual(self.save('patch', {4: '0.41'}).status_code, 400)
+
+    def test_portfolio_workload(self):
+        # rows written around the check (e.g. older data) still show up as over-allocated
+        BudgetEntry.objects.create(work_package=self.wp, user=self.person, month=4, contribution='0.50')
+        BudgetEntry.objects.create(work_package=self.wp, user=self.person, month=6, contribution='0.25')
+        idle = User.objects.create(name='Mehmet', wage=1000, project_lead=self.lead)
+
+        workload = self.client.get('/portfolio/workload/', **self.auth).json()
+        self.assertEqual(workload['months'], ['2025-04', '2025-05', '2025-06'])
+        self.assertEqual(workload['users'], [{'id': self.person.id, 'name': 'Ayse'}, {'id': idle.id, 'name': 'Mehmet'}])
+        self.assertEqual(workload['allocations'], [['1.10', '0.00', '0.25'], ['0.00', '0.00', '0.00']])
+        self.assertEqual(workload['over_allocated'], [{'user': self.person.id, 'month': '2025-04', 'allocated': '1.10'}])
+
+        workload = self.client.get('/portfolio/workload/?from=2025-05&to=2025-07', **self.auth).json()
+        self.assertEqual(workload['months'], ['2025-05', '2025-06', '2025-07'])
+        self.assertEqual(workload['allocations'][0], ['0.00', '0.25', '0.00'])
+        self.assertEqual(workload['over_allocated'], [])
+        self.assertEqual(self.client.get('/portfolio/workload/?from=2025-13', **self.auth).status_code, 400)
+
+
+class SnapshotTests(TestCase):
+    """The snapshot nests the same rows the pages otherwise fetch one endpoint at a time."""
+
+    def setUp(self):
+        self.lead = ProjectLeadUser.objects.create_user(username='lead', email='lead@example.com', password='pw')
+        self.project = make_project(self.lead, 'snap', 3, 2, 2)
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.lead).access_token}',
+                     'HTTP_X_PROJECT_ID': str(self.project.id)}
+        first, second, third = self.project.work_packages.order_by('id')
+        # ordered by dates, not ids
+        WorkPackage.objects.filter(id=first.id).update(start_date=3)
+        WorkPackage.objects.filter(id=third.id).update(start_date=1, end_date=6)
+        Task.objects.filter(work_package=second, name='T1.0').update(start_date=2)
+        Deliverable.objects.create(name='Early', deadline=4, work_package=second)
+
+    def get(self, url):
+        response = self.client.get(url, **self.auth)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_same_rows_as_the_endpoints(self):
+        snapshot = self.get(f'/projects/{self.project.id}/snapshot/')
+        self.assertEqual(snapshot['project'], self.get(f'/projects/{self.project.id}/'))
+        self.assertEqual(snapshot['users'], self.get('/users/'))
+
+        names = [(wp['name'], [t['name'] for t in wp['tasks']], [d['name'] for d in wp['deliverables']])
+                 for wp in snapshot['work_packages']]
+        self.assertEqual(names, [('WP2', ['T2.0', 'T2.1'], ['D2']), ('WP1', ['T1.1', 'T1.0'], ['Early', 'D1']),
+                                 ('WP0', ['T0.0', 'T0.1'], ['D0'])])
+        for wp in snapshot['work_packages']:
+            tasks, deliverables = wp.pop('tasks'), wp.pop('deliverables')
+            self.assertEqual(wp, self.get(f"/workpackages/{wp['id']}/"))
+            self.assertEqual(tasks, [self.get(f"/tasks/{task['id']}/") for task in tasks])
+            self.assertEqual(deliverables, [self.get(f"/deliverables/{d['id']}/") for d in deliverables])
+
+    def test_other_leads_project(self):
+        other = ProjectLeadUser.objects.create_user(username='other', email='other@example.com', password='pw')
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(other).access_token}'}
+        self.assertEqual(self.client.get(f'/projects/{self.project.id}/snapshot/', **headers).status_code, 404)
+        self.assertEqual(self.client.post(f'/projects/{self.project.id}/snapshot/', **self.auth).status_code, 405)
+
+
+class GanttTests(TestCase):
+    """The Gantt feed gives the bars the page used to build in the browser, for every filter."""
+
+    def setUp(self):
+        self.lead = ProjectLeadUser.objects.create_user(username='lead', email='lead@example.com', password='pw')
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.lead).access_token}'}
+        # the 31st, month arithmetic has to clamp to shorter months like dayjs does
+        self.project = Project.objects.create(owner=self.lead, name='gantt', start_date=datetime.date(2025, 1, 31))
+        self.ali, self.ayse, self.can = (User.objects.create(name=name, wage=1000, project_lead=self.lead) for name in ('Ali', 'Ayse', 'Can'))
+        shape = [  # (start, end, status, staff, tasks as (start, end, status, staff), deliverable deadlines)
+            (1, 6, 'active', [self.ali, self.ayse], [(1, 2, 'active', [self.ali]), (3, 6, 'closed', [self.ayse])], [2, 6]),
+            (4, 12, 'closed', [self.ayse], [(4, 12, 'closed', [self.ayse])], [12]),
+            (7, 18, 'active', [self.can, self.ali], [(7, 9, 'active', [self.can]), (10, 18, 'active', [self.ali, self.can])], [9]),
+        ]
+        for n, (start, end, status, staff, tasks, deadlines) in enumerate(shape):
+            wp = WorkPackage.objects.create(name=f'WP{n}', start_date=start, end_date=end, status=status, project=self.project)
+            wp.users.set(staff)
+            for m, (task_start, task_end, task_status, task_staff) in enumerate(tasks):
+                task = Task.objects.create(name=f'T{n}.{m}', start_date=task_start, end_date=task_end, status=task_status, work_package=wp)
+                task.users.set(task_staff)
+            for m, deadline in enumerate(deadlines):
+                Deliverable.objects.create(name=f'D{n}.{m}', deadline=deadline, work_package=wp)
+
+    def client_bars(self, filters):
+        """Port of the page's former buildGanttData(), walking the rows in the order the feed sorts them."""
+        start = self.project.start_date
+
+        def date(months):
+            return add_months(start, months).isoformat()
+
+        def in_range(first, last):
+            return not (filters['from'] and last < filters['from'].isoformat() or filters['to'] and first > filters['to'].isoformat())
+
+        def allowed(row):
+            return ((filters['status'] is None or row.status == filters['status'])
+                    and (filters['users'] is None or any(user.id in filters['users'] for user in row.users.all())))
+
+        bars = []
+        for wp in WorkPackage.objects.filter(project=self.project).order_by('start_date', 'end_date', 'id'):
+            if not ('work_packages' in filters['kinds'] and allowed(wp)
+                    and (filters['work_packages'] is None or wp.id in filters['work_packages'])):
+                continue
+            first, last = date(wp.start_date - 1), date(wp.end_date)
+            if not in_range(first, last):
+                continue
+            bars.append({'id': f'WP-{wp.id}', 'name': wp.name, 'start': first, 'end': last, 'custom_class': 'bar-wp', 'progress': 100})
+            if 'tasks' in filters['kinds']:
+                for task in wp.tasks.order_by('start_date', 'end_date', 'id'):
+                    first, last = date(task.start_date - 1), date(task.end_date)
+                    if allowed(task) and in_range(first, last):
+                        bars.append({'id': f'T-{task.id}', 'name': task.name, 'start': first, 'end': last,
+                                     'custom_class': 'bar-task', 'progress': 100, 'parent': f'WP-{wp.id}'})
+            if 'deliverables' in filters['kinds']:
+                for deliverable in wp.deliverables.order_by('deadline', 'id'):
+                    deadline = date(deliverable.deadline - 1)
+                    if in_range(deadline, deadline):
+                        bars.append({'id': f'D-{deliverable.id}', 'name': deliverable.name, 'start': deadline, 'end': deadline,
+                                     'custom_class': 'bar-deliverable', 'progress': 100, 'parent': f'WP-{wp.id}'})
+        return bars
+
+    def test_same_bars_as_the_page(self):
+        second = WorkPackage.objects.get(name='WP1').id
+        queries = [
+            '', 'status=active', 'status=closed', f'users={self.ali.id}', f'users={self.ayse.id},{self.can.id}', 'users=',
+            f'work_packages={second}', 'work_packages=', 'from=2025-06-15', 'to=2025-04-30', 'from=2025-07-31&to=2025-09-30',
+            'from=2025-02-28&to=2025-02-28', 'kinds=work_packages', 'kinds=work_packages,deliverables',
+            f'status=active&users={self.ali.id}&from=2025-03-01&kinds=work_packages,tasks',
+        ]
+        for query in queries:
+            with self.subTest(query=query):
+                response = self.client.get(f'/projects/{self.project.id}/gantt/?{query}', **self.auth)
+                self.assertEqual(response.status_code, 200, response.content)
+                self.assertEqual(response.json()['bars'], self.client_bars(parse_gantt_filters(QueryDict(query))))
+
+    def test_dates_and_kinds(self):
+        bars = {bar['id']: bar for bar in self.client.get(f'/projects/{self.project.id}/gantt/', **self.auth).json()['bars']}
+        wp = WorkPackage.objects.get(name='WP0')
+        # months 1-6 from Jan 31st: Jan 31st up to Jul 31st, the deliverable of month 2 on Feb 28th
+        self.assertEqual((bars[f'WP-{wp.id}']['start'], bars[f'WP-{wp.id}']['end']), ('2025-01-31', '2025-07-31'))
+        deliverable = wp.deliverables.get(deadline=2)
+        self.assertEqual(bars[f'D-{deliverable.id}']['start'], '2025-02-28')
+
+        # without WP bars the tasks come without a parent, nothing the page could show before;
+        # their WP still has to pass the filters (T0.1 is closed, WP0 is not)
+        bars = self.client.get(f'/projects/{self.project.id}/gantt/?kinds=tasks&status=closed', **self.auth).json()['bars']
+        self.assertEqual([(bar['name'], 'parent' in bar) for bar in bars], [('T1.0', False)])
+        for query in ('kinds=bars', 'status=open', 'users=a', 'from=2025-13-01', 'from=2025-05-01&to=2025-04-01'):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f'/projects/{self.project.id}/gantt/?{query}', **self.auth).status_code, 400)
+
+
+class SchedulingTests(TestCase):
+    """Critical path and cascading moves of scheduling.Plan, on an in-memory plan."""
+
+    def plan(self):
+        # WP1 [1, 6] -> WP2 [7, 12]; tasks 1 -> 2 -> 3 across them with a month of lag before 3
+        return Plan(
+            work_packages=[(1, 1, 6), (2, 7, 12)],
+            tasks=[(1, 1, 3, 1), (2, 4, 6, 1), (3, 8, 10, 2)],
+            deliverables=[(1, 6, 1)],
+            work_package_links=[(1, 2, 0)],
+            task_links=[(1, 2, 0), (2, 3, 1)],
+        )
+
+    def test_critical_path(self):
+        finish, timings, critical = self.plan().critical_path()
+        self.assertEqual(finish, 12)
+        self.assertEqual(timings[(TASK, 3)]['slack'], 2)
+        self.assertEqual(critical, [(WORK_PACKAGE, 1), (TASK, 1), (TASK, 2), (WORK_PACKAGE, 2)])
+
+    def test_reschedule_cascades(self):
+        changed, deadlines = self.plan().reschedule((WORK_PACKAGE, 1), 3, 8)
+        self.assertEqual(changed, {
+            (WORK_PACKAGE, 1): (3, 8), (TASK, 1): (3, 5), (TASK, 2): (6, 8),
+            (WORK_PACKAGE, 2): (9, 14), (TASK, 3): (10, 12),
+        })
+        self.assertEqual(deadlines, {1: 8})
+
+    def test_reschedule_conflicts(self):
+        with self.assertRaises(ScheduleError) as ctx:
+            self.plan().reschedule((WORK_PACKAGE, 1), 1, 4)
+        self.assertEqual(len(ctx.exception.errors), 2)  # task 2 and the deliverable no longer fit
+        with self.assertRaises(ScheduleError):
+            plan = self.plan()
+            plan.link((TASK, 3), (TASK, 1), 0)
+            plan.order()
+
+
+class ExportTests(TestCase):
+    """The streamed export is one JSON document, in the shape and order the importer reads."""
+
+    def setUp(self):
+        self.lead = ProjectLeadUser.objects.create_user(username='lead', email='lead@example.com', password='pw')
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.lead).access_token}'}
+        self.project = make_project(self.lead, 'exported', 2, 2, 2)
+        make_project(self.lead, 'elsewhere', 1, 1, 1)  # its personnel is not part of the export
+        self.wp = self.project.work_packages.order_by('id').first()
+        self.wp.description = 'Line one\n"quoted"'
+        self.wp.save()
+
+    def export(self):
+        response = self.client.get(f'/projects/{self.project.id}/export/', **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="project-{self.project.id}.json"')
+        return list(response.streaming_content)
+
+    def test_document(self):
+        document = json.loads(b''.join(self.export()))
+        self.assertEqual(list(document), ['format', 'version', 'project', 'users', 'work_packages', 'work_package_users',
+                                          'tasks', 'task_users', 'deliverables', 'budget_entries'])
+        self.assertEqual((document['format'], document['version']), (EXPORT_FORMAT, EXPORT_VERSION))
+        self.project.refresh_from_db()
+        self.assertEqual(document['project'], {'id': self.project.id, 'name': 'exported', 'start_date': '2025-01-01',
+                                               'version': self.project.version})
+
+        people = list(User.objects.filter(name__startswith='exported').order_by('id'))
+        self.assertEqual(document['users'], [{'id': p.id, 'name': p.name, 'wage': str(p.wage)} for p in people])
+        self.assertEqual(document['work_packages'][0], {'id': self.wp.id, 'name': 'WP0', 'description': 'Line one\n"quoted"',
+                                                         'start_date': 1, 'end_date': 12, 'status': 'active'})
+        task = self.wp.tasks.order_by('id').first()
+        self.assertEqual(document['tasks'][0], {'id': task.id, 'name': 'T0.0', 'description': None, 'start_date': 1,
+                                                'end_date': 6, 'status': 'active', 'work_package': self.wp.id})
+        self.assertEqual(document['deliverables'][0]['deadline'], 12)
+        # assignments and budget cells are arrays
+        self.assertIn([self.wp.id, people[0].id], document['work_package_users'])
+        self.assertEqual(len(document['task_users']), 2 * 2 * 2)
+        self.assertEqual(document['budget_entries'][0], [self.wp.id, people[0].id, 1, '0.10'])
+        self.assertEqual(len(document['budget_entries']), 2 * 2 * 12)
+
+    def test_chunks(self):
+        # small flushes split rows over many chunks that still join into the same document
+        whole = json.loads(b''.join(self.export()))
+        with mock.patch('TubitakPlannerApp.export.FLUSH_BYTES', 64):
+            chunks = self.export()
+        self.assertGreater(len(chunks), 10)
+        self.assertEqual(json.loads(b''.join(chunks)), whole)
+
+
+class ImportTests(TestCase):
+    """Import documents are checked as a whole before anything is written."""
+
+    def setUp(self):
+        self.lead = ProjectLeadUser.objects.create_user(username='lead', email='lead@example.com', password='pw')
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.lead).access_token}'}
+        # Ayse is at 0.60 in April 2025 on another project
+        self.person = User.objects.create(name='Ayse', wage=1000, project_lead=self.lead)
+        other = Project.objects.create(owner=self.lead, name='B', start_date=datetime.date(2025, 4, 1))
+        other_wp = WorkPackage.objects.create(name='WP', start_date=1, end_date=12, project=other)
+        BudgetEntry.objects.create(work_package=other_wp, user=self.person, month=1, contribution='0.60')
+
+    def document(self, *budget, **header):
+        return {
+            "project": header or {"name": "Imported", "start_date": "2025-01-01"},
+            "users": [{"id": "u1", "name": "Ayse", "wage": 1000}, {"id": "u2", "name": "New", "wage": 900}],
+            "work_packages": [{"id": "w1", "name": "WP", "start_date": 1, "end_date": 12, "status": "active"}],
+            "work_package_users": [["w1", "u1"], ["w1", "u2"]],
+            "budget_entries": list(budget),
+        }
+
+    def post(self, document):
+        return self.client.post('/projects/import/', json.dumps(document), content_type='application/json', **self.auth)
+
+    def test_capacity_across_projects(self):
+        # month 4 of the import is April 2025; u2 is a new person, only the document counts for them
+        response = self.post(self.document(["w1", "u1", 3, "0.50"], ["w1", "u1", 4, "0.50"], ["w1", "u2", 4, "1.00"]))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([e['error'] for e in response.json()['details']],
+                         ["Ayse is allocated 1.10 in month 4 across all projects, more than 1.0."])
+        self.assertFalse(Project.objects.filter(name='Imported').exists())
+
+        response = self.post(self.document(["w1", "u1", 4, "0.40"], ["w1", "u2", 4, "1.00"]))
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()['users_created'], 1)
+        self.assertEqual(BudgetEntry.objects.filter(user=self.person).count(), 2)
+
+        # a later start moves the same months away from the booked one
+        later = self.document(["w1", "u1", 4, "0.50"], name="Later", start_date="2025-02-01")
+        self.assertEqual(self.post(later).status_code, 201)
+
+    def export(self, project, lead):
+        token = RefreshToken.for_user(lead).access_token
+        response = self.client.get(f'/projects/{project.id}/export/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        return json.loads(b''.join(response.streaming_content))
+
+    def normalized(self, document):
+        # ids -> positions in their section, what must survive an export and import
+        users = {row['id']: i for i, row in enumerate(document['users'])}
+        wps = {row['id']: i for i, row in enumerate(document['work_packages'])}
+        tasks = {row['id']: i for i, row in enumerate(document['tasks'])}
+        return {
+            "users": [dict(row, id=users[row['id']]) for row in document['users']],
+            "work_packages": [dict(row, id=wps[row['id']]) for row in document['work_packages']],
+            "work_package_users": sorted([wps[wp], users[user]] for wp, user in document['work_package_users']),
+            "tasks": [dict(row, id=tasks[row['id']], work_package=wps[row['work_package']]) for row in document['tasks']],
+            "task_users": sorted([tasks[task], users[user]] for task, user in document['task_users']),
+            "deliverables": [dict(row, id=None, work_package=wps[row['work_package']]) for row in document['deliverables']],
+            "budget_entries": sorted([wps[wp], users[user], month, c] for wp, user, month, c in document['budget_entries']),
+        }
+
+    def test_round_trip(self):
+        source = make_project(self.lead, 'source', 3, 2, 2)
+        Task.objects.filter(work_package__project=source).update(status='closed', description='Done')
+        document = self.export(source, self.lead)
+
+        # to another lead, whose personnel is created from the document
+        other = ProjectLeadUser.objects.create_user(username='other', email='other@example.com', password='pw')
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(other).access_token}'}
+        response = self.client.post('/projects/import/?name=Copy', json.dumps(document), content_type='application/json', **headers)
+        self.assertEqual(response.status_code, 201, response.content)
+        copy = Project.objects.get(id=response.json()['project']['id'])
+        self.assertEqual((copy.name, copy.start_date, copy.owner_id), ('Copy', source.start_date, other.id))
+        self.assertEqual(self.normalized(self.export(copy, other)), self.normalized(document))
+        self.assertEqual(ProjectSummary.objects.get(project=copy).task_count, 6)
+
+        # the same project as CSV sheets
+        def sheet(header, rows):
+            out = io.StringIO()
+            writer = csv.writer(out)
+            writer.writerow(header)
+            writer.writerows(rows)
+            return io.BytesIO(out.getvalue().encode())
+
+        wp_users, task_users = {}, {}
+        for wp, user in document['work_package_users']:
+            wp_users.setdefault(wp, []).append(str(user))
+        for task, user in document['task_users']:
+            task_users.setdefault(task, []).append(str(user))
+        dates = ('start_date', 'end_date', 'status')
+        sheets = {
+            'personnel': sheet(['id', 'name', 'wage'], [[u['id'], u['name'], u['wage']] for u in document['users']]),
+            'work_packages': sheet(['id', 'name', 'description', *dates, 'users'], [
+                [w['id'], w['name'], w['description'] or '', *(w[k] for k in dates), ';'.join(wp_users.get(w['id'], []))]
+                for w in document['work_packages']]),
+            'tasks': sheet(['id', 'name', 'description', *dates, 'work_package', 'users'], [
+                [t['id'], t['name'], t['description'] or '', *(t[k] for k in dates), t['work_package'], ';'.join(task_users.get(t['id'], []))]
+                for t in document['tasks']]),
+            'deliverables': sheet(['name', 'description', 'deadline', 'work_package'], [
+                [d['name'], d['description'] or '', d['deadline'], d['work_package']] for d in document['deliverables']]),
+            'budget': sheet(['work_package', 'user', 'month', 'contribution'], document['budget_entries']),
+        }
+        response = self.client.post('/projects/import/', {'name': 'From CSV', 'start_date': '2025-01-01', **sheets}, **headers)
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()['users_created'], 0)  # matched by name to the first copy's personnel
+        from_csv = Project.objects.get(id=response.json()['project']['id'])
+        self.assertEqual(self.normalized(self.export(from_csv, other)), self.normalized(document))
+
+    def test_duplicate_names(self):
+        # both rows would become the one Ayse: a repeated WP assignment, and 1.20 in one month
+        document = self.document(["w1", "u1", 2, "0.60"], ["w1", "u2", 2, "0.60"])
+        document['users'][1]['name'] = 'Ayse'
+        response = self.post(document)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['details'], [{"section": "users", "index": 1, "error": "Duplicate name Ayse."}])
+
+        document['budget_entries'] = []
+        self.assertEqual(self.post(document).status_code, 400)
+        self.assertFalse(Project.objects.filter(name='Imported').exists())
+
+    def test_invalid_header(self):
+        for header in (["Imported"], "Imported"):
+            response = self.post(dict(self.document(), project=header))
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['details'], [{"section": "project", "index": None, "error": "Must be an object."}])
+
+        # reported together with the row errors
+        document = self.document(["w1", "u9", 1, "0.10"], name="", start_date="2025-01-01")
+        details = self.post(document).json()['details']
+        self.assertEqual([e['section'] for e in details], ['project', 'budget_entries'])
+        self.assertIn('name', details[0]['error'])
+        self.assertFalse(Project.objects.exclude(name='B').exists())
+
+
+class JobTests(TestCase):
+    """?async=1 writes are queued, run by `manage.py run_jobs` and followed at jobs/<id>/."""
+
+    def setUp(self):
+        self.lead = ProjectLeadUser.objects.create_user(username='lead', email='lead@example.com', password='pw')
+        self.project = make_project(self.lead, 'jobs', 2, 2, 2)
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.lead).access_token}',
+                     'HTTP_X_PROJECT_ID': str(self.project.id)}
+        # export jobs write their documents to the default storage
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+    def run_jobs(self):
+        out = io.StringIO()
+        call_command('run_jobs', '--once', stdout=out, stderr=io.StringIO())
+        return out.getvalue()
+
+    def job(self, response):
+        self.assertEqual(response.status_code, 202, response.content)
+        return self.client.get(f"/jobs/{response.json()['job']['id']}/", **self.auth).json()
+
+    def test_budget_and_delete(self):
+        wp = self.project.work_packages.first()
+        person = wp.users.first()
+        for data in ({f'{wp.id}_{person.id}_1': '0.50'}, {f'{wp.id}_{person.id}_1': '1.50'}):
+            queued = self.job(self.client.patch('/budget/?async=1', json.dumps(data), content_type='application/json', **self.auth))
+        self.assertEqual((queued['status'], queued['result']), ('queued', None))
+        self.assertEqual(BudgetEntry.objects.get(work_package=wp, user=person, month=1).contribution, Decimal('0.10'))
+
+        self.assertIn('1 job(s) done, 1 failed.', self.run_jobs())
+        saved, invalid = Job.objects.order_by('id')
+        self.assertEqual((saved.status, saved.progress, saved.total, saved.result['updated']), ('done', 2, 2, 1))
+        self.assertEqual(invalid.status, 'failed')
+        self.assertIn(f'capacity_{person.id}_1', invalid.result['details'])
+
+        # soft deleted at once, purged by the job
+        self.job(self.client.delete(f'/projects/{self.project.id}/?async=1', **self.auth))
+        self.assertEqual(self.client.get('/workpackages/', **self.auth).status_code, 404)
+        self.assertTrue(Project.all_objects.filter(id=self.project.id).exists())
+        self.assertIn('1 job(s) done, 0 failed.', self.run_jobs())
+        self.assertFalse(Project.all_objects.filter(id=self.project.id).exists())
+        # one step per chunk of work packages, then the project's own rows
+        deleted = Job.objects.get(kind='delete_project')
+        self.assertEqual((deleted.status, deleted.progress, deleted.total), ('done', 2, 2))
+
+    def test_import_export_and_owner(self):
+        export_id = self.job(self.client.post(f'/projects/{self.project.id}/export/', **self.auth))['id']
+        self.run_jobs()
+        # the result names the file, the document itself is downloaded
+        exported = self.client.get(f"/jobs/{export_id}/", **self.auth).json()
+        self.assertEqual((exported['progress'], exported['total']), (7, 7))
+        self.assertEqual(exported['result']['file'], f'exports/project-{self.project.id}-job-{export_id}.json')
+        response = self.client.get(f"/jobs/{export_id}/download/", **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="project-{self.project.id}.json"')
+        content = b''.join(response.streaming_content)
+        self.assertEqual(len(content), exported['result']['size'])
+        document = json.loads(content)
+        self.assertEqual(len(document['budget_entries']), 2 * 2 * 12)
+
+        response = self.client.post('/projects/import/?async=1&name=Copy', json.dumps(document), content_type='application/json', **self.auth)
+        job_id = self.job(response)['id']
+        self.run_jobs()
+        result = self.client.get(f'/jobs/{job_id}/', **self.auth).json()
+        self.assertEqual(result['status'], 'done')
+        self.assertEqual((result['result']['project']['name'], result['result']['budget_entries']), ('Copy', 48))
+
+        self.assertEqual((result['progress'], result['total']), (2, 2))
+        self.assertEqual(self.client.get(f'/jobs/{job_id}/download/', **self.auth).status_code, 404)
+
+        other = ProjectLeadUser.objects.create_user(username='other', email='other@example.com', password='pw')
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(other).access_token}'}
+        self.assertEqual(self.client.get(f'/jobs/{job_id}/', **headers).status_code, 404)
+        self.assertEqual(self.client.get(f'/jobs/{export_id}/download/', **headers).status_code, 404)
+
+    def test_claim_and_stale(self):
+        first, second = (enqueue(self.lead, 'export_project', project=self.project.id) for _ in range(2))
+        self.assertEqual(claim_job().id, first.id)
+        self.assertEqual(claim_job().id, second.id)
+        self.assertIsNone(claim_job())
+
+        Job.objects.filter(id=first.id).update(started_at=datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc))
+        self.assertEqual(fail_stale_jobs(datetime.timedelta(hours=1)), 1)
+        self.assertEqual(Job.objects.get(id=first.id).status, 'failed')
+        self.assertEqual(Job.objects.get(id=second.id).status, 'running')
+
+
+class PurgeTests(QueryBudgetMixin, TestCase):
+    """Projects and WPs are deleted with set-based statements, however many rows hang off them."""
+
+    def setUp(self):
+        self.lead = ProjectLeadUser.objects.create_user(username='lead', email='lead@example.com', password='pw')
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.lead).access_token}'}
+        self.kept = make_project(self.lead, 'kept', 2, 2, 2)
+        self.project = make_project(self.lead, 'purged', 6, 5, 4)
+        refresh_projects()
+        first, second = self.project.work_packages.order_by('id')[:2]
+        WorkPackageDependency.objects.create(predecessor=first, successor=second)
+        TaskDependency.objects.create(predecessor=first.tasks.first(), successor=second.tasks.first())
+
+    def rows(self, **filters):
+        return [model.objects.filter(**{f'{path}__in': WorkPackage.objects.filter(**filters)}).count() for model, path in (
+            (Task, 'work_package'), (Deliverable, 'work_package'), (BudgetEntry, 'work_package'), (WorkPackageSummary, 'work_package'),
+            (Task.users.through, 'task__work_package'), (WorkPackage.users.through, 'workpackage'),
+            (WorkPackageDependency, 'successor'), (TaskDependency, 'successor__work_package'))]
+
+    def test_project(self):
+        kept = self.rows(project=self.kept)
+        ids = list(self.project.work_packages.values_list('id', flat=True))
+        # one DELETE per table whatever the size of the project, nothing is loaded but the WP ids;
+        # the project is soft-deleted first and each chunk commits on its own (a savepoint pair here)
+        with self.assertMaxQueries(19):
+            response = self.client.delete(f'/projects/{self.project.id}/', **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.rows(id__in=ids), [0] * 8)
+        self.assertEqual(self.rows(project=self.kept), kept)
+        self.assertFalse(Project.all_objects.filter(id=self.project.id).exists())
+        self.assertFalse(ProjectSummary.objects.filter(project_id=self.project.id).exists())
+
+    def test_statements(self):
+        # 9 DELETEs per chunk of work packages whatever their rows, 2 for the project; rows are never read
+        rows = sum(self.rows(project=self.project)) + self.project.work_packages.count() + 2
+        ids = list(self.project.work_packages.values_list('id', flat=True))
+        steps = []
+        with mock.patch('TubitakPlannerApp.purge.PURGE_CHUNK_SIZE', 4), CaptureQueriesContext(connection) as ctx:
+            deleted = purge_project(self.project, progress=lambda done, total: steps.append((done, total)))
+        kinds = [q['sql'].split()[0] for q in ctx.captured_queries if not q['sql'].startswith(('SAVEPOINT', 'RELEASE'))]
+        self.assertEqual(kinds, ['UPDATE', 'SELECT'] + ['DELETE'] * (2 * 9 + 2))
+        self.assertEqual(deleted, rows)
+        self.assertEqual(steps, [(1, 3), (2, 3), (3, 3)])
+        self.assertEqual(self.rows(id__in=ids), [0] * 8)
+
+    def test_work_package(self):
+        wp = self.project.work_packages.order_by('id').first()
+        version = Project.objects.get(id=self.project.id).version
+        response = self.client.delete(f'/workpackages/{wp.id}/', HTTP_X_PROJECT_ID=str(self.project.id), **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.rows(id=wp.id), [0] * 8)
+        self.assertFalse(TaskDependency.objects.exists())
+        summary = ProjectSummary.objects.get(project=self.project)
+        self.assertEqual((summary.work_package_count, summary.task_count), (5, 25))
+        self.assertEqual(Project.objects.get(id=self.project.id).version, version + 1)
+
+    def test_soft_deleted_projects_are_hidden(self):
+        soft_delete_project(self.project)
+        self.assertEqual([p['name'] for p in self.client.get('/projects/', **self.auth).json()], ['kept'])
+        # its budget no longer counts against the people's capacity
+        wp = self.kept.work_packages.first()
+        person = User.objects.get(name='purged user 0')
+        wp.users.add(person)
+        response = self.client.patch('/budget/', json.dumps({f'{wp.id}_{person.id}_1': '0.95'}), content_type='application/json',
+                                     HTTP_X_PROJECT_ID=str(self.kept.id), **self.auth)
+        self.assertEqual(response.status_code, 200, response.content)
+
+        out = io.StringIO()
+        call_command('purge_projects', stdout=out)
+        self.assertIn('1 project(s) purged', out.getvalue())
+        self.assertFalse(Project.all_objects.filter(id=self.project.id).exists())
@@ -25,24 +25,45 @@ from rest_framework_simplejwt.views import (
 
 urlpatterns = [
     # User API endpoints
-    path('users/', views.userApi),  # GET all users, POST to create a user
+    path('users/', views.userAsyncApi),  # GET all users, POST to create a user
     path('users/<int:id>/', views.userApi),  # GET, PUT, DELETE specific user by id
 
     # WorkPackage API endpoints
-    path('workpackages/', views.workPackageApi),  # GET all work packages, POST to create a work package
+    path('workpackages/', views.workPackageAsyncApi),  # GET all work packages, POST to create a work package
     path('workpackages/<int:id>/', views.workPackageApi),  # GET, PUT, DELETE specific work package by id
+    path('workpackages/batch/', views.workPackageBatchApi),  # POST creates, updates and deletes in one transaction
+    path('workpackages/dependencies/', views.workPackageDependencyApi),  # GET all, POST {predecessor, successor, lag}
+    path('workpackages/dependencies/<int:id>/', views.workPackageDependencyApi),  # GET, DELETE
 
     # Task API endpoints
-    path('tasks/', views.taskApi),  # GET all tasks, POST to create a task
+    path('tasks/', views.taskAsyncApi),  # GET all tasks, POST to create a task
     path('tasks/<int:id>/', views.taskApi),  # GET, PUT, DELETE specific task by id
+    path('tasks/batch/', views.taskBatchApi),  # POST creates, updates and deletes in one transaction
+    path('tasks/dependencies/', views.taskDependencyApi),  # GET all, POST {predecessor, successor, lag}
+    path('tasks/dependencies/<int:id>/', views.taskDependencyApi),  # GET, DELETE
     
     path('projects/', views.projectApi),
-    path('projects/<int:id>/', views.projectDetailApi), 
+    path('projects/import/', views.projectImportApi),  # POST export document (JSON) or CSV sheets (multipart), ?async=1 queues a job
+    path('projects/<int:id>/', views.projectDetailAsyncApi),  # async GET, PUT and DELETE run the sync view, DELETE ?async=1 queues a job
+    path('projects/<int:id>/snapshot/', views.projectSnapshotApi),  # GET work packages with nested tasks, deliverables and users
+    path('projects/<int:id>/export/', views.projectExportApi),  # GET streamed JSON export of the whole project, POST queues it as a job
+    path('projects/<int:id>/gantt/', views.projectGanttApi),  # GET filtered Gantt bars with calendar dates
+    path('projects/<int:id>/events/', views.projectEventsApi),  # GET Server-Sent Events of every saved or deleted row
+    path('projects/<int:id>/schedule/', views.projectScheduleApi),  # GET critical path and slack
+    path('projects/<int:id>/reschedule/', views.projectRescheduleApi),  # POST move a WP or task, dependents follow
 
-    path('deliverables/', views.deliverableApi),
+    path('deliverables/', views.deliverableAsyncApi),
     path('deliverables/<int:id>/', views.deliverableApi),
+    path('deliverables/batch/', views.deliverableBatchApi),
 
-    path('budget/', views.budgetEntryApi),
+    path('budget/', views.budgetEntryAsyncApi),  # GET ?format=keys|columns|dense &wp= &user= &from_month= &to_month=, POST or PATCH cells (?async=1 queues a job)
+    path('budget/segments/', views.budgetSegmentApi),  # GET, POST (replace) or PATCH runs of equal months
+    path('budget/summary/', views.budgetSummaryApi),  # GET person-month and cost totals per user, WP and month
+
+    path('portfolio/workload/', views.portfolioWorkloadApi),  # GET allocation per user and calendar month over all projects
+
+    path('jobs/<int:id>/', views.jobApi),  # GET status, progress and result of a job queued with ?async=1
+    path('jobs/<int:id>/download/', views.jobDownloadApi),  # GET the document an export job wrote
 
     # JWT endpoints
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
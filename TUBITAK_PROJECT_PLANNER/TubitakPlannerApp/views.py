@@ -1,37 +1,82 @@
-from django.http import JsonResponse
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
+from django.core.files.storage import default_storage
 from rest_framework.parsers import JSONParser
-from .models import User, WorkPackage, Task, Project, Deliverable, BudgetEntry
-from .serializers import ProjectLeadRegistrationSerializer, UserSerializer, WorkPackageSerializer, TaskSerializer, ProjectSerializer, DeliverableSerializer, BudgetEntrySerializer
+from .models import ProjectLeadUser, User, WorkPackage, Task, Project, Deliverable, BudgetEntry, WorkPackageDependency, TaskDependency, WorkPackageSummary, Job
+from .serializers import ProjectLeadRegistrationSerializer, UserSerializer, WorkPackageSerializer, TaskSerializer, ProjectSerializer, DeliverableSerializer, WorkPackageSnapshotSerializer, WorkPackageDependencySerializer, TaskDependencySerializer, ProjectListSerializer, WorkPackageSummarySerializer, JobSerializer
 from django.views.decorators.csrf import csrf_exempt
-
-from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from django.views.decorators.http import etag
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.db.models import Count, Max, Prefetch, Sum
+from .batch import BatchValidationError, WorkPackageBatchWriter, TaskBatchWriter, DeliverableBatchWriter
+from .pagination import PaginationError, apaginate, month_range, order_by_keys, overlapping, paginate, requested_fields
+from .rows import ValueRows
+from .export import stream_project_export
+from .response_cache import cached_json, acached_json
+from .events import get_broker, stream_events, astream_events
+from django.core.handlers.asgi import ASGIRequest
+from .importer import ImportValidationError, document_from_csv, import_project
+from .budget import BudgetFilterError, BudgetValidationError, budget_cells, parse_budget_changes, parse_budget_filters, render_budget, apply_budget_changes, budget_summary, budget_segments, cells_from_segments
+from .scheduling import TASK, WORK_PACKAGE, Plan, ScheduleError, save_reschedule
+from .gantt import GanttFilterError, gantt_bars, parse_gantt_filters
+from .capacity import WorkloadFilterError, parse_workload_range, portfolio_workload
+from .jobs import enqueue
+from .purge import purge_project, purge_work_packages, soft_delete_project
+
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import TokenError
+from .authentication import CachedJWTAuthentication
 from functools import wraps
 
-# DECORATOR FOR FORCING JWT AUTH
+jwt_auth = CachedJWTAuthentication()
+
+# DECORATOR FOR FORCING JWT AUTH, works on sync and async views
 def jwt_required(view_func):
-    @wraps(view_func)
-    def _wrapped_view(request, *args, **kwargs):
+    def bearer_token(request):
         auth_header = request.headers.get('Authorization')
-
         if not auth_header or not auth_header.startswith('Bearer '):
-            return JsonResponse({'error': 'Authentication credentials were not provided.'}, status=401)
+            return None
+        return auth_header.split(' ')[1]
+
+    missing = lambda: JsonResponse({'error': 'Authentication credentials were not provided.'}, status=401)
+    invalid = lambda: JsonResponse({'error': 'Invalid or expired token.'}, status=401)
+
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def _async_wrapped_view(request, *args, **kwargs):
+            token = bearer_token(request)
+            if token is None:
+                return missing()
+            try:
+                request.user = await jwt_auth.aauthenticate_token(token)
+            except (AuthenticationFailed, TokenError):
+                return invalid()
+            return await view_func(request, *args, **kwargs)
+        return _async_wrapped_view
 
-        token = auth_header.split(' ')[1]
-        jwt_auth = JWTAuthentication()
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        token = bearer_token(request)
+        if token is None:
+            return missing()
 
         try:
-            validated_token = jwt_auth.get_validated_token(token)
-            user = jwt_auth.get_user(validated_token)
+            user = jwt_auth.authenticate_token(token)  # cached, see authentication.py
             request.user = user  # attach user to request
-        except (InvalidToken, TokenError) as e:
-            return JsonResponse({'error': 'Invalid or expired token.'}, status=401)
+        except (AuthenticationFailed, TokenError) as e:
+            return invalid()
 
         return view_func(request, *args, **kwargs)
     return _wrapped_view
 
-# HELPER FOR GETTING CURRENT PROJECT
+# HELPER FOR GETTING CURRENT PROJECT (looked up once per request)
 def get_current_project(request):
+    if not hasattr(request, '_current_project'):
+        request._current_project = _lookup_current_project(request)
+    return request._current_project
+
+def _lookup_current_project(request):
     pid = request.headers.get('X-Project-Id') or request.GET.get('project_id')
     if not pid:
         return None, JsonResponse({"error": "Project context required (X-Project-Id header or ?project_id=)."}, status=400)
@@ -42,16 +87,159 @@ def get_current_project(request):
 
     return proj, None
 
+# BACKGROUND JOBS: heavy writes take ?async=1 and answer 202 with a job to poll at jobs/<id>/ (see jobs.py)
+def wants_job(request):
+    return request.GET.get('async') in ('1', 'true')
+
+def queued(request, kind, **payload):
+    job = enqueue(request.user, kind, **payload)
+    return JsonResponse({"message": "Queued, follow the job for the result.", "job": JobSerializer(job).data}, status=202)
+
+# ETAG FUNCTIONS, reads answer If-None-Match with 304 before any other query or serializer runs
+def project_version_etag(request, *args, **kwargs):
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    project, err = get_current_project(request)
+    if err: return None
+    return f'"p{project.id}.{project.version}"'
+
+def project_detail_etag(request, id, *args, **kwargs):
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    version = Project.objects.filter(id=id, owner=request.user).values_list('version', flat=True).first()
+    if version is None: return None
+    return f'"p{id}.{version}"'
+
+def personnel_etag(request, *args, **kwargs):
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    # read fresh, request.user may be older than the counter
+    version = ProjectLeadUser.objects.filter(pk=request.user.pk).values_list('personnel_version', flat=True).first()
+    return f'"u{request.user.pk}.{version}"'
+
+def portfolio_etag(request, *args, **kwargs):
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    # every write to a project bumps its version, a deleted project lowers the count, a new one raises the max id
+    projects = Project.objects.filter(owner=request.user).aggregate(count=Count('id'), versions=Sum('version'), last=Max('id'))
+    version = ProjectLeadUser.objects.filter(pk=request.user.pk).values_list('personnel_version', flat=True).first()
+    return f'"w{request.user.pk}.{version}.{projects["count"]}.{projects["versions"] or 0}.{projects["last"] or 0}"'
+
+# ASYNC VARIANTS of the project lookup and ETag functions, for the async read endpoints
+async def aget_current_project(request):
+    if not hasattr(request, '_current_project'):
+        request._current_project = await _alookup_current_project(request)
+    return request._current_project
+
+async def _alookup_current_project(request):
+    pid = request.headers.get('X-Project-Id') or request.GET.get('project_id')
+    if not pid:
+        return None, JsonResponse({"error": "Project context required (X-Project-Id header or ?project_id=)."}, status=400)
+    try:
+        proj = await Project.objects.aget(id=pid, owner=request.user)
+    except Project.DoesNotExist:
+        return None, JsonResponse({"error": "Project not found or not yours."}, status=404)
+
+    return proj, None
+
+async def aproject_version_etag(request, *args, **kwargs):
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    project, err = await aget_current_project(request)
+    if err: return None
+    return f'"p{project.id}.{project.version}"'
+
+async def aproject_detail_etag(request, id, *args, **kwargs):
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    version = await Project.objects.filter(id=id, owner=request.user).values_list('version', flat=True).afirst()
+    if version is None: return None
+    return f'"p{id}.{version}"'
+
+async def apersonnel_etag(request, *args, **kwargs):
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    version = await ProjectLeadUser.objects.filter(pk=request.user.pk).values_list('personnel_version', flat=True).afirst()
+    return f'"u{request.user.pk}.{version}"'
+
+# @etag FOR ASYNC VIEWS, django's decorator would call the ETag function synchronously
+def async_etag(etag_func):
+    def decorator(view_func):
+        @wraps(view_func)
+        async def _wrapped_view(request, *args, **kwargs):
+            res_etag = await etag_func(request, *args, **kwargs)
+            res_etag = quote_etag(res_etag) if res_etag is not None else None
+            response = get_conditional_response(request, etag=res_etag)
+            if response is None:
+                response = await view_func(request, *args, **kwargs)
+            if res_etag and request.method in ('GET', 'HEAD'):
+                response.headers.setdefault('ETag', res_etag)
+            return response
+        return _wrapped_view
+    return decorator
+
+# ORDERINGS OF THE LIST ENDPOINTS, also used as cursor keys: (field, nullable)
+WORK_PACKAGE_KEYS = TASK_KEYS = [('start_date', False), ('end_date', False), ('id', False)]
+DELIVERABLE_KEYS = [('deadline', True), ('id', False)]
+
+# MONTH FIELDS OF THE LIST ENDPOINTS for ?from_month=&to_month= overlap filters: (start, end)
+WORK_PACKAGE_MONTHS = TASK_MONTHS = ('start_date', 'end_date')
+DELIVERABLE_MONTHS = ('deadline', 'deadline')
+
+# LIST HELPER: ?fields=a,b for sparse rows, ?limit=&cursor= for cursor pagination (plain list when neither is given),
+# ?from_month=&to_month= for rows overlapping a month range. Rows come from values() (rows.py), not serializer instances,
+# and rendered pages are cached per project version (response_cache.py)
+def _list_queryset(request, queryset, serializer_class, keys, months, nested=None):
+    queryset = overlapping(queryset, month_range(request.GET), *months)
+    value_rows = ValueRows(serializer_class, requested_fields(request.GET.get('fields'), serializer_class), nested)
+    return value_rows.values(queryset, keys), value_rows
+
+def list_response(request, queryset, serializer_class, keys, months, nested=None):
+    project, _ = get_current_project(request)
+    return cached_json(project, request, lambda: _render_list(request, queryset, serializer_class, keys, months, nested))
+
+def _render_list(request, queryset, serializer_class, keys, months, nested=None):
+    try:
+        queryset, value_rows = _list_queryset(request, queryset, serializer_class, keys, months, nested)
+        if 'limit' in request.GET or 'cursor' in request.GET:
+            rows, next_cursor = paginate(queryset, keys, request.GET.get('cursor'), request.GET.get('limit'))
+            return JsonResponse({"results": value_rows.rows(rows), "next": next_cursor})
+    except PaginationError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    return JsonResponse(value_rows.rows(list(order_by_keys(queryset, keys))), safe=False)
+
+# list_response() for async views, rows are read with the async ORM
+async def alist_response(request, queryset, serializer_class, keys, months, nested=None):
+    project, _ = await aget_current_project(request)
+    return await acached_json(project, request, lambda: _arender_list(request, queryset, serializer_class, keys, months, nested))
+
+async def _arender_list(request, queryset, serializer_class, keys, months, nested=None):
+    try:
+        queryset, value_rows = _list_queryset(request, queryset, serializer_class, keys, months, nested)
+        if 'limit' in request.GET or 'cursor' in request.GET:
+            rows, next_cursor = await apaginate(queryset, keys, request.GET.get('cursor'), request.GET.get('limit'))
+            return JsonResponse({"results": await value_rows.arows(rows), "next": next_cursor})
+    except PaginationError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    rows = [row async for row in order_by_keys(queryset, keys)]
+    return JsonResponse(await value_rows.arows(rows), safe=False)
+
+
+# ?summary=1 adds the headline numbers of summary.py to each work package
+def work_package_nested(request):
+    return {'summary': WorkPackageSummarySerializer} if request.GET.get('summary') else None
 
 # User API View
 @jwt_required
 @csrf_exempt
+@etag(personnel_etag)
 def userApi(request, id=0):
     if request.method == 'GET':
         if id == 0:
-            users = User.objects.filter(project_lead=request.user).all()
-            user_serializer = UserSerializer(users, many=True)
-            return JsonResponse(user_serializer.data, safe=False)
+            users = ValueRows(UserSerializer)
+            return JsonResponse(users.rows(list(users.values(User.objects.filter(project_lead=request.user)))), safe=False)
         else:
             try:
                 user = User.objects.get(id=id, project_lead=request.user)
@@ -93,20 +281,25 @@ def userApi(request, id=0):
 # WorkPackage API View
 @jwt_required
 @csrf_exempt
+@etag(project_version_etag)
 def workPackageApi(request, id=0):
     project, err = get_current_project(request)
     if err: return err
 
     if request.method == 'GET':
         if id == 0:
-            work_packages = WorkPackage.objects.filter(project=project).order_by('start_date', 'end_date')
-            work_package_serializer = WorkPackageSerializer(work_packages, many=True)
-            return JsonResponse(work_package_serializer.data, safe=False)
+            work_packages = WorkPackage.objects.filter(project=project)
+            return list_response(request, work_packages, WorkPackageSerializer, WORK_PACKAGE_KEYS, WORK_PACKAGE_MONTHS,
+                                 work_package_nested(request))
         else:
             try:
                 work_package = WorkPackage.objects.get(id=id, project=project)
                 work_package_serializer = WorkPackageSerializer(work_package)
-                return JsonResponse(work_package_serializer.data)
+                data = work_package_serializer.data
+                if work_package_nested(request):
+                    summary = WorkPackageSummary.objects.filter(work_package=work_package).first()
+                    data['summary'] = WorkPackageSummarySerializer(summary).data if summary else None
+                return JsonResponse(data)
             except WorkPackage.DoesNotExist:
                 return JsonResponse({"error": "WorkPackage not found."}, status=404)
 
@@ -116,19 +309,16 @@ def workPackageApi(request, id=0):
         
         # Add users to WorkPackage
         user_ids = work_package_data.get('users', [])
-        users = []
+        users = User.objects.in_bulk(user_ids)
         for user_id in user_ids:
-            try:
-                user = User.objects.get(id=user_id)
-                users.append(user)
-            except User.DoesNotExist:
+            if user_id not in users:
                 return JsonResponse({"error": f"User with ID {user_id} not found."}, status=404)
 
         # Serialize and save the WorkPackage
         work_package_serializer = WorkPackageSerializer(data=work_package_data)
         if work_package_serializer.is_valid():
             work_package = work_package_serializer.save()
-            work_package.users.set(users)  # Associate users with the work package
+            work_package.users.set(users.values())  # Associate users with the work package
             return JsonResponse({"message": "WorkPackage added successfully!"}, safe=False)
         return JsonResponse({"error": "Invalid data for work package. Please check the fields."}, status=400)
 
@@ -141,19 +331,16 @@ def workPackageApi(request, id=0):
 
         # Add users to WorkPackage
         user_ids = work_package_data.get('users', [])
-        users = []
+        users = User.objects.in_bulk(user_ids)
         for user_id in user_ids:
-            try:
-                user = User.objects.get(id=user_id)
-                users.append(user)
-            except User.DoesNotExist:
+            if user_id not in users:
                 return JsonResponse({"error": f"User with ID {user_id} not found."}, status=404)
 
         work_package_data['project'] = project.id
         work_package_serializer = WorkPackageSerializer(work_package, data=work_package_data)
         if work_package_serializer.is_valid():
             work_package_serializer.save()
-            work_package.users.set(users)  # Update users for the work package
+            work_package.users.set(users.values())  # Update users for the work package
             return JsonResponse({"message": "WorkPackage updated successfully!"}, safe=False)
         return JsonResponse({"error": "Failed to update work package."}, status=400)
 
@@ -173,7 +360,7 @@ def workPackageApi(request, id=0):
     elif request.method == 'DELETE':
         try:
             work_package = WorkPackage.objects.get(id=id, project=project)
-            work_package.delete()
+            purge_work_packages(project, [work_package.id])
             return JsonResponse({"message": "WorkPackage deleted successfully!"}, safe=False)
         except WorkPackage.DoesNotExist:
             return JsonResponse({"error": "WorkPackage not found."}, status=404)
@@ -181,15 +368,15 @@ def workPackageApi(request, id=0):
 # Task API View
 @jwt_required
 @csrf_exempt
+@etag(project_version_etag)
 def taskApi(request, id=0):
     project, err = get_current_project(request)
     if err: return err
 
     if request.method == 'GET':
         if id == 0:
-            tasks = Task.objects.filter(work_package__project=project).order_by('start_date', 'end_date')
-            task_serializer = TaskSerializer(tasks, many=True)
-            return JsonResponse(task_serializer.data, safe=False)
+            tasks = Task.objects.filter(work_package__project=project)
+            return list_response(request, tasks, TaskSerializer, TASK_KEYS, TASK_MONTHS)
         else:
             try:
                 task = Task.objects.get(id=id, work_package__project=project)
@@ -306,8 +493,9 @@ def taskApi(request, id=0):
 @csrf_exempt
 def projectApi(request, id=None):
     if request.method == 'GET':
-        qs = Project.objects.filter(owner=request.user).order_by('-created_at')
-        return JsonResponse(ProjectSerializer(qs, many=True).data, safe=False)
+        # headline numbers come from ProjectSummary in the same query
+        qs = Project.objects.filter(owner=request.user).select_related('summary').order_by('-created_at')
+        return JsonResponse(ProjectListSerializer(qs, many=True).data, safe=False)
     
     if request.method == 'POST':
         data = JSONParser().parse(request)
@@ -324,6 +512,7 @@ def projectApi(request, id=None):
 #API FOR SINGLE PROJECT
 @jwt_required
 @csrf_exempt
+@etag(project_detail_etag)
 def projectDetailApi(request, id):
     try:
         project = Project.objects.get(id=id, owner=request.user)
@@ -343,24 +532,144 @@ def projectDetailApi(request, id):
         return JsonResponse({"error": serializer.errors}, status=400)
 
     elif request.method == 'DELETE':
-        project.delete()
+        # ?async=1 hides the project right away and leaves removing its rows to a job
+        if wants_job(request):
+            soft_delete_project(project)
+            return queued(request, 'delete_project', project=project.id)
+        purge_project(project)
         return JsonResponse({"message": "Project deleted successfully!"}, status=200)
 
     return JsonResponse({"error": "Method not allowed."}, status=405)
 
 
+# API FOR WHOLE PROJECT IN ONE REQUEST (work packages with nested tasks, deliverables and user ids)
+@jwt_required
+@csrf_exempt
+@etag(project_detail_etag)
+def projectSnapshotApi(request, id):
+    if request.method != 'GET':
+        return JsonResponse({"error": "Method not allowed."}, status=405)
+
+    try:
+        project = Project.objects.get(id=id, owner=request.user)
+    except Project.DoesNotExist:
+        return JsonResponse({"error": "Project not found or not yours."}, status=404)
+
+    # fixed number of queries no matter how big the project is
+    tasks = Task.objects.order_by('start_date', 'end_date').prefetch_related('users')
+    work_packages = (
+        WorkPackage.objects.filter(project=project)
+        .order_by('start_date', 'end_date')
+        .prefetch_related(
+            'users',
+            Prefetch('tasks', queryset=tasks),
+            Prefetch('deliverables', queryset=Deliverable.objects.order_by('deadline')),
+        )
+    )
+    users = User.objects.filter(project_lead=request.user)
+
+    return JsonResponse({
+        "project": ProjectSerializer(project).data,
+        "work_packages": WorkPackageSnapshotSerializer(work_packages, many=True).data,
+        "users": UserSerializer(users, many=True).data,
+    })
+
+# GANTT FEED: ready to render bars with calendar dates, filtered like the Gantt page
+@jwt_required
+@csrf_exempt
+@etag(project_detail_etag)
+def projectGanttApi(request, id):
+    if request.method != 'GET':
+        return JsonResponse({"error": "Method not allowed."}, status=405)
+
+    try:
+        project = Project.objects.get(id=id, owner=request.user)
+    except Project.DoesNotExist:
+        return JsonResponse({"error": "Project not found or not yours."}, status=404)
+
+    try:
+        filters = parse_gantt_filters(request.GET)
+    except GanttFilterError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    return JsonResponse({"project": ProjectSerializer(project).data, "bars": gantt_bars(project, filters)})
+
+# STREAMING EXPORT OF A WHOLE PROJECT (versioned JSON document), POST queues it as a job instead
+@jwt_required
+@csrf_exempt
+def projectExportApi(request, id):
+    if request.method not in ('GET', 'POST'):
+        return JsonResponse({"error": "Method not allowed."}, status=405)
+
+    try:
+        project = Project.objects.get(id=id, owner=request.user)
+    except Project.DoesNotExist:
+        return JsonResponse({"error": "Project not found or not yours."}, status=404)
+
+    if request.method == 'POST':
+        return queued(request, 'export_project', project=project.id)
+
+    response = StreamingHttpResponse(stream_project_export(project), content_type='application/json')
+    response['Content-Disposition'] = f'attachment; filename="project-{project.id}.json"'
+    return response
+
+# CHANGE EVENTS OF A PROJECT as Server-Sent Events, one event per saved or deleted row (see events.py)
+@jwt_required
+@csrf_exempt
+def projectEventsApi(request, id):
+    if request.method != 'GET':
+        return JsonResponse({"error": "Method not allowed."}, status=405)
+
+    try:
+        project = Project.objects.get(id=id, owner=request.user)
+    except Project.DoesNotExist:
+        return JsonResponse({"error": "Project not found or not yours."}, status=404)
+
+    subscription = get_broker().subscribe(project.id)
+    # under ASGI the stream waits on the event loop, under WSGI it holds its worker thread
+    stream = astream_events if isinstance(request, ASGIRequest) else stream_events
+    response = StreamingHttpResponse(stream(subscription, project), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx would hold the events back
+    return response
+
+# IMPORT OF A WHOLE PROJECT: export document as JSON, or CSV sheets as multipart files
+@jwt_required
+@csrf_exempt
+def projectImportApi(request):
+    if request.method != 'POST':
+        return JsonResponse({"error": "Method not allowed."}, status=405)
+
+    try:
+        if request.content_type == 'multipart/form-data':
+            sheets = {name: f.read().decode('utf-8-sig') for name, f in request.FILES.items()}
+            document = document_from_csv(sheets)
+            name, start_date = request.POST.get('name'), request.POST.get('start_date')
+        else:
+            document = JSONParser().parse(request)
+            name, start_date = request.GET.get('name'), request.GET.get('start_date')
+        if wants_job(request):
+            return queued(request, 'import_project', document=document, name=name, start_date=start_date)
+        project, counts = import_project(document, request.user, name=name, start_date=start_date)
+    except UnicodeDecodeError:
+        return JsonResponse({"error": "CSV files must be UTF-8 encoded."}, status=400)
+    except ImportValidationError as e:
+        return JsonResponse({"error": "Import failed, nothing was saved. Please check the data.", "details": e.errors}, status=400)
+
+    return JsonResponse({"message": "Project imported successfully!", "project": ProjectSerializer(project).data, **counts}, status=201)
+
 # Delvierable API View
 @jwt_required
 @csrf_exempt
+@etag(project_version_etag)
 def deliverableApi(request, id=0):
     project, err = get_current_project(request)
     if err: return err
 
     if request.method == 'GET':
         if id == 0:
-            deliverables = Deliverable.objects.filter(work_package__project=project).order_by('deadline')
-            deliverable_serializer = DeliverableSerializer(deliverables, many=True)
-            return JsonResponse(deliverable_serializer.data, safe=False)
+            deliverables = Deliverable.objects.filter(work_package__project=project)
+            return list_response(request, deliverables, DeliverableSerializer, DELIVERABLE_KEYS, DELIVERABLE_MONTHS)
         else:
             try:
                 deliverable = Deliverable.objects.get(id=id, work_package__project=project)
@@ -445,56 +754,356 @@ def deliverableApi(request, id=0):
         except Deliverable.DoesNotExist:
             return JsonResponse({"error": "Deliverable not found."}, status=404)
 
+def _render_budget(request, project):
+    # ?format=columns|dense and the wp/user/month filters, see parse_budget_filters(); rows are tuples, no serializer
+    try:
+        filters = parse_budget_filters(request.GET)
+        return JsonResponse(render_budget(list(budget_cells(project, filters)), filters))
+    except BudgetFilterError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
 @jwt_required
 @csrf_exempt
+@etag(project_version_etag)
 def budgetEntryApi(request):
     project, err = get_current_project(request)
     if err: return err
     
     if request.method == 'GET':
-        budget_entries = BudgetEntry.objects.filter(work_package__project=project)
-        budget_entry_serializer = BudgetEntrySerializer(budget_entries, many=True)
-        
-        # transform data for frontend compatibility (key-value pair)
-        transformed_data = {}
-        for entry in budget_entry_serializer.data:
-            key = f"{entry['work_package']}_{entry['user']}_{entry['month']}"
-            transformed_data[key] = entry['contribution']
-        return JsonResponse(transformed_data, safe=False)
+        return cached_json(project, request, lambda: _render_budget(request, project))
 
-    elif request.method == 'POST':
+    elif request.method in ('POST', 'PATCH'):
+        # POST replaces the whole budget of the project, PATCH only touches the given cells (null removes a cell)
         data = JSONParser().parse(request)
-        
-        # consider a better way to partially update the budget entries
-        BudgetEntry.objects.filter(work_package__project=project).delete()
-        
-        saved_entries = []
-        errors = []
+        if wants_job(request):
+            return queued(request, 'save_budget', project=project.id, data=data, replace=request.method == 'POST')
+        try:
+            changes = parse_budget_changes(data, project, request.user, replace=request.method == 'POST')
+        except BudgetValidationError as e:
+            return JsonResponse({"error": "Failed to save some budget entries. Please check the data and try again.", "details": e.errors}, status=400)
 
-        for key, value in data.items():
-            try:
-                wp_id, user_id, month = key.split('_')
-                wp = WorkPackage.objects.get(id=int(wp_id), project=project)
-                entry_data = {
-                    'work_package': wp.id,
-                    'user': int(user_id),
-                    'month': int(month),
-                    'contribution': value
-                }
-                serializer = BudgetEntrySerializer(data=entry_data)
-                if serializer.is_valid():
-                    serializer.save()
-                    saved_entries.append(serializer.data)
-                else:
-                    errors.append({key: serializer.errors})
-            except Exception as e:
-                errors.append({key: str(e)})
-
-        if errors:
-            print("Budget save errors:", errors) 
-            return JsonResponse({"error": "Failed to save some budget entries. Please check the data and try again."}, status=400)
-        
-        return JsonResponse({"message": "Budget saved successfully!", "saved_entries": len(saved_entries)}, status=201)
+        counts = apply_budget_changes(project, changes, replace=request.method == 'POST')
+
+        if request.method == 'POST':
+            return JsonResponse({"message": "Budget saved successfully!", "saved_entries": sum(1 for c in changes.values() if c is not None), **counts}, status=201)
+        return JsonResponse({"message": "Budget updated successfully!", **counts})
+
+# BUDGET AS SEGMENTS: {"segments": [{work_package, user, start_month, end_month, contribution}]}, runs of equal
+# months instead of one key per month. Stored as monthly BudgetEntry rows all the same, a segment is expanded on write
+@jwt_required
+@csrf_exempt
+@etag(project_version_etag)
+def budgetSegmentApi(request):
+    project, err = get_current_project(request)
+    if err: return err
+
+    if request.method == 'GET':
+        try:
+            months = month_range(request.GET)
+        except PaginationError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        return cached_json(project, request, lambda: JsonResponse({"segments": budget_segments(project, months)}))
+
+    elif request.method in ('POST', 'PATCH'):
+        # POST replaces the whole budget, PATCH only the months of the given segments (null contribution removes them)
+        data = JSONParser().parse(request)
+        try:
+            cells = cells_from_segments(data.get('segments') if isinstance(data, dict) else None)
+            changes = parse_budget_changes(cells, project, request.user, replace=request.method == 'POST')
+        except BudgetValidationError as e:
+            return JsonResponse({"error": "Failed to save some budget entries. Please check the data and try again.", "details": e.errors}, status=400)
+
+        counts = apply_budget_changes(project, changes, replace=request.method == 'POST')
+
+        if request.method == 'POST':
+            return JsonResponse({"message": "Budget saved successfully!", "saved_entries": sum(1 for c in changes.values() if c is not None), **counts}, status=201)
+        return JsonResponse({"message": "Budget updated successfully!", **counts})
+
+    return JsonResponse({"error": "Method not allowed."}, status=405)
+
+# BATCH ENDPOINTS: {"create": [...], "update": [{"id": ..}], "delete": [ids]} applied all-or-nothing
+def _run_batch(request, writer_class):
+    project, err = get_current_project(request)
+    if err: return err
+
+    if request.method != 'POST':
+        return JsonResponse({"error": "Method not allowed."}, status=405)
+
+    payload = JSONParser().parse(request)
+    try:
+        results = writer_class(project, request.user).run(payload)
+    except BatchValidationError as e:
+        return JsonResponse({"error": "Invalid batch, nothing was saved. Please check the items.", "details": e.errors}, status=400)
+    return JsonResponse({"message": "Batch saved successfully!", "results": results})
+
+@jwt_required
+@csrf_exempt
+def workPackageBatchApi(request):
+    return _run_batch(request, WorkPackageBatchWriter)
+
+@jwt_required
+@csrf_exempt
+def taskBatchApi(request):
+    return _run_batch(request, TaskBatchWriter)
+
+@jwt_required
+@csrf_exempt
+def deliverableBatchApi(request):
+    return _run_batch(request, DeliverableBatchWriter)
+
+# DEPENDENCIES (finish-to-start with lag) between work packages or between tasks of the current project
+def _dependency_api(request, id, model, serializer_class, items, kind):
+    project, err = get_current_project(request)
+    if err: return err
+    items = items(project)
+
+    if request.method == 'GET':
+        if id == 0:
+            dependencies = model.objects.filter(successor__in=items).order_by('id')
+            return JsonResponse(serializer_class(dependencies, many=True).data, safe=False)
+        try:
+            return JsonResponse(serializer_class(model.objects.get(id=id, successor__in=items)).data)
+        except model.DoesNotExist:
+            return JsonResponse({"error": "Dependency not found."}, status=404)
+
+    elif request.method == 'POST':
+        serializer = serializer_class(data=JSONParser().parse(request))
+        if not serializer.is_valid():
+            return JsonResponse({"error": "Invalid data for dependency. Please check the fields."}, status=400)
+        predecessor, successor = serializer.validated_data['predecessor'], serializer.validated_data['successor']
+        if items.filter(id__in=[predecessor.id, successor.id]).count() != len({predecessor.id, successor.id}):
+            return JsonResponse({"error": "Predecessor or successor not found."}, status=404)
+        if predecessor == successor:
+            return JsonResponse({"error": "An item cannot depend on itself."}, status=400)
+
+        plan = Plan.load(project)
+        plan.link((kind, predecessor.id), (kind, successor.id), serializer.validated_data.get('lag', 0))
+        try:
+            plan.order()
+        except ScheduleError as e:
+            return JsonResponse({"error": "Dependency would create a cycle.", "details": e.errors}, status=400)
+        dependency = serializer.save()
+        return JsonResponse({"message": "Dependency added successfully!", "dependency": serializer_class(dependency).data})
+
+    elif request.method == 'DELETE':
+        try:
+            model.objects.get(id=id, successor__in=items).delete()
+            return JsonResponse({"message": "Dependency deleted successfully!"}, safe=False)
+        except model.DoesNotExist:
+            return JsonResponse({"error": "Dependency not found."}, status=404)
+
+    return JsonResponse({"error": "Method not allowed."}, status=405)
+
+@jwt_required
+@csrf_exempt
+@etag(project_version_etag)
+def workPackageDependencyApi(request, id=0):
+    return _dependency_api(request, id, WorkPackageDependency, WorkPackageDependencySerializer,
+                           lambda project: WorkPackage.objects.filter(project=project), WORK_PACKAGE)
+
+@jwt_required
+@csrf_exempt
+@etag(project_version_etag)
+def taskDependencyApi(request, id=0):
+    return _dependency_api(request, id, TaskDependency, TaskDependencySerializer,
+                           lambda project: Task.objects.filter(work_package__project=project), TASK)
+
+# CRITICAL PATH: earliest/latest months and slack of every work package and task
+@jwt_required
+@csrf_exempt
+@etag(project_detail_etag)
+def projectScheduleApi(request, id):
+    if request.method != 'GET':
+        return JsonResponse({"error": "Method not allowed."}, status=405)
+
+    try:
+        project = Project.objects.get(id=id, owner=request.user)
+    except Project.DoesNotExist:
+        return JsonResponse({"error": "Project not found or not yours."}, status=404)
+
+    try:
+        finish, timings, critical = Plan.load(project).critical_path()
+    except ScheduleError as e:
+        return JsonResponse({"error": "Project cannot be scheduled.", "details": e.errors}, status=400)
+
+    return JsonResponse({
+        "finish": finish,
+        "critical_path": [{"type": kind, "id": item_id} for kind, item_id in critical],
+        "work_packages": {item_id: timing for (kind, item_id), timing in timings.items() if kind == WORK_PACKAGE},
+        "tasks": {item_id: timing for (kind, item_id), timing in timings.items() if kind == TASK},
+    })
+
+# RESCHEDULE: {"work_package" or "task": id, "start_date", "end_date"}, children and dependents follow,
+# only the rows that changed are returned
+@jwt_required
+@csrf_exempt
+def projectRescheduleApi(request, id):
+    if request.method != 'POST':
+        return JsonResponse({"error": "Method not allowed."}, status=405)
+
+    try:
+        project = Project.objects.get(id=id, owner=request.user)
+    except Project.DoesNotExist:
+        return JsonResponse({"error": "Project not found or not yours."}, status=404)
+
+    data = JSONParser().parse(request)
+    kind = WORK_PACKAGE if WORK_PACKAGE in data else TASK
+    try:
+        root = (kind, int(data[kind]))
+        start, end = int(data['start_date']), int(data['end_date'])
+    except (KeyError, TypeError, ValueError):
+        return JsonResponse({"error": "work_package or task, start_date and end_date are required."}, status=400)
+
+    plan = Plan.load(project)
+    if root not in plan.dates:
+        return JsonResponse({"error": f"{'WorkPackage' if kind == WORK_PACKAGE else 'Task'} not found."}, status=404)
+    try:
+        changed, deadlines = plan.reschedule(root, start, end)
+    except ScheduleError as e:
+        return JsonResponse({"error": "Reschedule failed, nothing was saved.", "details": e.errors}, status=400)
+
+    work_packages, tasks, deliverables = save_reschedule(project, changed, deadlines)
+    return JsonResponse({
+        "message": "Rescheduled successfully!",
+        "work_packages": WorkPackageSerializer(work_packages, many=True).data,
+        "tasks": TaskSerializer(tasks, many=True).data,
+        "deliverables": DeliverableSerializer(deliverables, many=True).data,
+    })
+
+# Budget totals computed by the database
+@jwt_required
+@csrf_exempt
+@etag(project_version_etag)
+def budgetSummaryApi(request):
+    project, err = get_current_project(request)
+    if err: return err
+
+    if request.method != 'GET':
+        return JsonResponse({"error": "Method not allowed."}, status=405)
+    return JsonResponse(budget_summary(project))
+
+# Allocation of the lead's personnel per calendar month across all of their projects
+@jwt_required
+@csrf_exempt
+@etag(portfolio_etag)
+def portfolioWorkloadApi(request):
+    if request.method != 'GET':
+        return JsonResponse({"error": "Method not allowed."}, status=405)
+
+    try:
+        first, last = parse_workload_range(request.GET)
+    except WorkloadFilterError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    return JsonResponse(portfolio_workload(request.user, first, last))
+
+# STATUS AND RESULT OF A BACKGROUND JOB queued by one of the ?async=1 writes
+@jwt_required
+@csrf_exempt
+def jobApi(request, id):
+    if request.method != 'GET':
+        return JsonResponse({"error": "Method not allowed."}, status=405)
+
+    try:
+        job = Job.objects.get(id=id, owner=request.user)
+    except Job.DoesNotExist:
+        return JsonResponse({"error": "Job not found or not yours."}, status=404)
+
+    return JsonResponse(JobSerializer(job).data)
+
+# FILE WRITTEN BY A DONE EXPORT JOB, its result only holds the name
+@jwt_required
+@csrf_exempt
+def jobDownloadApi(request, id):
+    if request.method != 'GET':
+        return JsonResponse({"error": "Method not allowed."}, status=405)
+
+    try:
+        job = Job.objects.get(id=id, owner=request.user)
+    except Job.DoesNotExist:
+        return JsonResponse({"error": "Job not found or not yours."}, status=404)
+    name = (job.result or {}).get('file') if job.status == 'done' else None
+    if not name or not default_storage.exists(name):
+        return JsonResponse({"error": "This job has no file to download."}, status=404)
+
+    return FileResponse(default_storage.open(name, 'rb'), as_attachment=True,
+                        filename=f"project-{job.payload['project']}.json", content_type='application/json')
+
+# ASYNC READ ENDPOINTS: the lists of users, WPs, tasks, deliverables, the budget and the project detail
+# are read with the async ORM, so a burst of page loads doesn't hold one worker thread per request
+# under ASGI. Writes on the same routes are handed to the sync views above.
+@jwt_required
+@csrf_exempt
+@async_etag(apersonnel_etag)
+async def userAsyncApi(request):
+    if request.method != 'GET':
+        return await sync_to_async(userApi)(request)
+    users = ValueRows(UserSerializer)
+    rows = [row async for row in users.values(User.objects.filter(project_lead=request.user))]
+    return JsonResponse(await users.arows(rows), safe=False)
+
+@jwt_required
+@csrf_exempt
+@async_etag(aproject_version_etag)
+async def workPackageAsyncApi(request):
+    if request.method != 'GET':
+        return await sync_to_async(workPackageApi)(request)
+    project, err = await aget_current_project(request)
+    if err: return err
+    work_packages = WorkPackage.objects.filter(project=project)
+    return await alist_response(request, work_packages, WorkPackageSerializer, WORK_PACKAGE_KEYS, WORK_PACKAGE_MONTHS,
+                                work_package_nested(request))
+
+@jwt_required
+@csrf_exempt
+@async_etag(aproject_version_etag)
+async def taskAsyncApi(request):
+    if request.method != 'GET':
+        return await sync_to_async(taskApi)(request)
+    project, err = await aget_current_project(request)
+    if err: return err
+    tasks = Task.objects.filter(work_package__project=project)
+    return await alist_response(request, tasks, TaskSerializer, TASK_KEYS, TASK_MONTHS)
+
+@jwt_required
+@csrf_exempt
+@async_etag(aproject_version_etag)
+async def deliverableAsyncApi(request):
+    if request.method != 'GET':
+        return await sync_to_async(deliverableApi)(request)
+    project, err = await aget_current_project(request)
+    if err: return err
+    deliverables = Deliverable.objects.filter(work_package__project=project)
+    return await alist_response(request, deliverables, DeliverableSerializer, DELIVERABLE_KEYS, DELIVERABLE_MONTHS)
+
+@jwt_required
+@csrf_exempt
+@async_etag(aproject_version_etag)
+async def budgetEntryAsyncApi(request):
+    if request.method != 'GET':
+        return await sync_to_async(budgetEntryApi)(request)
+    project, err = await aget_current_project(request)
+    if err: return err
+    return await acached_json(project, request, lambda: _arender_budget(request, project))
+
+async def _arender_budget(request, project):
+    try:
+        filters = parse_budget_filters(request.GET)
+        return JsonResponse(render_budget([cell async for cell in budget_cells(project, filters)], filters))
+    except BudgetFilterError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+@jwt_required
+@csrf_exempt
+@async_etag(aproject_detail_etag)
+async def projectDetailAsyncApi(request, id):
+    if request.method != 'GET':
+        return await sync_to_async(projectDetailApi)(request, id)
+    try:
+        project = await Project.objects.aget(id=id, owner=request.user)
+    except Project.DoesNotExist:
+        return JsonResponse({"error": "Project not found or not yours."}, status=404)
+    return JsonResponse(ProjectSerializer(project).data, safe=False)
 
 @csrf_exempt
 def registerProjectLead(request):
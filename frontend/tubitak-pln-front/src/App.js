@@ -10,6 +10,7 @@ import { Navigation } from './Navigation';
 import { GanttChartPage } from './GanttChartPage';
 import { BudgetPage } from './BudgetPage';
 import { FormattedBudgetPage } from './FormattedBudgetPage.js'
+import { WorkloadPage } from './WorkloadPage.js'
 import { BrowserRouter, Route, Routes, useNavigate, useLocation, Navigate, Outlet} from 'react-router-dom';
 
 import { ToastContainer } from 'react-toastify';
@@ -119,6 +120,7 @@ function App() {
           <Route path="/gantt" element={<RequireAuth><RequireProject><GanttChartPage /></RequireProject></RequireAuth>} />
           <Route path="/budget" element={<RequireAuth><RequireProject><BudgetPage /></RequireProject></RequireAuth>} />
           <Route path="/formattedbudget" element={<RequireAuth><RequireProject><FormattedBudgetPage /></RequireProject></RequireAuth>} />
+          <Route path="/workload" element={<RequireAuth><RequireProject><WorkloadPage /></RequireProject></RequireAuth>} />
         </Routes>
       </div>
     </BrowserRouter>
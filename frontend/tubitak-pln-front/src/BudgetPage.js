@@ -29,12 +29,17 @@ export class BudgetPage extends Component {
         return Promise.all([
           fetch(process.env.REACT_APP_API + 'workpackages').then((r) => r.json()),
           fetch(process.env.REACT_APP_API + 'users').then((r) => r.json()),
-          fetch(process.env.REACT_APP_API + 'budget/').then((r) => (r.ok ? r.json() : {})),
+          fetch(process.env.REACT_APP_API + 'budget/?format=columns').then((r) => (r.ok ? r.json() : null)),
         ]);
       })
       .then(([wps, users, budgetData]) => {
         const maxMonth = wps.reduce((m, wp) => Math.max(m, wp.end_date), 0); // end_date is a month index (int)
-        this.setState({ workPackages: wps, users, maxMonth, contrib: budgetData });
+        // parallel columns from the server, keyed here once for editing
+        const contrib = {};
+        (budgetData?.work_packages || []).forEach((wpId, i) => {
+          contrib[this.key(wpId, budgetData.users[i], budgetData.months[i])] = budgetData.contributions[i];
+        });
+        this.setState({ workPackages: wps, users, maxMonth, contrib });
       });
   }
 
@@ -124,7 +129,11 @@ export class BudgetPage extends Component {
       .then((r) =>
         r.ok
           ? r.json().then((d) => this.setState({ showAlert: d.message || 'Saved!', alertVariant: 'success' }))
-          : r.json().then((d) => this.setState({ showAlert: `Save failed: ${d.detail || ''}`, alertVariant: 'danger' }))
+          : r.json().then((d) => this.setState({
+              // the server lists every invalid cell, including months over 1.0 across all projects
+              showAlert: `Save failed: ${Object.values(d.details || {}).join(' ') || d.error || ''}`,
+              alertVariant: 'danger',
+            }))
       )
       .catch(() => this.setState({ showAlert: 'Network error saving budget.', alertVariant: 'danger' }));
   };
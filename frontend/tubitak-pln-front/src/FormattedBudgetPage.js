@@ -8,9 +8,10 @@ export class FormattedBudgetPage extends Component {
     projectStart: '',
     workPackages: [],
     users: [],
-    budget: {},             // { "wp_user_month": value }
+    budget: { work_packages: [], users: [], months: [], contributions: [] },   // GET budget/?format=columns
     selectedWP: '',
     selectedUser: '',
+    allSegments: [],        // [{ work_package, user, start_month, end_month, contribution }]
     segments: [],
     message: ''
   };
@@ -30,39 +31,21 @@ export class FormattedBudgetPage extends Component {
     Promise.all([
       fetch(process.env.REACT_APP_API + 'workpackages').then(r => r.json()),
       fetch(process.env.REACT_APP_API + 'users').then(r => r.json()),
-      fetch(process.env.REACT_APP_API + 'budget').then(r => r.json())
-    ]).then(([wps, users, budget]) =>
-      this.setState({ workPackages: wps, users, budget })
+      fetch(process.env.REACT_APP_API + 'budget/?format=columns').then(r => r.json()),
+      fetch(process.env.REACT_APP_API + 'budget/segments/').then(r => r.json())
+    ]).then(([wps, users, budget, { segments }]) =>
+      this.setState({ workPackages: wps, users, budget, allSegments: segments }, this.buildSegments)
     );
   };
 
-  /* -------- segment builder (unchanged) -------- */
+  /* -------- segments of the selected WP and person, runs of equal months come from the server -------- */
   buildSegments = () => {
-    const { selectedWP, selectedUser, budget } = this.state;
+    const { selectedWP, selectedUser, allSegments } = this.state;
     if (!selectedWP || !selectedUser) return;
 
-    const months = [];
-    Object.entries(budget).forEach(([k, v]) => {
-      const [wpId, userId, m] = k.split('_').map(Number);
-      if (wpId === +selectedWP && userId === +selectedUser && v > 0)
-        months.push({ month: m, contrib: v });
-    });
-
-    months.sort((a, b) => a.month - b.month);
-
-    const segments = [];
-    let i = 0;
-    while (i < months.length) {
-      const start = months[i].month;
-      const pm = months[i].contrib;
-      let dur = 1;
-      let j = i + 1;
-      while (j < months.length && months[j].month === months[j - 1].month + 1 && months[j].contrib === pm) {
-        dur++; j++;
-      }
-      segments.push({ startMonth: start, duration: dur, pm });
-      i = j;
-    }
+    const segments = allSegments
+      .filter(s => s.work_package === +selectedWP && s.user === +selectedUser && parseFloat(s.contribution) > 0)
+      .map(s => ({ startMonth: s.start_month, duration: s.end_month - s.start_month + 1, pm: s.contribution }));
     this.setState({ segments });
   };
 
@@ -74,9 +57,9 @@ export class FormattedBudgetPage extends Component {
     const matrix = {};
     workPackages.forEach(wp => (matrix[wp.id] = {}));
 
-    Object.entries(budget).forEach(([k, v]) => {
-      const [wpId, userId] = k.split('_').map(Number);
-      matrix[wpId][userId] = (matrix[wpId][userId] || 0) + parseFloat(v);
+    budget.work_packages.forEach((wpId, i) => {
+      const userId = budget.users[i];
+      matrix[wpId][userId] = (matrix[wpId][userId] || 0) + parseFloat(budget.contributions[i]);
     });
 
     // row totals and column totals
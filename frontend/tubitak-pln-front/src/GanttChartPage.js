@@ -60,16 +60,6 @@ export class GanttChartPage extends Component {
 		);
 	};
 
-	inRange = (a, b) => {
-		const { rangeFrom, rangeTo } = this.state;
-		if (!rangeFrom && !rangeTo) return true;
-		const s = dayjs(a), e = dayjs(b);
-		if (rangeFrom && e.isBefore(rangeFrom)) return false;
-		if (rangeTo && s.isAfter(rangeTo)) return false;
-		return true;
-	};
-
-
 	handleDateChange = async (task, start, end) => {
     const { projectStart, workPackages, tasks, deliverables } = this.state;
     if (!projectStart) {
@@ -129,16 +119,29 @@ export class GanttChartPage extends Component {
     }
     // ================= VALIDATION LOGIC =================
 
+    if (type === 'WP' || type === 'T-') {
+        // the server moves children and dependents along and answers with only the rows that changed
+        const payload = { [type === 'WP' ? 'work_package' : 'task']: id, start_date: newStartMonth, end_date: newEndMonth };
+        try {
+            const res = await apiClient.post(`projects/${localStorage.getItem('project_id')}/reschedule/`, payload);
+            const merge = (rows, changed) => rows.map(row => changed.find(c => c.id === row.id) || row);
+            this.setState(state => ({
+                workPackages: merge(state.workPackages, res.data.work_packages),
+                tasks: merge(state.tasks, res.data.tasks),
+                deliverables: merge(state.deliverables, res.data.deliverables),
+            }), this.buildGanttData);
+        } catch (error) {
+            const details = error.response && error.response.data && error.response.data.details;
+            toast.error(details ? details.join(' ') : "Could not reschedule.");
+            this.fetchData();
+        }
+        return;
+    }
+
     let endpoint = '';
     let payload = {};
 
-    if (type === 'WP') {
-        endpoint = `workpackages/${id}/`;
-        payload = { start_date: newStartMonth, end_date: newEndMonth };
-    } else if (type === 'T-') {
-        endpoint = `tasks/${id}/`;
-        payload = { start_date: newStartMonth, end_date: newEndMonth };
-    } else if (type === 'D-') {
+    if (type === 'D-') {
         endpoint = `deliverables/${id}/`;
         payload = { deadline: newStartMonth };
     } else {
@@ -154,75 +157,27 @@ export class GanttChartPage extends Component {
 };
 
 
+	// bars come ready to render from the server, filtered there with the page's filters
 	buildGanttData = () => {
-    	const {
-        	projectStart, workPackages, tasks, deliverables,
-        	filterStatus, filterUser, filterWPs,
-        	showWorkPackages, showTasks, showDeliverables
-    	} = this.state;
-    	if (!projectStart) return;
-
-    	const pStart = dayjs(projectStart);
-    	const gantt = [];
-    	const wpIdToBarId = {};
-
-    	const wpAllowed = id => filterWPs === 'all' || filterWPs.includes(id);
-
-    	workPackages.forEach(wp => {
-        	const isWpAllowedByFilter = wpAllowed(wp.id) &&
-            	(filterStatus === 'all' || wp.status === filterStatus) &&
-            	(filterUser === 'all' || wp.users.some(userId => Array.isArray(filterUser) ? filterUser.includes(userId) : parseInt(filterUser) === userId));
-        
-        	if (showWorkPackages && isWpAllowedByFilter) {
-        	    const barS = pStart.add(wp.start_date - 1, 'month');
-        	    const barE = pStart.add(wp.end_date, 'month');
-        	    if (this.inRange(barS, barE)) {
-            	    const bar = {
-                	    id: `WP-${wp.id}`, name: wp.name,
-                	    start: barS.format('YYYY-MM-DD'), end: barE.format('YYYY-MM-DD'),
-                	    custom_class: 'bar-wp', progress: 100
-                	};
-                	gantt.push(bar);
-                	wpIdToBarId[wp.id] = bar.id;
-            	}
-        	}
-
-        	if (showTasks && wpIdToBarId[wp.id]) {
-            	tasks.filter(t => t.work_package === wp.id).forEach(t => {
-                	const isTaskAllowedByFilter = (filterStatus === 'all' || t.status === filterStatus) && (filterUser === 'all' || t.users.some(userId => Array.isArray(filterUser) ? filterUser.includes(userId) : parseInt(filterUser) === userId));
-                	if (isTaskAllowedByFilter) {
-                    	const barS = pStart.add(t.start_date - 1, 'month');
-                    	const barE = pStart.add(t.end_date, 'month');
-                    	if (this.inRange(barS, barE)) {
-                        	gantt.push({
-                            	id: `T-${t.id}`, name: t.name,
-                            	start: barS.format('YYYY-MM-DD'), end: barE.format('YYYY-MM-DD'),
-                            	parent: wpIdToBarId[t.work_package], custom_class: 'bar-task', progress: 100
-                        	});
-                    	}
-                	}
-            	});
-        	}
-            
-            if (showDeliverables && wpIdToBarId[wp.id]) {
-                deliverables.filter(d => d.work_package === wp.id).forEach(d => {
-                    const deadline = pStart.add(d.deadline - 1, 'month');
-                    if (this.inRange(deadline, deadline)) {
-                        gantt.push({
-                            id: `D-${d.id}`,
-                            name: d.name,
-                            start: deadline.format('YYYY-MM-DD'),
-                            end: deadline.format('YYYY-MM-DD'),
-                            parent: wpIdToBarId[d.work_package],
-                            custom_class: 'bar-deliverable',
-                            progress: 100
-                        });
-                    }
-                });
-            }
-    	});
-
-    	this.setState({ ganttTasks: gantt });
+		const {
+			projectStart, filterStatus, filterUser, filterWPs,
+			rangeFrom, rangeTo, showWorkPackages, showTasks, showDeliverables
+		} = this.state;
+		if (!projectStart) return;
+
+		const kinds = [
+			showWorkPackages && 'work_packages', showTasks && 'tasks', showDeliverables && 'deliverables'
+		].filter(Boolean);
+		const params = { kinds: kinds.join(',') };
+		if (filterStatus !== 'all') params.status = filterStatus;
+		if (filterUser !== 'all') params.users = [].concat(filterUser).join(',');
+		if (filterWPs !== 'all') params.work_packages = filterWPs.join(',');
+		if (rangeFrom) params.from = rangeFrom;
+		if (rangeTo) params.to = rangeTo;
+
+		apiClient.get(`projects/${localStorage.getItem('project_id')}/gantt/`, { params })
+			.then(res => this.setState({ ganttTasks: res.data.bars }))
+			.catch(() => toast.error("Could not load the Gantt chart."));
 	};
 
 	userMap = () => Object.fromEntries(this.state.users.map(u => [u.id, u.username || u.name]));
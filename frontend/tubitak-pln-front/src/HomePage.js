@@ -91,7 +91,7 @@ export default function HomePage() {
       if (!res.ok) throw new Error();
 
       const updated = await res.json();
-      setProjects(prev => prev.map(p => (p.id === updated.id ? updated : p)));
+      setProjects(prev => prev.map(p => (p.id === updated.id ? { ...p, ...updated } : p)));  // keeps the summary
       localStorage.setItem('currentProjectName', updated.name);
       setMessage('Project updated.');
     } catch {
@@ -222,6 +222,15 @@ export default function HomePage() {
             </Form.Group>
           </Form>
 
+          {/* Headline numbers of the selected project (from the project list) */}
+          {selectedProject && selectedProject.summary && (
+            <p className="text-muted mb-4">
+              {selectedProject.summary.work_package_count} work packages, {selectedProject.summary.task_count} tasks,{' '}
+              {selectedProject.summary.deliverable_count} deliverables, {selectedProject.summary.person_months} person-months,{' '}
+              cost {Number(selectedProject.summary.cost).toFixed(2)}
+            </p>
+          )}
+
           {/* Edit selected project */}
           {selectedProject && (
             <Form onSubmit={updateProject}>
@@ -33,6 +33,9 @@ export class Navigation extends Component{
                 <NavLink className="d-inline p-2 bg-dark text-white" to="/formattedbudget">
                     TUBITAK FORMATTED BUDGET
                 </NavLink> 
+                <NavLink className="d-inline p-2 bg-dark text-white" to="/workload">
+                    Workload
+                </NavLink> 
                 </Nav>
                 <Nav>
                     <Button variant="danger" onClick={this.handleLogout}>
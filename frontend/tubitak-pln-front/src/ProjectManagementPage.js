@@ -3,6 +3,7 @@ import { Button, Container, Row, Col } from 'react-bootstrap';
 import apiClient from './api';
 import { AddWorkPackageModal } from './AddWorkPackageModal';
 import { WorkPackageCard } from './WorkPackageCard'; // We will create this next
+import { subscribeProjectEvents, applyRowEvent } from './projectEvents';
 
 export class ProjectManagementPage extends Component {
     constructor(props) {
@@ -11,10 +12,34 @@ export class ProjectManagementPage extends Component {
             workPackages: [], // This will hold the final, nested data
             addWpModalShow: false,
         };
+        this.rows = { workPackages: [], tasks: [], deliverables: [], userMap: {} }; // flat rows as fetched
+        this.version = null;
     }
 
     componentDidMount() {
         this.fetchData();
+        // other tabs and users editing this project: apply their rows instead of refetching everything
+        this.unsubscribe = subscribeProjectEvents(localStorage.getItem('project_id'), {
+            onReady: ({ version }) => {
+                if (this.version !== null && version !== this.version) this.fetchData(); // missed events while away
+                this.version = version;
+            },
+            onEvent: this.applyEvent,
+        });
+    }
+
+    componentWillUnmount() {
+        this.unsubscribe();
+    }
+
+    applyEvent = (event) => {
+        const lists = { work_package: 'workPackages', task: 'tasks', deliverable: 'deliverables' };
+        if (event.type === 'project') {
+            this.fetchData(); // bulk change (batch, import, reschedule) or events were dropped
+        } else if (lists[event.type]) {
+            this.rows[lists[event.type]] = applyRowEvent(this.rows[lists[event.type]], event);
+            this.nest();
+        }
     }
 
     // --- Fetch ALL data and structure it ---
@@ -28,24 +53,14 @@ export class ProjectManagementPage extends Component {
                 apiClient.get('users/')
             ]);
 
-            const tasks = tasksRes.data;
-            const deliverables = deliverablesRes.data;
-            
             // Create a lookup map for users
             const userMap = usersRes.data.reduce((map, user) => {
                 map[user.id] = user.name;
                 return map;
             }, {});
 
-            // Nest tasks and deliverables inside their parent work package
-            const nestedWorkPackages = wpsRes.data.map(wp => ({
-                ...wp,
-                tasks: tasks.filter(t => t.work_package === wp.id),
-                deliverables: deliverables.filter(d => d.work_package === wp.id),
-                userMap: userMap // Pass the userMap down for convenience
-            }));
-
-            this.setState({ workPackages: nestedWorkPackages });
+            this.rows = { workPackages: wpsRes.data, tasks: tasksRes.data, deliverables: deliverablesRes.data, userMap };
+            this.nest();
 
         } catch (error) {
             console.error("Failed to fetch project data", error);
@@ -53,6 +68,19 @@ export class ProjectManagementPage extends Component {
         }
     }
 
+    // Nest tasks and deliverables inside their parent work package
+    nest = () => {
+        const { workPackages, tasks, deliverables, userMap } = this.rows;
+        const nestedWorkPackages = workPackages.map(wp => ({
+            ...wp,
+            tasks: tasks.filter(t => t.work_package === wp.id),
+            deliverables: deliverables.filter(d => d.work_package === wp.id),
+            userMap: userMap // Pass the userMap down for convenience
+        }));
+
+        this.setState({ workPackages: nestedWorkPackages });
+    }
+
     render() {
         const { workPackages, addWpModalShow } = this.state;
         const addWpModalClose = () => this.setState({ addWpModalShow: false });
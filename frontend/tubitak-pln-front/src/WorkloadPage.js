@@ -0,0 +1,90 @@
+// WorkloadPage.js
+import React, { Component } from 'react';
+import { Container, Row, Col, Form, Table, Alert } from 'react-bootstrap';
+
+// Allocation of every person per calendar month over all projects of the lead (GET portfolio/workload/)
+export class WorkloadPage extends Component {
+  state = {
+    from: '',               // "YYYY-MM", empty = first month with a budget entry
+    to: '',
+    months: [],
+    users: [],
+    allocations: [],        // allocations[userIndex][monthIndex] = "0.50"
+    overAllocated: new Set(),
+    message: ''
+  };
+
+  componentDidMount() {
+    this.loadData();
+  }
+
+  loadData = () => {
+    const { from, to } = this.state;
+    const params = new URLSearchParams();
+    if (from) params.set('from', from);
+    if (to) params.set('to', to);
+
+    fetch(process.env.REACT_APP_API + 'portfolio/workload/?' + params)
+      .then(r => r.json().then(body => ({ ok: r.ok, body })))
+      .then(({ ok, body }) => {
+        if (!ok) return this.setState({ message: body.error || 'Could not load the workload.' });
+        this.setState({
+          months: body.months,
+          users: body.users,
+          allocations: body.allocations,
+          overAllocated: new Set(body.over_allocated.map(o => `${o.user}_${o.month}`)),
+          message: ''
+        });
+      });
+  };
+
+  changeRange = (field, value) => this.setState({ [field]: value }, this.loadData);
+
+  render() {
+    const { from, to, months, users, allocations, overAllocated, message } = this.state;
+
+    return (
+      <Container className="mt-4">
+        <h4>Personnel Workload (all projects)</h4>
+        <Row className="mb-3">
+          <Col md={3}>
+            <Form.Label>From</Form.Label>
+            <Form.Control type="month" value={from} onChange={e => this.changeRange('from', e.target.value)} />
+          </Col>
+          <Col md={3}>
+            <Form.Label>To</Form.Label>
+            <Form.Control type="month" value={to} onChange={e => this.changeRange('to', e.target.value)} />
+          </Col>
+        </Row>
+
+        {message && <Alert variant="danger">{message}</Alert>}
+        {overAllocated.size > 0 && (
+          <Alert variant="warning">{overAllocated.size} month(s) with a person planned above 1.0 are highlighted.</Alert>
+        )}
+
+        <div style={{ overflowX: 'auto' }}>
+          <Table bordered size="sm">
+            <thead>
+              <tr>
+                <th>Personnel</th>
+                {months.map(m => <th key={m}>{m}</th>)}
+              </tr>
+            </thead>
+            <tbody>
+              {users.map((u, i) => (
+                <tr key={u.id}>
+                  <td>{u.name}</td>
+                  {months.map((m, j) => (
+                    <td key={m} className={overAllocated.has(`${u.id}_${m}`) ? 'table-danger' : ''}>
+                      {allocations[i][j] === '0.00' ? '' : allocations[i][j]}
+                    </td>
+                  ))}
+                </tr>
+              ))}
+            </tbody>
+          </Table>
+        </div>
+      </Container>
+    );
+  }
+}
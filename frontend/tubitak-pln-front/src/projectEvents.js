@@ -0,0 +1,60 @@
+// Change events of the current project (GET projects/<id>/events/, Server-Sent Events).
+// EventSource cannot send the Authorization header, so the stream is read with fetch.
+// onEvent gets {type, action, id, data}; onReady gets {project, version} on every (re)connect.
+export function subscribeProjectEvents(projectId, { onEvent, onReady }) {
+  const controller = new AbortController();
+  let retry = 3000;
+
+  const dispatch = (block) => {
+    let name = 'message';
+    const data = [];
+    for (const line of block.split('\n')) {
+      if (line.startsWith('event: ')) name = line.slice(7);
+      else if (line.startsWith('data: ')) data.push(line.slice(6));
+      else if (line.startsWith('retry: ')) retry = Number(line.slice(7)) || retry;
+    }
+    if (!data.length) return; // keep-alive comment
+    const payload = JSON.parse(data.join('\n'));
+    if (name === 'ready') onReady && onReady(payload);
+    else if (name === 'change') onEvent(payload);
+  };
+
+  const connect = async () => {
+    while (!controller.signal.aborted) {
+      try {
+        const response = await fetch(`${process.env.REACT_APP_API}projects/${projectId}/events/`, {
+          headers: { Authorization: `Bearer ${localStorage.getItem('access_token')}` },
+          signal: controller.signal,
+        });
+        if (!response.ok) throw new Error(`events answered ${response.status}`);
+        const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+        let buffer = '';
+        for (;;) {
+          const { value, done } = await reader.read();
+          if (done) break;
+          buffer += value;
+          const blocks = buffer.split('\n\n');
+          buffer = blocks.pop();
+          blocks.forEach(dispatch);
+        }
+      } catch (error) {
+        if (controller.signal.aborted) return;
+      }
+      // dropped or refused (e.g. an expired token, refreshed by the next API call): try again later
+      await new Promise(resolve => setTimeout(resolve, retry));
+    }
+  };
+
+  connect();
+  return () => controller.abort();
+}
+
+// Apply a row event to a list of rows of its type, returns the new list
+export function applyRowEvent(rows, event) {
+  if (event.action === 'deleted') return rows.filter(row => row.id !== event.id);
+  const index = rows.findIndex(row => row.id === event.id);
+  if (index === -1) return [...rows, event.data];
+  const next = rows.slice();
+  next[index] = event.data;
+  return next;
+}